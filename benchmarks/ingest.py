@@ -0,0 +1,75 @@
+"""Throughput benchmark for film ingestion
+
+Loads synthetic films through ``FilmService.ingest_films`` (COPY on
+Postgres) and ``FilmService.bulk_create_films`` and prints rows/sec for
+both paths. It writes to the database configured by ``DATABASE_URI``,
+so run it against a scratch database only:
+
+    python benchmarks/ingest.py --films 200000
+"""
+import argparse
+import time
+from uuid import uuid4
+
+from filmapi.app import create_app
+from filmapi.extensions import db
+from filmapi.services.film_service import FilmService
+
+
+def synthetic_films(count, prefix):
+    for i in range(count):
+        yield {
+            "title": f"Film {i}",
+            "title_original": f"{prefix} {i}",
+            "release_date": f"{1950 + i % 70}-{1 + i % 12}-{1 + i % 28}",
+            "description": "A synthetic film used for the ingest benchmark.",
+            "distributed_by": "Benchmark Pictures",
+            "length": 90 + i % 60,
+            "rating": round(1 + (i % 90) / 10, 1),
+            "budget": "1000000 USD",
+            "poster": "poster_url",
+            "trailer": "trailer_url",
+            "actors": [f"Actor {(i * 7 + n) % 50000}" for n in range(5)],
+            "genres": [f"Genre {(i + n) % 20}" for n in range(2)],
+        }
+
+
+def measure(label, count, load):
+    started = time.perf_counter()
+    counts = load()
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<20} {count} films in {elapsed:.2f}s, {count / elapsed:,.0f} rows/sec"
+    )
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--films", type=int, default=100000)
+    parser.add_argument("--orm-films", type=int, default=10000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        session = db.session
+        print(f"database: {session.get_bind().dialect.name}")
+        measure(
+            "ingest_films",
+            args.films,
+            lambda: FilmService.ingest_films(
+                session, synthetic_films(args.films, uuid4().hex)
+            ),
+        )
+        measure(
+            "bulk_create_films",
+            args.orm_films,
+            lambda: FilmService.bulk_create_films(
+                session, list(synthetic_films(args.orm_films, uuid4().hex))
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""JSON encoding benchmark for large ``/films`` responses
+
+Encodes the payload of ``/films?offset=60`` (60 list rows, descriptions
+included) and of film details with nested actors and genres, with the
+stdlib encoder and with orjson, and prints responses/sec for both. No
+database is needed:
+
+    python benchmarks/json_encoding.py --responses 5000
+"""
+import argparse
+import time
+
+from serializers import synthetic_films
+
+from filmapi.api.schemas import FilmSchema
+from filmapi.app import create_app
+from filmapi.commons import representations
+from filmapi.commons.serializers import compiled
+from filmapi.services.film_service import LIST_COLUMNS
+
+
+def measure(label, responses, payload, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(responses):
+            representations.dumps(payload)
+        best = min(best, time.perf_counter() - started)
+    size = len(representations.dumps(payload))
+    print(f"{label:<24} {responses / best:,.0f} responses/sec ({size:,} bytes)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app(testing=True)
+    with app.test_request_context():
+        films = synthetic_films(60)
+        payloads = {
+            "films?offset=60": compiled(FilmSchema, LIST_COLUMNS).dump(
+                films, many=True
+            ),
+            "film detail": {
+                "film": compiled(FilmSchema).dump(films[0]),
+                "comments": [],
+            },
+        }
+        orjson = representations.orjson
+        if orjson is None:
+            print("orjson is not installed, only the stdlib encoder is measured")
+        for label, payload in payloads.items():
+            representations.orjson = None
+            slow = measure(f"{label} stdlib", args.responses, payload, args.rounds)
+            if orjson is None:
+                continue
+            representations.orjson = orjson
+            fast = measure(f"{label} orjson", args.responses, payload, args.rounds)
+            print(f"{label} speedup: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Rate limiter overhead benchmark
+
+Spends tokens of distinct clients with the token bucket script against
+the configured Redis and prints the latency percentiles of a check, the
+whole overhead the limiter adds to a request:
+
+    python benchmarks/rate_limit.py --requests 20000
+"""
+import argparse
+import time
+
+from filmapi.app import create_app
+from filmapi.commons.rate_limit import take
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_app(testing=True)
+    with app.test_request_context():
+        take("lists", "ip:warmup")
+        timings = []
+        for number in range(args.requests):
+            started = time.perf_counter()
+            take("lists", f"ip:bench-{number % args.clients}")
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    for percentile in (50, 90, 99):
+        index = min(len(timings) - 1, len(timings) * percentile // 100)
+        print(f"p{percentile}: {timings[index] * 1000:.3f} ms")
+    print(f"checks/sec: {len(timings) / sum(timings):,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Serialization benchmark, marshmallow dumps against compiled serializers
+
+Dumps in-memory films shaped like the ``/films`` list rows and the film
+detail (nested actors and genres) with ``FilmSchema.dump`` and with the
+serializer compiled from the same schema, and prints films/sec for both.
+No database is needed:
+
+    python benchmarks/serializers.py --films 20000
+"""
+import argparse
+import time
+from datetime import date
+
+from filmapi.api.schemas import FilmSchema
+from filmapi.app import create_app
+from filmapi.commons.serializers import compiled
+from filmapi.models import Actor, Film, Genre
+from filmapi.services.film_service import LIST_COLUMNS
+
+
+def synthetic_films(count):
+    actors = [Actor(name=f"Actor {i}") for i in range(50)]
+    genres = [Genre(name=f"Genre {i}") for i in range(10)]
+    return [
+        Film(
+            title=f"Film {i}",
+            poster="poster_url",
+            trailer="trailer_url",
+            budget="1000000 USD",
+            title_original=f"Original {i}",
+            release_date=date(1950 + i % 70, 1 + i % 12, 1 + i % 28),
+            description="A synthetic film used for the serializer benchmark. " * 8,
+            distributed_by="Benchmark Pictures",
+            length=90 + i % 60,
+            rating=round(1 + (i % 90) / 10, 1),
+            actors=[actors[(i + n) % 50] for n in range(8)],
+            genres=[genres[(i + n) % 10] for n in range(2)],
+        )
+        for i in range(count)
+    ]
+
+
+def measure(label, count, dump, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        dump()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<30} {count / best:,.0f} films/sec")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--films", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(testing=True)
+    with app.app_context():
+        films = synthetic_films(args.films)
+        for label, only in (("list", LIST_COLUMNS), ("detail", None)):
+            schema = FilmSchema(only=only)
+            serializer = compiled(FilmSchema, only)
+            assert serializer.dump(films, many=True) == schema.dump(films, many=True)
+            slow = measure(
+                f"{label} marshmallow",
+                args.films,
+                lambda: schema.dump(films, many=True),
+                args.rounds,
+            )
+            fast = measure(
+                f"{label} compiled",
+                args.films,
+                lambda: serializer.dump(films, many=True),
+                args.rounds,
+            )
+            print(f"{label} speedup: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
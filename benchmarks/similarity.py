@@ -0,0 +1,49 @@
+"""Similar films computation benchmark
+
+Scores a synthetic catalog in memory with ``SimilarityIndex``, the work
+the ``compute_similar_films`` task does between reading the link tables
+and writing ``film_neighbors``, and prints films/sec:
+
+    python benchmarks/similarity.py --films 100000
+"""
+import argparse
+import random
+import time
+
+from filmapi.services.similarity import SimilarityIndex
+
+
+def synthetic_catalog(count, actors, genres, seed):
+    rng = random.Random(seed)
+    film_genres, film_actors = {}, {}
+    for film_id in range(1, count + 1):
+        film_genres[film_id] = tuple(sorted(rng.sample(range(genres), 1 + film_id % 3)))
+        # a few prolific actors and a long tail, like real casts
+        cast = {int(actors * rng.random() ** 2) for _ in range(5)}
+        film_actors[film_id] = tuple(sorted(cast))
+    return film_genres, film_actors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--films", type=int, default=100000)
+    parser.add_argument("--actors", type=int, default=50000)
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument("--neighbors", type=int, default=20)
+    args = parser.parse_args()
+
+    genres, actors = synthetic_catalog(args.films, args.actors, args.genres, seed=1)
+    started = time.perf_counter()
+    index = SimilarityIndex(genres, actors, genre_weight=0.4, actor_weight=0.6)
+    print(f"index: {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    rows = sum(len(neighbors) for _, neighbors in index.all_nearest(args.neighbors))
+    elapsed = time.perf_counter() - started
+    print(
+        f"neighbors: {args.films} films in {elapsed:.2f}s, "
+        f"{args.films / elapsed:,.0f} films/sec, {rows} rows"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
 from filmapi.api.resources.user import UserResource, UserList
 from filmapi.api.resources.genres import GenreResource
-from filmapi.api.resources.films import FilmResource, FilmListResource
-from filmapi.api.resources.actors import ActorResource, ActorListResource
+from filmapi.api.resources.films import (
+    FilmResource,
+    FilmListResource,
+    FilmSimilarResource,
+)
+from filmapi.api.resources.actors import (
+    ActorResource,
+    ActorListResource,
+    ActorFilmsResource,
+    ActorCostarsResource,
+    ActorPathResource,
+)
 from filmapi.api.resources.comments import CommentResource
+from filmapi.api.resources.leaderboards import LeaderboardResource
 from filmapi.api.resources.populate_db import PopulateDbResource
 from filmapi.api.resources.search import SearchResource
+from filmapi.api.resources.tasks import TaskResource
 
 
 __all__ = [
@@ -13,9 +25,15 @@ __all__ = [
     "GenreResource",
     "FilmResource",
     "FilmListResource",
+    "FilmSimilarResource",
     "ActorResource",
     "ActorListResource",
+    "ActorFilmsResource",
+    "ActorCostarsResource",
+    "ActorPathResource",
     "CommentResource",
+    "LeaderboardResource",
     "PopulateDbResource",
     "SearchResource",
+    "TaskResource",
 ]
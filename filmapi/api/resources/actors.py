@@ -1,15 +1,66 @@
+from datetime import date
+
+from flask import current_app, url_for
 from flask_restful import Resource, request
 from marshmallow import ValidationError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import load_only
 from flask_jwt_extended import jwt_required
 
-from filmapi.models import Actor, MoviesActors
-from filmapi.extensions import db, cache
-from filmapi.api.schemas import ActorSchema
+from filmapi.models import Actor, Film
+from filmapi.commons.cache_control import cache_control
+from filmapi.commons.compression import precompressed
+from filmapi.commons.conditional import conditional
+from filmapi.commons.cursors import paginate_rows, requested_cursor, requested_limit
+from filmapi.commons.fieldsets import requested_fields, scalar_fields
+from filmapi.commons.serializers import compiled
+from filmapi.commons.pagination import total_headers
+from filmapi.commons.rate_limit import rate_limited
+from filmapi.extensions import db
+from filmapi.api.schemas import ActorSchema, FilmSchema
+from filmapi.services.costar_graph import costar_graph
+from filmapi.services.film_service import FILMOGRAPHY_COLUMNS, FilmService
+from filmapi.services.generations import generations
+
+
+def actor_list_version():
+    return generations("actors")
+
+
+# cursor value parsers of each filmography sort
+SORT_KEY_TYPES = {"release_date": date.fromisoformat, "rating": float}
+DEFAULT_SORT = "-release_date"
+
+
+def actor_version(id: int):
+    actor = db.session.query(Actor.updated_at).filter_by(id=id).first()
+    if actor is None:
+        return None
+    return actor.updated_at, *generations(*actor_keys(id))
+
+
+def filmography(actor_id: int, limit: int, sort=DEFAULT_SORT, after=None):
+    """Films of an actor as nested in its detail, and the cursor after them"""
+    films = FilmService.fetch_films_by_actor(
+        db.session, actor_id, limit + 1, sort=sort, after=after
+    )
+    films, cursor = paginate_rows(films, limit, lambda film: (film.sort_key, film.id))
+    return compiled(FilmSchema, FILMOGRAPHY_COLUMNS).dump(films, many=True), cursor
 
 
-def key():
-    return f"films:{request.url}"
+def filmography_url(actor_id: int, limit: int, sort: str, cursor):
+    if cursor is None:
+        return None
+    return url_for(
+        "api.actor_films", id=actor_id, limit=limit, sort=sort, cursor=cursor
+    )
+
+
+def actor_list_keys():
+    return ["actors"]
+
+
+def actor_keys(id: int):
+    return [f"actor:{id}", f"actor:{id}:films"]
 
 
 class ActorListResource(Resource):
@@ -33,17 +84,47 @@ class ActorListResource(Resource):
           schema:
             type: integer
           description: Number of actors to retrieve per page (default is 20, maximum is 60)
+        - in: query
+          name: fields
+          schema:
+            type: string
+          description: Comma separated actor fields to return (default is
+            id, name, birthday, is_active and film_count)
+        - in: query
+          name: min_films
+          schema:
+            type: integer
+          description: Only actors with at least this many films (default is 1)
+        - in: query
+          name: sort
+          schema:
+            type: string
+            enum: [popular]
+          description: popular lists actors with the most films first
       responses:
         200:
           description: List of actors
+          headers:
+            X-Total-Count:
+              description: Number of actors matching the filters
+              schema:
+                type: integer
+            X-Total-Count-Exact:
+              description: false when X-Total-Count is a planner estimate
+              schema:
+                type: boolean
           content:
             application/json:
               schema:
                 type: array
                 items:
                   $ref: '#/components/schemas/ActorSchema'
+        304:
+          description: Not modified, the ETag sent in If-None-Match is current
         400:
           description: Bad request, validation error in parameters
+        429:
+          description: Too many requests, retry after Retry-After seconds
     post:
       tags:
         - actor
@@ -67,21 +148,33 @@ class ActorListResource(Resource):
     """
 
     actor_schema = ActorSchema()
+    list_fields = scalar_fields(ActorSchema, Actor)
 
-    @cache.cached(key_prefix=key)
+    @rate_limited("lists")
+    @cache_control("actors", actor_list_keys)
+    @conditional(actor_list_version)
+    @precompressed
     def get(self):
         page = request.args.get("page", 0, type=int)
         offset = request.args.get("offset", 20, type=int)
         if offset > 60:
             return {"error": f"Offset must not be greater than {60}"}, 400
-        actors = (
-            db.session.query(Actor.id, Actor.name, Actor.birthday, Actor.is_active)
-            .join(MoviesActors, MoviesActors.actor_id == Actor.id)
-            .group_by(Actor.id)
-            .offset(page * offset)
-            .limit(offset)
+        min_films = max(request.args.get("min_films", 1, type=int), 1)
+        sort = request.args.get("sort")
+        if sort not in (None, "popular"):
+            return {"error": "sort must be popular"}, 400
+        try:
+            fields = requested_fields(self.list_fields, self.list_fields)
+        except ValidationError as e:
+            return {"message": str(e)}, 400
+        actors = db.session.query(*(getattr(Actor, name) for name in fields)).filter(
+            Actor.film_count >= min_films
         )
-        return self.actor_schema.dump(actors, many=True), 200
+        if sort == "popular":
+            actors = actors.order_by(Actor.film_count.desc(), Actor.id.desc())
+        actors = actors.offset(page * offset).limit(offset)
+        schema = compiled(ActorSchema, fields)
+        return schema.dump(actors, many=True), 200, total_headers(actors, "actors")
 
     @jwt_required()
     def post(self):
@@ -110,13 +203,28 @@ class ActorResource(Resource):
           schema:
             type: integer
           description: ID of the actor to retrieve
+        - in: query
+          name: fields
+          schema:
+            type: string
+          description: Comma separated actor fields to return, films are only
+            loaded when listed (default is all fields)
       responses:
         200:
-          description: Actor details
+          description: Actor details, films holds the latest released films,
+            films_next links to the rest of the filmography
           content:
             application/json:
               schema:
-                $ref: '#/components/schemas/ActorSchema'
+                allOf:
+                  - $ref: '#/components/schemas/ActorSchema'
+                  - type: object
+                    properties:
+                      films_next:
+                        type: string
+                        nullable: true
+        304:
+          description: Not modified, the ETag sent in If-None-Match is current
         404:
           description: Actor not found
 
@@ -216,18 +324,32 @@ class ActorResource(Resource):
     """
 
     actor_schema = ActorSchema()
+    detail_fields = tuple(actor_schema.fields)
 
-    @cache.cached(key_prefix=key)
+    @cache_control("actor", actor_keys)
+    @conditional(actor_version)
+    @precompressed
     def get(self, id: int):
+        try:
+            fields = requested_fields(self.detail_fields, self.detail_fields)
+        except ValidationError as e:
+            return {"message": str(e)}, 400
+        scalars = tuple(name for name in fields if name != "films")
+        columns = (getattr(Actor, name) for name in scalars)
         actor = (
             db.session.query(Actor)
             .filter_by(id=id)
-            .options(joinedload(Actor.films))
+            .options(load_only(Actor.id, *columns))
             .first()
         )
         if not actor:
             return "", 404
-        return self.actor_schema.dump(actor), 200
+        data = compiled(ActorSchema, scalars).dump(actor) if scalars else {}
+        if "films" in fields:
+            limit = current_app.config["ACTOR_FILMS_PAGE_SIZE"]
+            data["films"], cursor = filmography(id, limit)
+            data["films_next"] = filmography_url(id, limit, DEFAULT_SORT, cursor)
+        return data, 200
 
     @jwt_required()
     def put(self, id: int):
@@ -271,3 +393,273 @@ class ActorResource(Resource):
         db.session.delete(actor)
         db.session.commit()
         return "", 204
+
+
+class ActorFilmsResource(Resource):
+    """
+    Actor Films Resource
+
+    ---
+    get:
+      tags:
+        - actor
+      summary: Get the films of an actor
+      description: Get a page of the films an actor appeared in. Follow the
+        next link to read the following page.
+      parameters:
+        - in: path
+          name: id
+          schema:
+            type: integer
+          required: true
+          description: ID of the actor
+        - in: query
+          name: sort
+          schema:
+            type: string
+            enum: [release_date, -release_date, rating, -rating]
+          description: Sort key, prefixed with - for descending order
+            (default is -release_date)
+        - in: query
+          name: limit
+          schema:
+            type: integer
+          description: Number of films to retrieve (default is 20, maximum is 100)
+        - in: query
+          name: cursor
+          schema:
+            type: string
+          description: Opaque position returned in the next link of the previous page
+      responses:
+        200:
+          description: A page of films
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  films:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        title:
+                          type: string
+                        title_original:
+                          type: string
+                        uuid:
+                          type: string
+                        poster:
+                          type: string
+                  next:
+                    type: string
+                    nullable: true
+        304:
+          description: Not modified, the ETag sent in If-None-Match is current
+        400:
+          description: Bad request, invalid sort, limit or cursor
+        404:
+          description: Actor not found
+    """
+
+    @cache_control("actor", actor_keys)
+    @conditional(actor_version)
+    @precompressed
+    def get(self, id: int):
+        sort = request.args.get("sort", DEFAULT_SORT)
+        if sort.lstrip("-") not in SORT_KEY_TYPES:
+            return {"message": f"Unknown sort: {sort}"}, 400
+        try:
+            limit = requested_limit(
+                current_app.config["ACTOR_FILMS_PAGE_SIZE"],
+                current_app.config["ACTOR_FILMS_MAX_PAGE_SIZE"],
+            )
+            after = requested_cursor(SORT_KEY_TYPES[sort.lstrip("-")], int)
+        except ValidationError as e:
+            return {"message": str(e)}, 400
+        if not db.session.query(Actor.id).filter_by(id=id).first():
+            return {"message": "Actor not found"}, 404
+        films, cursor = filmography(id, limit, sort=sort, after=after)
+        return {"films": films, "next": filmography_url(id, limit, sort, cursor)}, 200
+
+
+def actor_names(ids):
+    return dict(db.session.query(Actor.id, Actor.name).filter(Actor.id.in_(ids)))
+
+
+def graph_not_ready():
+    retry_after = current_app.config["COSTAR_GRAPH_RETRY_AFTER"]
+    return (
+        {"message": "The co-star graph is being built"},
+        503,
+        {"Retry-After": str(retry_after)},
+    )
+
+
+class ActorCostarsResource(Resource):
+    """
+    Actor Costars Resource
+
+    ---
+    get:
+      tags:
+        - actor
+      summary: Get the co-stars of an actor
+      description: Get the actors who appeared in most films with an actor.
+      parameters:
+        - in: path
+          name: id
+          schema:
+            type: integer
+          required: true
+          description: ID of the actor
+        - in: query
+          name: limit
+          schema:
+            type: integer
+          description: Number of co-stars to retrieve (default is 20, maximum is 100)
+      responses:
+        200:
+          description: Co-stars, most shared films first
+          content:
+            application/json:
+              schema:
+                type: array
+                items:
+                  type: object
+                  properties:
+                    id:
+                      type: integer
+                    name:
+                      type: string
+                    films:
+                      type: integer
+        400:
+          description: Bad request, invalid limit
+        404:
+          description: Actor not found
+        429:
+          description: Too many requests, retry after Retry-After seconds
+        503:
+          description: Co-star graph not built yet, retry after Retry-After seconds
+    """
+
+    @rate_limited("graph")
+    def get(self, id: int):
+        try:
+            limit = requested_limit(
+                current_app.config["ACTOR_COSTARS_LIMIT"],
+                current_app.config["ACTOR_COSTARS_MAX_LIMIT"],
+            )
+        except ValidationError as e:
+            return {"message": str(e)}, 400
+        if not db.session.query(Actor.id).filter_by(id=id).first():
+            return {"message": "Actor not found"}, 404
+        graph = costar_graph()
+        if graph is None:
+            return graph_not_ready()
+        costars = graph.costars(id, limit)
+        names = actor_names([actor_id for actor_id, _ in costars])
+        # actors deleted since the graph was built
+        return [
+            {"id": actor_id, "name": names[actor_id], "films": films}
+            for actor_id, films in costars
+            if actor_id in names
+        ], 200
+
+
+class ActorPathResource(Resource):
+    """
+    Actor Path Resource
+
+    ---
+    get:
+      tags:
+        - actor
+      summary: Get the degrees of separation between two actors
+      description: Get a shortest chain of co-stars linking two actors, with
+        the films linking each pair.
+      parameters:
+        - in: query
+          name: from
+          schema:
+            type: integer
+          required: true
+          description: ID of the first actor
+        - in: query
+          name: to
+          schema:
+            type: integer
+          required: true
+          description: ID of the second actor
+      responses:
+        200:
+          description: Shortest chain of co-stars
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  degrees:
+                    type: integer
+                  actors:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        id:
+                          type: integer
+                        name:
+                          type: string
+                  films:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        uuid:
+                          type: string
+                        title:
+                          type: string
+        400:
+          description: Bad request, from and to are required
+        404:
+          description: Actor not found, or no chain within the maximum degrees
+        429:
+          description: Too many requests, retry after Retry-After seconds
+        503:
+          description: Co-star graph not built yet, retry after Retry-After seconds
+    """
+
+    @rate_limited("graph")
+    def get(self):
+        source = request.args.get("from", type=int)
+        target = request.args.get("to", type=int)
+        if source is None or target is None:
+            return {"message": "from and to actor ids are required"}, 400
+        names = actor_names([source, target])
+        if len(names) < len({source, target}):
+            return {"message": "Actor not found"}, 404
+        graph = costar_graph()
+        if graph is None:
+            return graph_not_ready()
+        path = graph.path(source, target, current_app.config["COSTAR_PATH_MAX_DEGREES"])
+        if path is None:
+            return {"message": "No path between the actors"}, 404
+        actor_ids, film_ids = path
+        names = actor_names(actor_ids)
+        films = {
+            film.id: film
+            for film in db.session.query(Film.id, Film.uuid, Film.title).filter(
+                Film.id.in_(film_ids)
+            )
+        }
+        if len(names) < len(actor_ids) or len(films) < len(film_ids):
+            # the path goes through rows deleted since the graph was built
+            return {"message": "No path between the actors"}, 404
+        return {
+            "degrees": len(film_ids),
+            "actors": [{"id": id_, "name": names[id_]} for id_ in actor_ids],
+            "films": [
+                {"uuid": films[id_].uuid, "title": films[id_].title} for id_ in film_ids
+            ],
+        }, 200
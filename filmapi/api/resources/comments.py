@@ -1,16 +1,109 @@
+from datetime import datetime
+
+from flask import current_app, url_for
 from flask_restful import Resource, request
+from marshmallow import ValidationError
 
+from filmapi.commons.cache_control import cache_control
+from filmapi.commons.compression import precompressed
+from filmapi.commons.conditional import conditional
+from filmapi.commons.cursors import (
+    encode_cursor,
+    paginate_rows,
+    requested_cursor,
+    requested_limit,
+)
+from filmapi.commons.rate_limit import rate_limited
 from filmapi.extensions import db
 from filmapi.models import Film, Comments
 from filmapi.api.schemas import CommentSchema
+from filmapi.services import comment_buffer
+from filmapi.services.comment_service import CommentService
+from filmapi.services.generations import generations
 from flask_jwt_extended import jwt_required, get_current_user
 
 
+def comment_data(comments):
+    return [
+        {
+            "username": comment.username,
+            "created_at": comment.created_at.isoformat(sep=" ", timespec="seconds"),
+            "text": comment.text,
+        }
+        for comment in comments
+    ]
+
+
+def comments_version(uuid: str):
+    film = db.session.query(Film.updated_at).filter_by(uuid=uuid).first()
+    if film is None:
+        return None
+    return film.updated_at, *generations(*comments_keys(uuid))
+
+
+def comments_keys(uuid: str):
+    return [f"film:{uuid}"]
+
+
 class CommentResource(Resource):
     """
     Comment Resource
 
     ---
+    get:
+      tags:
+        - comments
+      summary: Get the comments of a movie
+      description: Get the comments of a movie, newest first. Follow the
+        next link to read older comments. The first page also lists the
+        comments that are accepted but not stored yet.
+      parameters:
+        - in: path
+          name: uuid
+          schema:
+            type: string
+          required: true
+          description: UUID of the movie
+        - in: query
+          name: limit
+          schema:
+            type: integer
+          description: Number of comments to retrieve (default is 20, maximum is 100)
+        - in: query
+          name: cursor
+          schema:
+            type: string
+          description: Opaque position returned in the next link of the previous page
+      responses:
+        200:
+          description: A page of comments
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  comments:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        username:
+                          type: string
+                        created_at:
+                          type: string
+                          format: date-time
+                        text:
+                          type: string
+                  next:
+                    type: string
+                    nullable: true
+        304:
+          description: Not modified, the ETag sent in If-None-Match is current
+        400:
+          description: Bad request, invalid limit or cursor
+        404:
+          description: Movie not found
+
     post:
       tags:
         - comments
@@ -37,21 +130,74 @@ class CommentResource(Resource):
       responses:
         201:
           description: Comment added successfully.
+        202:
+          description: Comment accepted, it is stored shortly. Returned when
+            comments are buffered.
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  id:
+                    type: string
+        400:
+          description: Comment text is missing.
         404:
           description: Movie not found.
+        429:
+          description: Too many requests, retry after Retry-After seconds
         500:
           description: Internal server error
     """
 
     comment_schema = CommentSchema()
 
+    @cache_control("comments", comments_keys)
+    @conditional(comments_version)
+    @precompressed
+    def get(self, uuid: str):
+        try:
+            limit = requested_limit(
+                current_app.config["COMMENTS_PAGE_SIZE"],
+                current_app.config["COMMENTS_MAX_PAGE_SIZE"],
+            )
+            before = requested_cursor(datetime.fromisoformat, int)
+        except ValidationError as e:
+            return {"message": str(e)}, 400
+        film = db.session.query(Film.id).filter_by(uuid=uuid).first()
+        if not film:
+            return {"message": "Film not found"}, 404
+        comments = CommentService.fetch_latest(
+            db.session, film.id, limit + 1, before=before
+        )
+        if before is None:
+            comments, cursor = comment_buffer.first_page(uuid, comments, limit)
+            cursor = cursor and encode_cursor(*cursor)
+        else:
+            comments, cursor = paginate_rows(
+                comments, limit, lambda comment: (comment.created_at, comment.id)
+            )
+        next_ = cursor and url_for(
+            request.endpoint, uuid=uuid, limit=limit, cursor=cursor
+        )
+        return {"comments": comment_data(comments), "next": next_}, 200
+
+    @rate_limited("comments")
     @jwt_required()
     def post(self, uuid: str):
         user = get_current_user()
+        text = (request.json or {}).get("text")
+        if not isinstance(text, str) or not text.strip():
+            return {"message": "text is required"}, 400
+        if current_app.config["COMMENTS_BUFFERED"]:
+            film = db.session.query(Film.id, Film.uuid).filter_by(uuid=uuid).first()
+            if not film:
+                return {"message": "Film not found"}, 404
+            return {"id": comment_buffer.buffer_comment(film, user, text)}, 202
         film = db.session.query(Film).filter_by(uuid=uuid).first()
         if not film:
             return {"message": "Film not found"}, 404
-        new_comment = Comments(text=request.json["text"], user=user, film=film)
+        new_comment = Comments(text=text, user=user, film=film)
         db.session.add(new_comment)
         db.session.commit()
         return "ok", 201
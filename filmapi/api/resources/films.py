@@ -1,16 +1,72 @@
+from flask import current_app, g
 from flask_restful import Resource, request
 from marshmallow import ValidationError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, load_only, selectinload
 from flask_jwt_extended import jwt_required
 
-from filmapi.extensions import db, cache
-from filmapi.models import Comments, Film, User
+from filmapi.commons.cache_control import cache_control, surrogate_key_header
+from filmapi.commons.compression import precompressed
+from filmapi.commons.conditional import conditional
+from filmapi.commons.cursors import requested_limit
+from filmapi.commons.fieldsets import requested_fields, scalar_fields
+from filmapi.commons.serializers import compiled
+from filmapi.commons.pagination import total_headers
+from filmapi.commons.rate_limit import rate_limited
+from filmapi.extensions import db
+from filmapi.models import Film, PlotNeighbor
+from filmapi.api.resources.comments import comment_data
 from filmapi.api.schemas import CommentSchema, FilmSchema
-from filmapi.services.film_service import FilmService
+from filmapi.services import comment_buffer
+from filmapi.services.comment_service import CommentService
+from filmapi.services.film_service import (
+    FILM_SORTS,
+    LIST_COLUMNS,
+    SIMILAR_COLUMNS,
+    FilmService,
+)
+from filmapi.services.generations import generations
 
 
-def key():
-    return f"films:{request.url}"
+def film_list_version():
+    return generations("films")
+
+
+def film_version(uuid: str):
+    film = db.session.query(Film.id, Film.updated_at).filter_by(uuid=uuid).first()
+    if film is None:
+        return None
+    # the detail shows the names of its actors and genres
+    linked = FilmService.fetch_linked_keys(db.session, film.id)
+    g.film_keys = [f"film:{uuid}", *linked, "plots"]
+    return film.updated_at, *generations(*g.film_keys)
+
+
+def film_list_keys():
+    return ["films"]
+
+
+def film_keys(uuid: str):
+    # "plots" is bumped when the description index is rebuilt
+    return g.get("film_keys", [f"film:{uuid}", "plots"])
+
+
+def similar_version(uuid: str):
+    if not db.session.query(Film.id).filter_by(uuid=uuid).first():
+        return None
+    return generations(*similar_keys(uuid))
+
+
+def similar_keys(uuid: str):
+    # neighbors are only rewritten by compute_similar_films
+    return ["similar", "films"]
+
+
+def similar_data(films):
+    """Similar films as listed, with their score"""
+    data = compiled(FilmSchema, SIMILAR_COLUMNS).dump(films, many=True)
+    for item, film in zip(data, films):
+        item["score"] = round(film.score, 4)
+    return data
 
 
 class FilmListResource(Resource):
@@ -54,9 +110,33 @@ class FilmListResource(Resource):
           schema:
             type: number
           description: Filter films by minimum rating
+        - in: query
+          name: sort
+          schema:
+            type: string
+            enum: [rating, -rating, release_date, -release_date, title, -title]
+          description: Sort key, prefixed with - for descending order. Unrated
+            films sort below every rating, ties are broken by creation order
+            (default is creation order)
+        - in: query
+          name: fields
+          schema:
+            type: string
+          description: Comma separated film fields to return, only those
+            columns are selected (default is title, uuid, title_original,
+            poster, rating, description and release_date)
       responses:
         200:
           description: List of films
+          headers:
+            X-Total-Count:
+              description: Number of films matching the filters
+              schema:
+                type: integer
+            X-Total-Count-Exact:
+              description: false when X-Total-Count is a planner estimate
+              schema:
+                type: boolean
           content:
             application/json:
               schema:
@@ -66,8 +146,12 @@ class FilmListResource(Resource):
                     type: array
                     items:
                       $ref: '#/components/schemas/Film'
+        304:
+          description: Not modified, the ETag sent in If-None-Match is current
         400:
-          description: Bad request, validation error in parameters
+          description: Bad request, validation error in parameters or unknown sort
+        429:
+          description: Too many requests, retry after Retry-After seconds
 
     post:
       tags:
@@ -97,8 +181,15 @@ class FilmListResource(Resource):
     """
 
     film_schema = FilmSchema()
+    # comment counts change without bumping the films generation
+    list_fields = tuple(
+        name for name in scalar_fields(FilmSchema, Film) if name != "comment_count"
+    )
 
-    @cache.cached(key_prefix=key)
+    @rate_limited("lists")
+    @cache_control("films", film_list_keys)
+    @conditional(film_list_version)
+    @precompressed
     def get(self):
         page = request.args.get("page", 0, type=int)
         offset = request.args.get("offset", 20, type=int)
@@ -106,8 +197,17 @@ class FilmListResource(Resource):
         year_from = request.args.get("year_from", type=int)
         year_to = request.args.get("year_to", type=int)
         rating_from = request.args.get("rating_from", type=float)
+        sort = request.args.get("sort")
         if offset > 60:
             return {"error": f"Offset must not be greater than {60}"}, 400
+        if sort is not None and sort.lstrip("-") not in FILM_SORTS:
+            return {"message": f"Unknown sort: {sort}"}, 400
+        try:
+            fields = requested_fields(self.list_fields, LIST_COLUMNS)
+        except ValidationError as e:
+            return {"message": str(e)}, 400
+        # uuids tag the page with the films it shows
+        columns = fields if "uuid" in fields else (*fields, "uuid")
         if genre:
             films = FilmService.fetch_films_by_genre(
                 db.session,
@@ -117,6 +217,8 @@ class FilmListResource(Resource):
                 year_from=year_from,
                 year_to=year_to,
                 rating_from=rating_from,
+                columns=columns,
+                sort=sort,
             )
         else:
             films = FilmService.fetch_all_films(
@@ -126,8 +228,15 @@ class FilmListResource(Resource):
                 year_from=year_from,
                 year_to=year_to,
                 rating_from=rating_from,
+                columns=columns,
+                sort=sort,
             )
-        return self.film_schema.dump(films, many=True), 200
+        rows = films.all()
+        headers = {
+            **total_headers(films, "films"),
+            **surrogate_key_header(f"film:{film.uuid}" for film in rows),
+        }
+        return compiled(FilmSchema, fields).dump(rows, many=True), 200, headers
 
     @jwt_required()
     def post(self):
@@ -156,6 +265,12 @@ class FilmResource(Resource):
           schema:
             type: string
           description: UUID of the film to retrieve
+        - in: query
+          name: fields
+          schema:
+            type: string
+          description: Comma separated film fields to return, actors and
+            genres are only loaded when listed (default is all fields)
       responses:
         200:
           description: A specific film
@@ -168,6 +283,8 @@ class FilmResource(Resource):
                     $ref: '#/components/schemas/FilmSchema'
                   comments:
                     type: array
+                    description: The latest comments, the others are
+                      paginated under /films/{uuid}/comments
                     items:
                       type: object
                       properties:
@@ -178,6 +295,23 @@ class FilmResource(Resource):
                           format: date-time
                         text:
                           type: string
+                  comment_count:
+                    type: integer
+                  related_by_plot:
+                    type: array
+                    description: Films with the closest descriptions, the
+                      index is updated periodically
+                    items:
+                      type: object
+                      properties:
+                        title:
+                          type: string
+                        uuid:
+                          type: string
+                        score:
+                          type: number
+        304:
+          description: Not modified, the ETag sent in If-None-Match is current
         404:
           description: Film not found
 
@@ -263,36 +397,47 @@ class FilmResource(Resource):
 
     film_schema = FilmSchema()
     comment_schema = CommentSchema()
+    detail_fields = tuple(film_schema.fields)
+    relationships = ("actors", "genres")
 
-    @cache.cached(key_prefix=key)
+    @cache_control("film", film_keys)
+    @conditional(film_version)
+    @precompressed
     def get(self, uuid: str):
+        try:
+            fields = requested_fields(self.detail_fields, self.detail_fields)
+        except ValidationError as e:
+            return {"message": str(e)}, 400
+        columns = (
+            getattr(Film, name) for name in fields if name not in self.relationships
+        )
+        options = [load_only(Film.id, Film.comment_count, *columns)]
+        options += [
+            selectinload(getattr(Film, name))
+            for name in self.relationships
+            if name in fields
+        ]
         film = (
-            FilmService.fetch_film_by_uuid(db.session, uuid)
-            .options(joinedload(Film.actors), joinedload(Film.genres))
-            .first()
+            FilmService.fetch_film_by_uuid(db.session, uuid).options(*options).first()
         )
-        try:
-            comments_for_film = (
-                db.session.query(Comments.text, Comments.created_at, User.username)
-                .join(User, User.id == Comments.user_id)
-                .filter(Comments.film_id == film.id)
-                .all()
-            )
-            comment_data = [
-                {
-                    "username": comment.username,
-                    "created_at": comment.created_at.isoformat(
-                        sep=" ", timespec="seconds"
-                    ),
-                    "text": comment.text,
-                }
-                for comment in comments_for_film
-            ]
-        except AttributeError:
-            pass
         if not film:
             return "", 404
-        return {"film": self.film_schema.dump(film), "comments": comment_data}, 200
+        embedded = current_app.config["COMMENTS_EMBEDDED"]
+        comments = CommentService.fetch_latest(db.session, film.id, embedded)
+        pending = comment_buffer.merge_pending(uuid, comments)
+        related = FilmService.fetch_similar_films(
+            db.session,
+            film.id,
+            current_app.config["PLOT_NEIGHBORS"],
+            neighbors=PlotNeighbor,
+        )
+        schema = compiled(FilmSchema, fields)
+        return {
+            "film": schema.dump(film),
+            "comments": comment_data([*pending, *comments][:embedded]),
+            "comment_count": film.comment_count + len(pending),
+            "related_by_plot": similar_data(related),
+        }, 200
 
     @jwt_required()
     def put(self, uuid: str):
@@ -348,3 +493,76 @@ class FilmResource(Resource):
         except Exception as e:
             print(f"Failed to delete film from database: {str(e)}")
         return "", 204
+
+
+class FilmSimilarResource(Resource):
+    """
+    Film Similar Resource
+
+    ---
+    get:
+      tags:
+        - film
+      summary: Get the films similar to a film
+      description: Get the films sharing most genres and cast with a film,
+        closest first. Similar films are recomputed periodically, a new film
+        has none until then.
+      parameters:
+        - in: path
+          name: uuid
+          schema:
+            type: string
+          description: UUID of the film
+        - in: query
+          name: limit
+          schema:
+            type: integer
+          description: Number of films to retrieve (default and maximum is 20)
+      responses:
+        200:
+          description: Similar films
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  films:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        title:
+                          type: string
+                        title_original:
+                          type: string
+                        uuid:
+                          type: string
+                        poster:
+                          type: string
+                        rating:
+                          type: number
+                        score:
+                          type: number
+                          description: Similarity, between 0 and 1
+        304:
+          description: Not modified, the ETag sent in If-None-Match is current
+        400:
+          description: Bad request, invalid limit
+        404:
+          description: Film not found
+    """
+
+    @cache_control("film", similar_keys)
+    @conditional(similar_version)
+    @precompressed
+    def get(self, uuid: str):
+        maximum = current_app.config["SIMILAR_FILMS"]
+        try:
+            limit = requested_limit(maximum, maximum)
+        except ValidationError as e:
+            return {"message": str(e)}, 400
+        film = db.session.query(Film.id).filter_by(uuid=uuid).first()
+        if not film:
+            return "", 404
+        films = FilmService.fetch_similar_films(db.session, film.id, limit)
+        return {"films": similar_data(films)}, 200
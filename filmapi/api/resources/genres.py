@@ -1,7 +1,20 @@
 from flask_restful import Resource
-from filmapi.models import Genre, MoviesGenres
-from filmapi.extensions import db, cache
+from filmapi.models import Genre
+from filmapi.extensions import db
 from filmapi.api.schemas import GenreSchema
+from filmapi.commons.cache_control import cache_control
+from filmapi.commons.compression import precompressed
+from filmapi.commons.conditional import conditional
+from filmapi.commons.serializers import compiled
+from filmapi.services.generations import generations
+
+
+def genre_list_version():
+    return generations("genres")
+
+
+def genre_list_keys():
+    return ["genres"]
 
 
 class GenreResource(Resource):
@@ -13,7 +26,7 @@ class GenreResource(Resource):
       tags:
         - genre
       summary: Get a list of movie genres
-      description: Get a list of movie genres.
+      description: Get the genres that have films, the most used first.
       responses:
         200:
           description: List of movie genres
@@ -28,18 +41,24 @@ class GenreResource(Resource):
                       type: integer
                     name:
                       type: string
+                    film_count:
+                      type: integer
+        304:
+          description: Not modified, the ETag sent in If-None-Match is current
         404:
           description: No genres found
     """
 
-    genre_schema = GenreSchema()
+    genre_serializer = compiled(GenreSchema)
 
-    @cache.cached()
+    @cache_control("genres", genre_list_keys)
+    @conditional(genre_list_version)
+    @precompressed
     def get(self):
         genres = (
-            db.session.query(Genre.id, Genre.name)
-            .join(MoviesGenres, MoviesGenres.genre_id == Genre.id)
-            .group_by(Genre.id)
+            db.session.query(Genre.id, Genre.name, Genre.film_count)
+            .filter(Genre.film_count > 0)
+            .order_by(Genre.film_count.desc(), Genre.id)
             .all()
         )
-        return self.genre_schema.dump(genres, many=True), 200
+        return self.genre_serializer.dump(genres, many=True), 200
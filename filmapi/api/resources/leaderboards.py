@@ -0,0 +1,106 @@
+from flask import current_app
+from flask_restful import Resource, request
+from marshmallow import ValidationError
+from sqlalchemy import func
+
+from filmapi.api.schemas import FilmSchema
+from filmapi.commons.cache_control import cache_control, surrogate_key_header
+from filmapi.commons.conditional import conditional
+from filmapi.commons.cursors import requested_limit
+from filmapi.commons.rate_limit import rate_limited
+from filmapi.commons.serializers import compiled
+from filmapi.extensions import db
+from filmapi.models import Genre
+from filmapi.services import leaderboards
+from filmapi.services.film_service import LIST_COLUMNS, FilmService
+from filmapi.services.generations import generations
+
+
+def leaderboard_keys():
+    # "leaderboards" is bumped when they are rebuilt
+    return ["films", "leaderboards"]
+
+
+def leaderboard_version():
+    return generations(*leaderboard_keys())
+
+
+class LeaderboardResource(Resource):
+    """
+    Leaderboard Resource
+
+    ---
+    get:
+      tags:
+        - film
+      summary: Get the highest rated films
+      description: Get the highest rated films of the catalog, of a genre, of
+        a decade or of a genre in a decade, best first. Unrated films are
+        left out.
+      parameters:
+        - in: query
+          name: genre
+          schema:
+            type: string
+          description: Name of the genre
+        - in: query
+          name: decade
+          schema:
+            type: integer
+          description: First year of the decade, such as 1990
+        - in: query
+          name: limit
+          schema:
+            type: integer
+          description: Number of films to retrieve (default is 10, maximum is 100)
+      responses:
+        200:
+          description: Highest rated films
+          content:
+            application/json:
+              schema:
+                type: array
+                items:
+                  $ref: '#/components/schemas/Film'
+        304:
+          description: Not modified, the ETag sent in If-None-Match is current
+        400:
+          description: Bad request, invalid decade or limit
+        404:
+          description: Genre not found
+        429:
+          description: Too many requests, retry after Retry-After seconds
+    """
+
+    @rate_limited("lists")
+    @cache_control("films", leaderboard_keys)
+    @conditional(leaderboard_version)
+    def get(self):
+        genre = request.args.get("genre", type=str)
+        decade = request.args.get("decade", type=int)
+        try:
+            limit = requested_limit(
+                current_app.config["LEADERBOARD_SIZE"],
+                current_app.config["LEADERBOARD_MAX_SIZE"],
+            )
+        except ValidationError as e:
+            return {"message": str(e)}, 400
+        if decade is not None and decade % 10:
+            return {"message": "Decade must be a multiple of 10"}, 400
+        genre_id = None
+        if genre:
+            genre_id = (
+                db.session.query(Genre.id)
+                .filter(func.lower(Genre.name) == genre.lower())
+                .order_by(Genre.id)
+                .limit(1)
+                .scalar()
+            )
+            if genre_id is None:
+                return {"message": "Genre not found"}, 404
+        ranked = leaderboards.top(genre_id, decade, limit)
+        films = FilmService.fetch_films_by_id(
+            db.session, [film_id for film_id, _ in ranked]
+        )
+        data = compiled(FilmSchema, LIST_COLUMNS).dump(films, many=True)
+        return data, 200, surrogate_key_header(f"film:{film.uuid}" for film in films)
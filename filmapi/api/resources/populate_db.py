@@ -1,9 +1,19 @@
+from flask import current_app
 from flask_restful import Resource, request
 from flask_jwt_extended import jwt_required
 
-from filmapi.extensions import db, es
-from filmapi.models import Film, Actor, Genre, MoviesActors, MoviesGenres, Comments
-from filmapi.tasks.parser import parse_imdb_data
+from filmapi.tasks.catalog import reset_catalog
+from filmapi.tasks.locks import submit_once
+from filmapi.tasks.parser import parse_imdb_data, populate_lock_name
+
+
+def submit_population(link=None):
+    return submit_once(
+        parse_imdb_data,
+        populate_lock_name(link),
+        current_app.config["POPULATE_LOCK_TTL"],
+        *([link] if link else []),
+    )
 
 
 class PopulateDbResource(Resource):
@@ -16,9 +26,21 @@ class PopulateDbResource(Resource):
         - database
       summary: Populate the database with movies
       description: Populate the database with movies by scraping movie data.
+        While a population run is in progress, further requests return the
+        id of the running task instead of starting another one.
       responses:
         200:
-          description: Database populated successfully.
+          description: Database population task started or already running,
+            its progress is available at /tasks/{task_id}.
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  message:
+                    type: string
+                  task_id:
+                    type: string
         500:
           description: Internal server error
 
@@ -27,6 +49,8 @@ class PopulateDbResource(Resource):
         - database
       summary: Add a single movie to the database
       description: Add a single movie to the database by providing a movie link in the request body.
+        Requests for a link that is already being parsed return the id of the
+        running task.
       requestBody:
         required: true
         content:
@@ -40,7 +64,17 @@ class PopulateDbResource(Resource):
                 - link
       responses:
         200:
-          description: Movie added successfully.
+          description: Movie parsing task started or already running, its
+            progress is available at /tasks/{task_id}.
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  message:
+                    type: string
+                  task_id:
+                    type: string
         400:
           description: Bad request, invalid movie link provided.
         500:
@@ -50,33 +84,44 @@ class PopulateDbResource(Resource):
       tags:
         - database
       summary: Clear the database
-      description: Clear all data from the database, including movies, actors, and genres.
+      description: Start a background task clearing all data from the database,
+        including movies, actors, genres and the search index.
       responses:
-        204:
-          description: Database cleared successfully.
+        202:
+          description: Database clearing task started.
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  message:
+                    type: string
+                  task_id:
+                    type: string
         500:
           description: Internal server error
     """
 
     @jwt_required()
     def get(self):
-        parse_imdb_data.delay()
-        return {"message": "Database population task started."}
+        task_id, started = submit_population()
+        if not started:
+            message = "Database population task already running."
+        else:
+            message = "Database population task started."
+        return {"message": message, "task_id": task_id}
 
     @jwt_required()
     def post(self):
         link = request.get_json().get("link")
-        parse_imdb_data.delay(link)
-        return {"message": f"Film parsing task started for URL: {link}"}
+        task_id, started = submit_population(link)
+        if not started:
+            message = f"Film parsing task already running for URL: {link}"
+        else:
+            message = f"Film parsing task started for URL: {link}"
+        return {"message": message, "task_id": task_id}
 
     @jwt_required()
     def delete(self):
-        es.indices.delete(index="films")
-        db.session.query(MoviesActors).delete()
-        db.session.query(MoviesGenres).delete()
-        db.session.query(Comments).delete()
-        db.session.query(Actor).delete()
-        db.session.query(Genre).delete()
-        db.session.query(Film).delete()
-        db.session.commit()
-        return "", 204
+        result = reset_catalog.delay()
+        return {"message": "Database clearing task started.", "task_id": result.id}, 202
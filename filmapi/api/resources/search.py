@@ -1,7 +1,13 @@
 from flask_restful import Resource, request
+from filmapi.commons.cache_control import cache_control, surrogate_key_header
+from filmapi.commons.rate_limit import rate_limited
 from filmapi.extensions import es
 
 
+def search_keys():
+    return ["films"]
+
+
 class SearchResource(Resource):
     """
     Search Resource
@@ -37,8 +43,12 @@ class SearchResource(Resource):
                       type: string
         404:
           description: Error, film not found
+        429:
+          description: Too many requests, retry after Retry-After seconds
     """
 
+    @rate_limited("search")
+    @cache_control("search", search_keys)
     def get(self):
         query = request.args.get("query")
         if not query:
@@ -58,4 +68,6 @@ class SearchResource(Resource):
             )
         except Exception as ex:
             return f"Error, {ex}", 404
-        return [hit["_source"] for hit in results["hits"]["hits"]], 200
+        films = [hit["_source"] for hit in results["hits"]["hits"]]
+        keys = (f"film:{film['uuid']}" for film in films if "uuid" in film)
+        return films, 200, surrogate_key_header(keys)
@@ -0,0 +1,98 @@
+from celery.result import AsyncResult
+from flask_jwt_extended import jwt_required
+from flask_restful import Resource
+
+from filmapi.extensions import celery
+from filmapi.tasks.progress import TaskProgress
+
+
+class TaskResource(Resource):
+    """
+    Task Resource
+
+    ---
+    get:
+      tags:
+        - database
+      summary: Get the status of a background task
+      description: Get the state of a populate, crawl or reset task. Scraping
+        pipelines also report how many films were discovered, fetched, parsed
+        and stored, their throughput in films per second and an ETA in seconds.
+      parameters:
+        - in: path
+          name: task_id
+          schema:
+            type: string
+          description: Task id returned when the task was started
+      responses:
+        200:
+          description: Task status
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  task_id:
+                    type: string
+                  state:
+                    type: string
+                    example: PROGRESS
+                  progress:
+                    type: object
+                    nullable: true
+                    properties:
+                      discovered:
+                        type: integer
+                      fetched:
+                        type: integer
+                      parsed:
+                        type: integer
+                      inserted:
+                        type: integer
+                      updated:
+                        type: integer
+                      finished:
+                        type: boolean
+                      failed:
+                        type: boolean
+                        description: true when a chunk or the saving of the
+                          films failed, the state is then FAILURE
+                      error:
+                        type: string
+                        nullable: true
+                      elapsed:
+                        type: number
+                      throughput:
+                        type: number
+                      eta:
+                        type: number
+                        nullable: true
+                  result:
+                    nullable: true
+    """
+
+    @jwt_required()
+    def get(self, task_id: str):
+        result = AsyncResult(task_id, app=celery)
+        state = result.state
+        progress = TaskProgress(task_id).snapshot()
+        if progress is not None and state != "FAILURE":
+            if progress["failed"]:
+                state = "FAILURE"
+            else:
+                state = "SUCCESS" if progress["finished"] else "PROGRESS"
+
+        if result.failed():
+            outcome = str(result.result)
+        elif progress is not None and progress["failed"]:
+            outcome = progress["error"]
+        elif result.successful():
+            outcome = result.result
+        else:
+            outcome = None
+        return {
+            "task_id": task_id,
+            "state": state,
+            "progress": progress,
+            "result": outcome,
+        }, 200
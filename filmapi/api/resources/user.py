@@ -5,6 +5,7 @@ from filmapi.api.schemas import UserSchema
 from filmapi.models import User
 from filmapi.extensions import db
 from filmapi.commons.pagination import paginate
+from filmapi.commons.serializers import compiled
 
 
 class UserResource(Resource):
@@ -86,11 +87,10 @@ class UserResource(Resource):
     method_decorators = [jwt_required()]
 
     def get(self, user_id):
-        schema = UserSchema()
         user = db.session.get(User, user_id)
         if user is None:
             abort(404)
-        return {"user": schema.dump(user)}
+        return {"user": compiled(UserSchema).dump(user)}
 
     def put(self, user_id):
         schema = UserSchema(partial=True)
@@ -160,9 +160,8 @@ class UserList(Resource):
 
     @jwt_required()
     def get(self):
-        schema = UserSchema(many=True)
         query = User.query
-        return paginate(query, schema)
+        return paginate(query, compiled(UserSchema, many=True), ("users",))
 
     def post(self):
         schema = UserSchema()
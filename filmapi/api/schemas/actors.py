@@ -6,6 +6,8 @@ from filmapi.models import Actor
 class ActorSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Actor
+        exclude = ("updated_at",)
+        dump_only = ("film_count",)
         include_fk = True
         load_instance = True
         sqla_session = db.session
@@ -6,12 +6,15 @@ from filmapi.models import Film
 class FilmSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Film
-        exclude = ["id"]
+        exclude = ["id", "updated_at", "imdb_id"]
+        dump_only = ("comment_count",)
         include_fk = True
         load_instance = True
         sqla_session = db.session
 
     actors = Nested(
-        "ActorSchema", many=True, exclude=("films", "id", "birthday", "is_active")
+        "ActorSchema",
+        many=True,
+        exclude=("films", "id", "birthday", "is_active", "film_count"),
     )
-    genres = Nested("GenreSchema", many=True, exclude=("films", "id"))
+    genres = Nested("GenreSchema", many=True, exclude=("films", "id", "film_count"))
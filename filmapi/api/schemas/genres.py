@@ -9,6 +9,7 @@ class GenreSchema(ma.SQLAlchemyAutoSchema):
         model = Genre
         load_instance = True
         include_fk = True
+        dump_only = ("film_count",)
         sqla_session = db.session
 
     films = Nested("FilmSchema", many=True)
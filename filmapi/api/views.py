@@ -5,28 +5,57 @@ from filmapi.api.resources import (
     UserResource,
     UserList,
     FilmResource,
+    FilmSimilarResource,
     ActorResource,
+    ActorFilmsResource,
+    ActorCostarsResource,
+    ActorPathResource,
     GenreResource,
     CommentResource,
+    LeaderboardResource,
     FilmListResource,
     ActorListResource,
     PopulateDbResource,
     SearchResource,
+    TaskResource,
 )
+from filmapi.commons.representations import output_json
 
 
 blueprint = Blueprint("api", __name__, url_prefix="/api/v1")
 api = Api(blueprint)
+api.representation("application/json")(output_json)
 
 api.add_resource(UserResource, "/users/<int:user_id>", endpoint="user_by_id")
 api.add_resource(UserList, "/users", endpoint="users")
 api.add_resource(
     FilmResource, "/films/<string:uuid>", endpoint="film_by_uuid", strict_slashes=False
 )
+api.add_resource(
+    FilmSimilarResource,
+    "/films/<string:uuid>/similar",
+    endpoint="film_similar",
+    strict_slashes=False,
+)
 api.add_resource(FilmListResource, "/films", endpoint="films", strict_slashes=False)
 api.add_resource(
     ActorResource, "/actors/<int:id>", endpoint="actor_id", strict_slashes=False
 )
+api.add_resource(
+    ActorFilmsResource,
+    "/actors/<int:id>/films",
+    endpoint="actor_films",
+    strict_slashes=False,
+)
+api.add_resource(
+    ActorCostarsResource,
+    "/actors/<int:id>/costars",
+    endpoint="actor_costars",
+    strict_slashes=False,
+)
+api.add_resource(
+    ActorPathResource, "/actors/path", endpoint="actor_path", strict_slashes=False
+)
 api.add_resource(ActorListResource, "/actors", endpoint="actors", strict_slashes=False)
 api.add_resource(GenreResource, "/genres", endpoint="genres", strict_slashes=False)
 api.add_resource(
@@ -41,7 +70,13 @@ api.add_resource(
     endpoint="populate_db",
     strict_slashes=False,
 )
+api.add_resource(
+    LeaderboardResource, "/leaderboards", endpoint="leaderboards", strict_slashes=False
+)
 api.add_resource(SearchResource, "/search", endpoint="search", strict_slashes=False)
+api.add_resource(
+    TaskResource, "/tasks/<string:task_id>", endpoint="task_by_id", strict_slashes=False
+)
 
 
 @blueprint.errorhandler(ValidationError)
@@ -1,5 +1,6 @@
 from flask import Flask
 from flask_sqlalchemy import record_queries
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from filmapi import api
 from filmapi import auth
@@ -9,12 +10,18 @@ from filmapi.api.resources import (
     UserResource,
     ActorResource,
     CommentResource,
+    LeaderboardResource,
     FilmResource,
+    FilmSimilarResource,
     GenreResource,
     FilmListResource,
     ActorListResource,
+    ActorFilmsResource,
+    ActorCostarsResource,
+    ActorPathResource,
     PopulateDbResource,
     SearchResource,
+    TaskResource,
 )
 from filmapi.api.schemas import (
     GenreSchema,
@@ -25,6 +32,8 @@ from filmapi.api.schemas import (
 )
 from filmapi.auth.views import login, refresh, revoke_access_token, revoke_refresh_token
 from filmapi.extensions import apispec, cache, db, jwt, migrate, celery
+from filmapi.services.generations import on_publish
+from filmapi.tasks.cdn import purge_changed_keys
 
 
 def create_app(testing=False):
@@ -35,6 +44,7 @@ def create_app(testing=False):
         app.config["TESTING"] = True
         app.config["CACHE_TYPE"] = "null"
     configure_extensions(app)
+    configure_proxies(app)
     configure_cli(app)
     configure_apispec(app)
     register_blueprints(app)
@@ -57,11 +67,17 @@ def create_app(testing=False):
         apispec.spec.path(view=CommentResource, app=app)
         apispec.spec.path(view=ActorListResource, app=app)
         apispec.spec.path(view=ActorResource, app=app)
+        apispec.spec.path(view=ActorFilmsResource, app=app)
+        apispec.spec.path(view=ActorCostarsResource, app=app)
+        apispec.spec.path(view=ActorPathResource, app=app)
         apispec.spec.path(view=FilmListResource, app=app)
         apispec.spec.path(view=FilmResource, app=app)
+        apispec.spec.path(view=FilmSimilarResource, app=app)
         apispec.spec.path(view=GenreResource, app=app)
+        apispec.spec.path(view=LeaderboardResource, app=app)
         apispec.spec.path(view=PopulateDbResource, app=app)
         apispec.spec.path(view=SearchResource, app=app)
+        apispec.spec.path(view=TaskResource, app=app)
     return app
 
 
@@ -71,11 +87,22 @@ def configure_extensions(app):
     jwt.init_app(app)
     migrate.init_app(app, db)
     cache.init_app(app)
+    on_publish(purge_changed_keys)
+
+
+def configure_proxies(app):
+    """Take the client address and scheme from trusted reverse proxies"""
+    proxies = app.config["TRUSTED_PROXIES"]
+    if proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
 
 
 def configure_cli(app):
     """Configure Flask 2.0's cli for easy entity management"""
     app.cli.add_command(manage.init)
+    app.cli.add_command(manage.crawl)
+    app.cli.add_command(manage.import_imdb_tsv)
+    app.cli.add_command(manage.rebuild_leaderboards)
 
 
 def configure_apispec(app):
@@ -89,6 +116,7 @@ def configure_apispec(app):
         {
             "properties": {
                 "total": {"type": "integer"},
+                "total_exact": {"type": "boolean"},
                 "pages": {"type": "integer"},
                 "next": {"type": "string"},
                 "prev": {"type": "string"},
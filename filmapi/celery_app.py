@@ -1,4 +1,10 @@
 from filmapi.app import init_celery
 
 app = init_celery()
-app.conf.imports = app.conf.imports + ("filmapi.tasks.example", "filmapi.tasks.parser")
+app.conf.imports = app.conf.imports + (
+    "filmapi.tasks.example",
+    "filmapi.tasks.parser",
+    "filmapi.tasks.catalog",
+    "filmapi.tasks.cdn",
+    "filmapi.tasks.comments",
+)
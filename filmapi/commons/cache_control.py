@@ -0,0 +1,72 @@
+"""Cache-Control and Surrogate-Key headers for CDN offload
+
+Public GET resources declare a policy from ``CACHE_POLICIES`` and the
+surrogate keys of a response. Keys name the films, actors and genres a
+response was built from, the same keys writes publish on commit, so the
+CDN can cache responses for long and drop exactly the affected ones.
+Every response also carries ``ALL_SURROGATE_KEY``, which only a reset of
+the whole catalog publishes.
+
+Views add the keys of the entities on a page with ``surrogate_key_header``.
+Precompressed responses store that header in their cache entry, so hits
+are tagged like the response that filled it.
+"""
+from functools import wraps
+
+from flask import Response, current_app
+from flask_restful.utils import unpack
+
+ALL_SURROGATE_KEY = "all"
+SURROGATE_KEY = "Surrogate-Key"
+
+
+def cache_control_header(policy):
+    settings = current_app.config["CACHE_POLICIES"][policy]
+    directives = ["public", f"max-age={settings['max_age']}"]
+    if "s_maxage" in settings:
+        directives.append(f"s-maxage={settings['s_maxage']}")
+    if "stale_while_revalidate" in settings:
+        directives.append(
+            f"stale-while-revalidate={settings['stale_while_revalidate']}"
+        )
+    return ", ".join(directives)
+
+
+def surrogate_key_header(keys):
+    """Header tagging a response with ``keys``, merged by ``cache_control``"""
+    return {SURROGATE_KEY: " ".join(dict.fromkeys(keys))}
+
+
+def cache_control(policy, surrogate_keys=None):
+    """Add the headers of ``policy`` to successful responses of a GET method
+
+    ``surrogate_keys`` receives the view arguments and returns the keys
+    tagging the response, in front of those the view tagged it with.
+    """
+
+    def policy_headers(page_keys, *args, **kwargs):
+        headers = {"Cache-Control": cache_control_header(policy)}
+        if surrogate_keys is not None:
+            keys = [*surrogate_keys(*args, **kwargs), *page_keys.split()]
+            headers.update(surrogate_key_header([*keys, ALL_SURROGATE_KEY]))
+        return headers
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(resource, *args, **kwargs):
+            rv = view(resource, *args, **kwargs)
+            if isinstance(rv, Response):
+                if rv.status_code in (200, 304):
+                    page_keys = rv.headers.get(SURROGATE_KEY, "")
+                    rv.headers.update(policy_headers(page_keys, *args, **kwargs))
+                return rv
+            data, code, headers = unpack(rv)
+            if code == 200:
+                headers = dict(headers or {})
+                page_keys = headers.get(SURROGATE_KEY, "")
+                headers.update(policy_headers(page_keys, *args, **kwargs))
+            return data, code, headers
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,77 @@
+"""Precompressed response bodies
+
+Versioned GET responses (see ``conditional``) are encoded and compressed
+once, when their cache entry is filled. The identity body and its gzip
+and brotli variants are stored together under the ETag, and later hits
+are answered with the variant matching ``Accept-Encoding`` without
+running the view, encoding JSON or compressing again. Brotli is only
+offered when the ``brotli`` package is installed.
+"""
+import gzip
+from functools import wraps
+
+from flask import Response, current_app, g, request
+from flask_restful.utils import unpack
+
+from filmapi.commons.representations import dumps
+from filmapi.extensions import cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# preferred first, when the client accepts both with the same quality
+ENCODINGS = ("br", "gzip")
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=current_app.config["BROTLI_QUALITY"])
+    return gzip.compress(body, compresslevel=current_app.config["GZIP_LEVEL"])
+
+
+def build_entry(data, headers):
+    """Identity body of ``data`` with every compressed variant worth storing"""
+    body = dumps(data, indent=current_app.debug)
+    entry = {"headers": dict(headers or {}), "identity": body}
+    if len(body) >= current_app.config["COMPRESSION_MIN_SIZE"]:
+        for encoding in ENCODINGS:
+            if encoding != "br" or brotli is not None:
+                entry[encoding] = compress(body, encoding)
+    return entry
+
+
+def respond(entry):
+    offered = [encoding for encoding in ENCODINGS if encoding in entry]
+    encoding = request.accept_encodings.best_match(
+        [*offered, "identity"], default="identity"
+    )
+    response = Response(
+        entry[encoding], headers=entry["headers"], content_type="application/json"
+    )
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def precompressed(view):
+    """Serve the GET method of a versioned resource from compressed entries"""
+
+    @wraps(view)
+    def wrapper(resource, *args, **kwargs):
+        etag = g.get("etag")
+        if etag is None:
+            return view(resource, *args, **kwargs)
+        key = f"response:{etag}"
+        entry = cache.get(key)
+        if entry is None:
+            data, code, headers = unpack(view(resource, *args, **kwargs))
+            if code != 200:
+                return data, code, headers
+            entry = build_entry(data, headers)
+            cache.set(key, entry, timeout=current_app.config["RESPONSE_CACHE_TIMEOUT"])
+        return respond(entry)
+
+    return wrapper
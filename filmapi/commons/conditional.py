@@ -0,0 +1,66 @@
+"""Conditional GET with strong ETags
+
+A resource declares how to compute its version cheaply, typically one
+indexed lookup of ``updated_at`` plus generation counters. The ETag is
+derived from that version and the request path, so ``If-None-Match`` is
+answered with ``304 Not Modified`` before the view, its cache lookup or
+its queries run. The ETag is kept on ``flask.g`` for cache keys, so cached
+bodies never outlive the version they were rendered for. Compressed
+bodies get the content coding appended to their ETag.
+"""
+import hashlib
+from functools import wraps
+
+from flask import Response, g, request
+from flask_restful.utils import unpack
+from werkzeug.http import quote_etag
+
+
+VARIANTS = ("identity", "gzip", "br")
+
+
+def make_etag(version):
+    parts = [*map(str, version), request.full_path]
+    return hashlib.sha1("\x1f".join(parts).encode()).hexdigest()
+
+
+def variant_etag(etag, encoding=None):
+    if encoding in (None, "identity"):
+        return etag
+    return f"{etag}-{encoding}"
+
+
+def conditional(version):
+    """Honor ``If-None-Match`` for the GET method of a resource
+
+    ``version`` receives the view arguments and returns the parts that
+    identify the current representation, or ``None`` when the resource
+    does not exist.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(resource, *args, **kwargs):
+            current = version(*args, **kwargs)
+            if current is None:
+                return view(resource, *args, **kwargs)
+            etag = g.etag = make_etag(current)
+            for encoding in VARIANTS:
+                tag = variant_etag(etag, encoding)
+                if request.if_none_match.contains_weak(tag):
+                    headers = {"ETag": quote_etag(tag), "Vary": "Accept-Encoding"}
+                    return Response(status=304, headers=headers)
+            rv = view(resource, *args, **kwargs)
+            if isinstance(rv, Response):
+                if rv.status_code == 200:
+                    encoding = rv.headers.get("Content-Encoding")
+                    rv.headers["ETag"] = quote_etag(variant_etag(etag, encoding))
+                return rv
+            data, code, headers = unpack(rv)
+            if code == 200:
+                headers = {**dict(headers or {}), "ETag": quote_etag(etag)}
+            return data, code, headers
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,62 @@
+"""Opaque cursors for keyset pagination
+
+A cursor holds the sort key of the last row of a page. The next page is
+read with a range condition on that key, which an index serves directly,
+instead of an ``OFFSET`` that scans and discards every earlier row.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from flask import request
+from marshmallow import ValidationError
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(*values):
+    data = json.dumps(values, default=_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, *types):
+    """Values of ``token`` converted with ``types``, one per value"""
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(data)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(token)
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (ValueError, TypeError):
+        raise ValidationError("Invalid cursor", "cursor")
+
+
+def requested_limit(default, maximum):
+    """Page size from ``limit=``, between 1 and ``maximum``"""
+    limit = request.args.get("limit", default, type=int)
+    if not 0 < limit <= maximum:
+        raise ValidationError(f"Limit must be between 1 and {maximum}", "limit")
+    return limit
+
+
+def requested_cursor(*types):
+    """Values of the ``cursor=`` parameter, ``None`` on the first page"""
+    if "cursor" not in request.args:
+        return None
+    return decode_cursor(request.args["cursor"], *types)
+
+
+def paginate_rows(rows, limit, key):
+    """Page of ``rows`` fetched with ``limit + 1``, and the cursor after it
+
+    ``key`` returns the sort key of a row. The cursor is ``None`` on the
+    last page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
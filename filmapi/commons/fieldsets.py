@@ -0,0 +1,29 @@
+"""Sparse fieldsets requested with the ``fields`` query parameter
+
+``?fields=title,uuid,poster`` restricts a response to the listed fields.
+Resources use the validated names both to narrow the columns they select
+and to build a serializer dumping only those fields.
+"""
+from flask import request
+from marshmallow import ValidationError
+
+
+def requested_fields(allowed, default):
+    """Field names from ``fields=``, ``default`` if the parameter is absent"""
+    value = request.args.get("fields")
+    if value is None:
+        return tuple(default)
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(",")))
+    fields = tuple(name for name in fields if name)
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValidationError(f"Unknown fields: {', '.join(unknown)}", "fields")
+    if not fields:
+        raise ValidationError("At least one field is required", "fields")
+    return fields
+
+
+def scalar_fields(schema_class, model):
+    """Schema fields that map to columns of ``model``"""
+    columns = model.__table__.columns
+    return tuple(name for name in schema_class().fields if name in columns)
@@ -1,6 +1,19 @@
 """Simple helper to paginate query
+
+Totals are counted once per filter combination and cached, until the
+generations of the keys given by the caller move. On Postgres, queries the
+planner expects to return more than ``PAGINATION_ESTIMATE_THRESHOLD`` rows
+are not counted at all, the planner estimate is returned instead and
+flagged as such. Estimates are cached like counts, so a cached total costs
+no query at all.
 """
-from flask import url_for, request
+import hashlib
+import math
+
+from flask import current_app, url_for, request
+
+from filmapi.extensions import cache
+from filmapi.services.generations import generations
 
 DEFAULT_PAGE_SIZE = 50
 DEFAULT_PAGE_NUMBER = 1
@@ -12,27 +25,79 @@ def extract_pagination(page=None, per_page=None, **request_args):
     return page, per_page, request_args
 
 
-def paginate(query, schema):
+def estimate_rows(query):
+    """Planner estimate of the rows returned by ``query``, Postgres only"""
+    connection = query.session.connection()
+    if connection.dialect.name != "postgresql":
+        return None
+    compiled = query.statement.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_cache_key(query, keys=()):
+    compiled = query.statement.compile()
+    params = sorted((name, repr(value)) for name, value in compiled.params.items())
+    digest = hashlib.sha1(f"{compiled}{params}".encode()).hexdigest()
+    versions = ":".join(map(str, generations(*keys))) if keys else ""
+    return f"count:{digest}:{versions}"
+
+
+def count_total(query, keys=()):
+    """Total rows of ``query`` ignoring its limits, and whether it is exact
+
+    ``keys`` are the generations whose writes change the total.
+    """
+    query = query.limit(None).offset(None).order_by(None)
+    key = count_cache_key(query, keys)
+    cached = cache.get(key)
+    if cached is not None:
+        return tuple(cached)
+    estimate = estimate_rows(query)
+    if (
+        estimate is not None
+        and estimate >= current_app.config["PAGINATION_ESTIMATE_THRESHOLD"]
+    ):
+        total = estimate, False
+    else:
+        total = query.count(), True
+    cache.set(key, total, timeout=current_app.config["PAGINATION_COUNT_TIMEOUT"])
+    return total
+
+
+def total_headers(query, *keys):
+    """Headers carrying the total of a list returned without an envelope"""
+    total, exact = count_total(query, keys)
+    return {"X-Total-Count": str(total), "X-Total-Count-Exact": str(exact).lower()}
+
+
+def paginate(query, schema, keys=()):
+    """A page of ``query`` with its total, ``keys`` as in ``count_total``"""
     page, per_page, other_request_args = extract_pagination(**request.args)
-    page_obj = query.paginate(page=page, per_page=per_page)
+    total, exact = count_total(query, keys)
+    page_obj = query.paginate(page=page, per_page=per_page, count=False)
+    pages = math.ceil(total / per_page) if per_page else 0
     next_ = url_for(
         request.endpoint,
-        page=page_obj.next_num if page_obj.has_next else page_obj.page,
+        page=page + 1 if page < pages else page,
         per_page=per_page,
         **other_request_args,
-        **request.view_args
+        **request.view_args,
     )
     prev = url_for(
         request.endpoint,
-        page=page_obj.prev_num if page_obj.has_prev else page_obj.page,
+        page=page - 1 if page > 1 else page,
         per_page=per_page,
         **other_request_args,
-        **request.view_args
+        **request.view_args,
     )
 
     return {
-        "total": page_obj.total,
-        "pages": page_obj.pages,
+        "total": total,
+        "total_exact": exact,
+        "pages": pages,
         "next": next_,
         "prev": prev,
         "results": schema.dump(page_obj.items),
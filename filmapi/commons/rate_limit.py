@@ -0,0 +1,108 @@
+"""Per client rate limiting with Redis token buckets
+
+Every endpoint class of ``RATE_LIMITS`` gives each client a bucket of
+``capacity`` tokens refilled at ``per_second`` tokens per second, and a
+request spends one token. Clients are told apart by the identity of their
+JWT, or by their address when they send none, taken from
+``X-Forwarded-For`` behind ``TRUSTED_PROXIES`` reverse proxies. Buckets are updated by one
+Lua script, atomically and in a single round trip, using the Redis clock
+so every application server agrees on the refill. Responses carry
+``RateLimit-Limit``, ``RateLimit-Remaining`` and ``RateLimit-Reset``, and
+rejected ones ``Retry-After`` too. If Redis is unreachable, requests are
+let through.
+"""
+import math
+from functools import wraps
+
+from flask import Response, current_app, request
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from flask_restful.utils import unpack
+from jwt.exceptions import PyJWTError
+from redis.exceptions import RedisError
+
+from filmapi.extensions import redis_client
+
+TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+token_bucket = redis_client.register_script(TOKEN_BUCKET)
+
+
+def client_key():
+    """The JWT identity of the request, its remote address without one"""
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            claims = decode_token(token)
+        except (PyJWTError, JWTExtendedException):
+            pass
+        else:
+            return f"user:{claims[current_app.config['JWT_IDENTITY_CLAIM']]}"
+    return f"ip:{request.remote_addr}"
+
+
+def take(name, client):
+    """Spend a token of ``client`` for the ``name`` endpoint class
+
+    Returns whether the request is allowed and its rate limit headers.
+    """
+    limit = current_app.config["RATE_LIMITS"][name]
+    capacity, rate = limit["capacity"], limit["per_second"]
+    allowed, tokens = token_bucket(
+        keys=[f"rate-limit:{name}:{client}"], args=[capacity, rate]
+    )
+    tokens = float(tokens)
+    headers = {
+        "RateLimit-Limit": str(capacity),
+        "RateLimit-Remaining": str(math.floor(tokens)),
+        "RateLimit-Reset": str(math.ceil((capacity - tokens) / rate)),
+    }
+    if not allowed:
+        headers["Retry-After"] = str(math.ceil((1 - tokens) / rate))
+    return bool(allowed), headers
+
+
+def _with_headers(rv, headers):
+    if isinstance(rv, Response):
+        rv.headers.update(headers)
+        return rv
+    data, code, rv_headers = unpack(rv)
+    return data, code, {**dict(rv_headers or {}), **headers}
+
+
+def rate_limited(name):
+    """Limit a resource method with the ``name`` bucket of ``RATE_LIMITS``"""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(resource, *args, **kwargs):
+            if not current_app.config["RATE_LIMIT_ENABLED"]:
+                return view(resource, *args, **kwargs)
+            try:
+                allowed, headers = take(name, client_key())
+            except RedisError:
+                return view(resource, *args, **kwargs)
+            if not allowed:
+                return {"message": "Too many requests"}, 429, headers
+            return _with_headers(view(resource, *args, **kwargs), headers)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,117 @@
+"""Serializers compiled from marshmallow schemas
+
+``Schema.dump`` resolves fields, accessors and hooks for every value it
+serializes. For read paths the schema is fixed once ``only`` and
+``exclude`` are applied, so ``compile_schema`` generates the source of a
+function dumping exactly those fields, nested schemas included, and
+``exec``s it once. The generated function returns the same data as
+``schema.dump``. Fields without a fast equivalent keep using their own
+``serialize`` method.
+"""
+import datetime as dt
+from collections.abc import Mapping
+from functools import lru_cache
+
+from marshmallow import fields, missing, utils
+
+DUMP_HOOKS = ("pre_dump", "post_dump")
+
+
+def _get_item(obj, key, default):
+    return obj.get(key, default)
+
+
+class CompiledSerializer:
+    """Drop-in replacement for ``schema.dump`` on read paths"""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.many = schema.many
+        self._dump_one = _compile(schema)
+
+    def dump(self, obj, many=None):
+        many = self.many if many is None else many
+        if many:
+            dump_one = self._dump_one
+            return [dump_one(item) for item in obj]
+        return self._dump_one(obj)
+
+
+def _has_dump_hooks(schema):
+    return any(
+        schema._hooks.get((tag, many)) for tag in DUMP_HOOKS for many in (True, False)
+    )
+
+
+def _value_expression(field, name, namespace):
+    """Expression serializing ``value`` the way ``field`` would"""
+    if isinstance(field, fields.Nested):
+        namespace[f"nested_{name}"] = _compile(field.schema)
+        if field.many or field.schema.many:
+            return f"[nested_{name}(item) for item in value]"
+        return f"nested_{name}(value)"
+    if type(field) in (fields.String, fields.Str):
+        return "value if value.__class__ is str else _ensure_text(value)"
+    if type(field) in (fields.Integer, fields.Float) and not field.as_string:
+        namespace[f"num_{name}"] = field.num_type
+        return f"num_{name}(value)"
+    if type(field) is fields.Date and field.format in (None, "iso", "iso8601"):
+        return "_date_isoformat(value)"
+    if type(field) is fields.DateTime and field.format in (None, "iso", "iso8601"):
+        return "value.isoformat()"
+    return None
+
+
+def _compile(schema):
+    if _has_dump_hooks(schema):
+        return lambda obj: schema.dump(obj, many=False)
+
+    namespace = {
+        "_date_isoformat": dt.date.isoformat,
+        "_missing": missing,
+        "_Mapping": Mapping,
+        "_getattr": getattr,
+        "_get_item": _get_item,
+        "_ensure_text": utils.ensure_text_type,
+    }
+    lines = [
+        "def dump(obj):",
+        "    get = _get_item if isinstance(obj, _Mapping) else _getattr",
+        "    out = {}",
+    ]
+    for index, (name, field) in enumerate(schema.dump_fields.items()):
+        key = field.data_key if field.data_key is not None else name
+        attribute = field.attribute or name
+        expression = _value_expression(field, index, namespace)
+        if (
+            expression is None
+            or field.dump_default is not missing
+            or "." in attribute
+            or not field._CHECK_ATTRIBUTE
+        ):
+            namespace[f"field_{index}"] = field
+            lines += [
+                f"    value = field_{index}.serialize({attribute!r}, obj)",
+                "    if value is not _missing:",
+                f"        out[{key!r}] = value",
+            ]
+            continue
+        lines += [
+            f"    value = get(obj, {attribute!r}, _missing)",
+            "    if value is not _missing:",
+            f"        out[{key!r}] = None if value is None else {expression}",
+        ]
+    lines.append("    return out")
+    exec("\n".join(lines), namespace)
+    return namespace["dump"]
+
+
+def compile_schema(schema):
+    """Compile a configured schema instance into a ``CompiledSerializer``"""
+    return CompiledSerializer(schema)
+
+
+@lru_cache(maxsize=256)
+def compiled(schema_class, only=None, many=False):
+    """Serializer for ``schema_class(only=only)``, compiled once per fieldset"""
+    return compile_schema(schema_class(only=only, many=many))
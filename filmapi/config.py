@@ -2,6 +2,7 @@
 
 Use env var to override
 """
+import json
 import os
 
 ENV = os.getenv("FLASK_ENV")
@@ -16,6 +17,79 @@ SQLALCHEMY_RECORD_QUERIES = True
 SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URI")
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# Cache-Control of public GET resources, s_maxage lets the CDN keep details
+# far longer than browsers since writes purge them by surrogate key. Lists
+# are only purged through the entities they show, their s_maxage bounds how
+# long added and removed entities take to show up
+CACHE_POLICIES = {
+    "films": {"max_age": 60, "s_maxage": 300, "stale_while_revalidate": 300},
+    "film": {"max_age": 300, "s_maxage": 86400, "stale_while_revalidate": 600},
+    "actors": {"max_age": 300, "s_maxage": 600, "stale_while_revalidate": 600},
+    "actor": {"max_age": 300, "s_maxage": 86400, "stale_while_revalidate": 600},
+    "genres": {"max_age": 3600, "s_maxage": 3600, "stale_while_revalidate": 86400},
+    "comments": {"max_age": 60, "s_maxage": 300, "stale_while_revalidate": 60},
+    "search": {"max_age": 30, "s_maxage": 300, "stale_while_revalidate": 60},
+}
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# reverse proxies in front of the app, whose X-Forwarded-For and
+# X-Forwarded-Proto are trusted; clients could forge them without one
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", 0))
+# token buckets per client: burst capacity and tokens refilled per second
+RATE_LIMITS = {
+    "search": {"capacity": 20, "per_second": 1},
+    "lists": {"capacity": 60, "per_second": 5},
+    "comments": {"capacity": 10, "per_second": 0.2},
+    "graph": {"capacity": 20, "per_second": 1},
+}
+# co-star graph, built in the gunicorn master with --preload when enabled
+COSTAR_GRAPH_PRELOAD = os.getenv("COSTAR_GRAPH_PRELOAD", "false").lower() == "true"
+COSTAR_GRAPH_REBUILD_INTERVAL = int(os.getenv("COSTAR_GRAPH_REBUILD_INTERVAL", 3600))
+# seconds clients are told to wait while the graph is first built
+COSTAR_GRAPH_RETRY_AFTER = 5
+COSTAR_PATH_MAX_DEGREES = 6
+# co-stars listed for an actor, by default and at most
+ACTOR_COSTARS_LIMIT = 20
+ACTOR_COSTARS_MAX_LIMIT = 100
+# similar films stored per film, and the weights of shared genres and cast
+SIMILAR_FILMS = 20
+SIMILAR_GENRE_WEIGHT = 0.4
+SIMILAR_ACTOR_WEIGHT = 0.6
+# films with the closest descriptions stored per film, description terms
+# kept per film, the largest share of descriptions an indexed term is in
+# and the films kept per term, those it weighs most in
+PLOT_NEIGHBORS = 10
+PLOT_TERMS_PER_FILM = 32
+PLOT_MAX_DF = 0.5
+PLOT_MAX_POSTINGS = 1000
+# films of a leaderboard, by default and at most
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MAX_SIZE = 100
+# comments embedded in a film detail, and the page sizes of its comments
+COMMENTS_EMBEDDED = 5
+COMMENTS_PAGE_SIZE = 20
+COMMENTS_MAX_PAGE_SIZE = 100
+# films embedded in an actor detail, and the page sizes of a filmography
+ACTOR_FILMS_PAGE_SIZE = 20
+ACTOR_FILMS_MAX_PAGE_SIZE = 100
+# acknowledge comments once queued in a Redis stream, drainers store them
+COMMENTS_BUFFERED = os.getenv("COMMENTS_BUFFERED", "false").lower() == "true"
+COMMENT_DRAIN_BATCH_SIZE = int(os.getenv("COMMENT_DRAIN_BATCH_SIZE", 500))
+# milliseconds before entries of a dead drainer are claimed by another one
+COMMENT_DRAIN_CLAIM_IDLE = int(os.getenv("COMMENT_DRAIN_CLAIM_IDLE", 60 * 1000))
+# versioned responses are stored encoded, with compressed variants of bodies
+# larger than COMPRESSION_MIN_SIZE bytes. Variants are compressed inline by
+# the request filling the entry, the maximum levels (brotli 11 above all)
+# cost many times more for bodies only a few percent smaller
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 60 * 60))
+COMPRESSION_MIN_SIZE = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+CDN_PURGE_URL = os.getenv("CDN_PURGE_URL")
+CDN_PURGE_HEADERS = json.loads(os.getenv("CDN_PURGE_HEADERS", "{}"))
+
+PAGINATION_COUNT_TIMEOUT = int(os.getenv("PAGINATION_COUNT_TIMEOUT", 5 * 60))
+PAGINATION_ESTIMATE_THRESHOLD = int(os.getenv("PAGINATION_ESTIMATE_THRESHOLD", 100000))
+
 ELASTICSEARCH_CONFIG = {
     "hosts": os.getenv("ELASTICSEARCH"),
     "http_auth": (os.getenv("ES_USER"), os.getenv("ES_PASS")),
@@ -25,8 +99,46 @@ CELERY = {
     "broker_url": os.getenv("CELERY_BROKER_URL"),
     "result_backend": os.getenv("CELERY_RESULT_BACKEND_URL"),
     "broker_connection_retry_on_startup": True,
+    "task_routes": {
+        "filmapi.tasks.parser.parse_imdb_data": {"queue": "scraping"},
+        "filmapi.tasks.parser.parse_imdb_films": {"queue": "scraping"},
+        "filmapi.tasks.parser.crawl_imdb": {"queue": "scraping"},
+    },
+    "beat_schedule": {
+        "drain-comments": {
+            "task": "filmapi.tasks.comments.drain_comments",
+            "schedule": float(os.getenv("COMMENT_DRAIN_INTERVAL", 1)),
+        },
+        "reconcile-counters": {
+            "task": "filmapi.tasks.catalog.reconcile_counters",
+            "schedule": float(os.getenv("COUNTER_RECONCILE_INTERVAL", 24 * 60 * 60)),
+        },
+        "compute-similar-films": {
+            "task": "filmapi.tasks.catalog.compute_similar_films",
+            "schedule": float(os.getenv("SIMILAR_FILMS_INTERVAL", 24 * 60 * 60)),
+        },
+        "update-plot-index": {
+            "task": "filmapi.tasks.catalog.update_plot_index",
+            "schedule": float(os.getenv("PLOT_INDEX_INTERVAL", 10 * 60)),
+        },
+        "rebuild-plot-index": {
+            "task": "filmapi.tasks.catalog.rebuild_plot_index",
+            "schedule": float(os.getenv("PLOT_REBUILD_INTERVAL", 7 * 24 * 60 * 60)),
+        },
+    },
 }
 
+PARSER_CHUNK_SIZE = int(os.getenv("PARSER_CHUNK_SIZE", 25))
+POPULATE_LOCK_TTL = int(os.getenv("POPULATE_LOCK_TTL", 60 * 60))
+
+CRAWL_CHUNKS_PER_BATCH = int(os.getenv("CRAWL_CHUNKS_PER_BATCH", 8))
+CRAWL_SEEDS = [
+    "https://www.imdb.com/chart/top/",
+    "https://www.imdb.com/chart/moviemeter/",
+    "https://www.imdb.com/chart/top-english-movies/",
+    "https://www.imdb.com/search/title/?title_type=feature&sort=num_votes,desc",
+]
+
 HEADERS = {
     "authority": "www.imdb.com",
     "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,\
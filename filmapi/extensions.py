@@ -11,6 +11,7 @@ from flask_migrate import Migrate
 from celery import Celery
 from flask_caching import Cache
 from elasticsearch import Elasticsearch
+from redis import Redis
 
 from filmapi.commons.apispec import APISpecExt
 
@@ -24,3 +25,4 @@ pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 celery = Celery()
 cache = Cache()
 es = Elasticsearch(hosts="http://elasticsearch:9200", http_auth=("elastic", "Elastic"))
+redis_client = Redis(host="redis", decode_responses=True)
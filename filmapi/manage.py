@@ -16,3 +16,98 @@ def init():
     db.session.add(user)
     db.session.commit()
     click.echo("created user admin")
+
+
+@click.command("crawl")
+@click.option("--seed", "seeds", multiple=True, help="Listing page to start from")
+@click.option("--max-pages", type=int, help="Listing pages to expand in this run")
+@click.option("--max-titles", type=int, help="Films to queue in this run")
+@click.option("--restart", is_flag=True, help="Forget the frontier of previous runs")
+@with_appcontext
+def crawl(seeds, max_pages, max_titles, restart):
+    """Start or resume an IMDb crawl beyond the Top 250 chart"""
+    from flask import current_app
+
+    from filmapi.tasks.locks import submit_once
+    from filmapi.tasks.parser import CRAWL_LOCK, crawl_imdb
+
+    task_id, started = submit_once(
+        crawl_imdb,
+        CRAWL_LOCK,
+        current_app.config["POPULATE_LOCK_TTL"],
+        list(seeds) or None,
+        max_pages,
+        max_titles,
+        restart,
+    )
+    if not started:
+        click.echo(f"crawl task {task_id} already running")
+    else:
+        click.echo(f"crawl task {task_id} started")
+
+
+@click.command("import-imdb-tsv")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option(
+    "--title-type",
+    "title_types",
+    multiple=True,
+    default=["movie"],
+    show_default=True,
+    help="titleType values to import",
+)
+@click.option(
+    "--min-votes", default=0, show_default=True, help="Skip less voted titles"
+)
+@click.option("--max-cast", default=10, show_default=True, help="Actors per film")
+@click.option("--batch-size", default=50000, show_default=True)
+@with_appcontext
+def import_imdb_tsv(directory, title_types, min_votes, max_cast, batch_size):
+    """Import films from the IMDb TSV datasets in DIRECTORY
+
+    Reads title.basics, title.ratings, title.principals and name.basics
+    .tsv.gz files as streams, without decompressing them to disk.
+    """
+    import os
+    import time
+    from filmapi.extensions import db
+    from filmapi.services.film_service import FilmService
+    from filmapi.services.imdb_dataset import IMDbDatasetReader
+
+    reader = IMDbDatasetReader(
+        *(
+            os.path.join(directory, f"{name}.tsv.gz")
+            for name in ("title.basics", "title.ratings", "title.principals")
+        ),
+        os.path.join(directory, "name.basics.tsv.gz"),
+        title_types=title_types,
+        min_votes=min_votes,
+        max_cast=max_cast,
+    )
+    started = time.monotonic()
+
+    def progress(stage, count):
+        rate = count / max(time.monotonic() - started, 1e-6)
+        click.echo(f"{stage}: {count:,} ({rate:,.0f}/sec)")
+
+    totals = FilmService.ingest_films(
+        db.session, reader.films(progress=progress), batch_size=batch_size
+    )
+    click.echo(
+        f"imported {totals['inserted']:,} new and {totals['updated']:,} updated films "
+        f"in {time.monotonic() - started:,.0f}s"
+    )
+
+
+@click.command("rebuild-leaderboards")
+@with_appcontext
+def rebuild_leaderboards():
+    """Restore the leaderboards of the highest rated films from the database"""
+    from filmapi.extensions import db
+    from filmapi.services import leaderboards
+    from filmapi.services.generations import mark_changed
+
+    films = leaderboards.rebuild(db.session)
+    mark_changed(db.session, "leaderboards")
+    db.session.commit()
+    click.echo(f"ranked {films:,} films")
@@ -3,9 +3,13 @@ from filmapi.models.blocklist import TokenBlocklist
 from filmapi.models.actor import Actor
 from filmapi.models.comment import Comments
 from filmapi.models.film import Film
+from filmapi.models.film_neighbor import FilmNeighbor
 from filmapi.models.genre import Genre
 from filmapi.models.movie_actor import MoviesActors
 from filmapi.models.movie_genre import MoviesGenres
+from filmapi.models.plot_neighbor import PlotNeighbor
+from filmapi.models.plot_posting import PlotPosting
+from filmapi.models.plot_term import PlotTerm
 
 
 __all__ = [
@@ -14,7 +18,11 @@ __all__ = [
     "Actor",
     "Comments",
     "Film",
+    "FilmNeighbor",
     "Genre",
     "MoviesActors",
     "MoviesGenres",
+    "PlotNeighbor",
+    "PlotPosting",
+    "PlotTerm",
 ]
@@ -1,4 +1,6 @@
 import sqlalchemy
+from datetime import datetime
+
 from filmapi.extensions import db
 
 
@@ -7,11 +9,16 @@ db: sqlalchemy
 
 class Actor(db.Model):
     __tablename__ = "actors"
+    __table_args__ = (db.Index("ix_actors_film_count_id", "film_count", "id"),)
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
     birthday = db.Column(db.Date)
     is_active = db.Column(db.Boolean, default=False)
+    film_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
 
     def __repr__(self):
         return f"Actor({self.name}, {self.birthday})"
@@ -8,10 +8,15 @@ db: sqlalchemy
 
 class Comments(db.Model):
     __tablename__ = "comments"
+    __table_args__ = (
+        db.Index("ix_comments_film_id_created_at", "film_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # id of the Redis stream entry of a buffered comment
+    stream_id = db.Column(db.String(32), unique=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     film_id = db.Column(db.Integer, db.ForeignKey("films.id"), nullable=False)
     user = db.relationship("User", backref="comments")
@@ -1,6 +1,7 @@
 import sqlalchemy
-from sqlalchemy import event
+from sqlalchemy import event, func, literal_column
 
+from datetime import datetime
 from uuid import uuid4
 
 from filmapi.extensions import db, es
@@ -15,7 +16,7 @@ class Film(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String, nullable=False)
     title_original = db.Column(db.String, nullable=False)
-    release_date = db.Column(db.Date, index=True, nullable=False)
+    release_date = db.Column(db.Date, nullable=False)
     uuid = db.Column(db.String(36), unique=True)
     description = db.Column(db.Text)
     distributed_by = db.Column(db.String(128), nullable=False)
@@ -24,6 +25,27 @@ class Film(db.Model):
     budget = db.Column(db.String)
     poster = db.Column(db.String)
     trailer = db.Column(db.String)
+    # IMDb title id (tconst) of scraped and imported films, their merge key
+    imdb_id = db.Column(db.String(16), unique=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    SEARCH_FIELDS = (
+        "title",
+        "title_original",
+        "release_date",
+        "uuid",
+        "description",
+        "distributed_by",
+        "length",
+        "rating",
+        "budget",
+        "poster",
+        "trailer",
+    )
+
     actors = db.relationship(
         "Actor",
         secondary="movies_actors",
@@ -77,20 +99,8 @@ class Film(db.Model):
 
     @staticmethod
     def after_insert(mapper, connection, target: type["Film"]):
-        doc = {
-            "title": target.title,
-            "title_original": target.title_original,
-            "release_date": target.release_date,
-            "uuid": target.uuid,
-            "description": target.description,
-            "distributed_by": target.distributed_by,
-            "length": target.length,
-            "rating": target.rating,
-            "budget": target.budget,
-            "poster": target.poster,
-            "trailer": target.trailer,
-        }
-        es.index(index="films", body=doc)
+        doc = {field: getattr(target, field) for field in Film.SEARCH_FIELDS}
+        es.index(index="films", id=target.uuid, body=doc)
 
     @staticmethod
     def after_delete(mapper, connection, target: type["Film"]):
@@ -99,5 +109,16 @@ class Film(db.Model):
         )
 
 
+# sort key of ratings, unrated films sort below every rating. The literal is
+# inlined, databases only match an expression index without parameters
+rating_sort_key = func.coalesce(Film.rating, literal_column("-1.0"))
+
+# list sorts, each walked in either direction with id breaking ties
+db.Index("ix_films_rating_id", rating_sort_key, Film.id)
+db.Index("ix_films_release_date_id", Film.release_date, Film.id)
+db.Index("ix_films_title_id", Film.title, Film.id)
+# merge key of films without an IMDb id, remakes share the original title
+db.Index("ix_films_title_original_release_date", Film.title_original, Film.release_date)
+
 event.listen(Film, "after_insert", Film.after_insert)
 event.listen(Film, "after_delete", Film.after_delete)
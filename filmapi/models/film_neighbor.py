@@ -0,0 +1,24 @@
+import sqlalchemy
+
+from filmapi.extensions import db
+
+
+db: sqlalchemy
+
+
+class FilmNeighbor(db.Model):
+    """Precomputed similar films of a film, ``rank`` 0 being the closest"""
+
+    __tablename__ = "film_neighbors"
+
+    film_id = db.Column(
+        db.Integer, db.ForeignKey("films.id", ondelete="CASCADE"), primary_key=True
+    )
+    rank = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    neighbor_id = db.Column(
+        db.Integer,
+        db.ForeignKey("films.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    score = db.Column(db.Float, nullable=False)
@@ -10,6 +10,9 @@ class Genre(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
+    film_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0", index=True
+    )
 
     def __repr__(self):
         return f"Genre({self.name})"
@@ -0,0 +1,24 @@
+import sqlalchemy
+
+from filmapi.extensions import db
+
+
+db: sqlalchemy
+
+
+class PlotNeighbor(db.Model):
+    """Films with the closest descriptions, ``rank`` 0 being the closest"""
+
+    __tablename__ = "plot_neighbors"
+
+    film_id = db.Column(
+        db.Integer, db.ForeignKey("films.id", ondelete="CASCADE"), primary_key=True
+    )
+    rank = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    neighbor_id = db.Column(
+        db.Integer,
+        db.ForeignKey("films.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    score = db.Column(db.Float, nullable=False)
@@ -0,0 +1,21 @@
+import sqlalchemy
+
+from filmapi.extensions import db
+
+
+db: sqlalchemy
+
+
+class PlotPosting(db.Model):
+    """Weight of a term in the normalized TF-IDF vector of a film description"""
+
+    __tablename__ = "plot_postings"
+
+    term = db.Column(db.String(64), primary_key=True)
+    film_id = db.Column(
+        db.Integer,
+        db.ForeignKey("films.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    weight = db.Column(db.Float, nullable=False)
@@ -0,0 +1,15 @@
+import sqlalchemy
+
+from filmapi.extensions import db
+
+
+db: sqlalchemy
+
+
+class PlotTerm(db.Model):
+    """Vocabulary of the plot index with the idf of each term"""
+
+    __tablename__ = "plot_terms"
+
+    term = db.Column(db.String(64), primary_key=True)
+    idf = db.Column(db.Float, nullable=False)
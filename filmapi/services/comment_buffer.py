@@ -0,0 +1,181 @@
+"""Write-buffered comments
+
+With ``COMMENTS_BUFFERED`` on, posting a comment only validates it and
+appends it to a Redis stream, whose entry id is returned as the comment id
+right away. ``drain`` reads the stream through a consumer group, stores
+whole batches with one multi-row ``INSERT`` and acknowledges the entries
+only after commit. Entries of a drainer that died before acknowledging
+stay pending and are claimed by the next one, so delivery is at least
+once, and the unique ``comments.stream_id`` turns repeated inserts into
+no-ops.
+
+Until it is stored, every comment is also kept in a hash per film that
+reads merge in, so authors see their own comments immediately. One Lua
+script appends to the stream and fills the hash, atomically and in a single
+round trip.
+"""
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from redis.exceptions import ResponseError
+from sqlalchemy import select
+
+from filmapi.extensions import redis_client
+from filmapi.models import Comments, Film, User
+from filmapi.services.counters import recount
+from filmapi.services.film_service import _insert
+from filmapi.services.generations import mark_changed, publish
+
+STREAM = "comments:stream"
+GROUP = "comments:drainers"
+
+BUFFER = """
+local stream_id = redis.call("XADD", KEYS[1], "*", unpack(ARGV, 2))
+redis.call("HSET", KEYS[2], stream_id, ARGV[1])
+return stream_id
+"""
+buffer = redis_client.register_script(BUFFER)
+
+PendingComment = namedtuple(
+    "PendingComment", ("stream_id", "username", "created_at", "text")
+)
+
+
+def pending_key(film_uuid):
+    return f"comments:pending:{film_uuid}"
+
+
+def buffer_comment(film, user, text):
+    """Queue a comment for ``film``, returning its stream id"""
+    entry = {
+        "film_id": film.id,
+        "film_uuid": film.uuid,
+        "user_id": user.id,
+        "username": user.username,
+        "text": text,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    fields = [item for pair in entry.items() for item in pair]
+    stream_id = buffer(
+        keys=[STREAM, pending_key(film.uuid)], args=[json.dumps(entry), *fields]
+    )
+    publish(f"film:{film.uuid}")
+    return stream_id
+
+
+def pending_comments(film_uuid):
+    """Comments of a film that are not stored yet, newest first"""
+    comments = []
+    for stream_id, value in redis_client.hgetall(pending_key(film_uuid)).items():
+        entry = json.loads(value)
+        created_at = datetime.fromisoformat(entry["created_at"])
+        comments.append(
+            PendingComment(stream_id, entry["username"], created_at, entry["text"])
+        )
+    return sorted(comments, key=lambda comment: comment.created_at, reverse=True)
+
+
+def merge_pending(film_uuid, comments):
+    """Pending comments of a film missing from ``comments``, newest first
+
+    A drained comment stays in the pending hash until the drainer has
+    committed it, ``comments`` rows with the same stream id win.
+    """
+    stored = {comment.stream_id for comment in comments}
+    return [
+        comment
+        for comment in pending_comments(film_uuid)
+        if comment.stream_id not in stored
+    ]
+
+
+def first_page(film_uuid, comments, limit):
+    """Newest ``limit`` pending and stored comments of a film
+
+    ``comments`` are the newest stored ones, read with ``limit + 1``. Returns
+    the page and the ``(created_at, id)`` key the next page is read before,
+    ``None`` when the page shows every stored comment. Pending comments are
+    only listed on the first page, the key is always of a stored one.
+    """
+    page = sorted(
+        [*merge_pending(film_uuid, comments), *comments],
+        key=lambda comment: comment.created_at,
+        reverse=True,
+    )[:limit]
+    shown = sum(not isinstance(comment, PendingComment) for comment in page)
+    if shown == len(comments):
+        return page, None
+    if shown:
+        last = comments[shown - 1]
+        return page, (last.created_at, last.id)
+    # pending comments fill the page, the next one starts at the newest stored
+    return page, (comments[0].created_at, comments[0].id + 1)
+
+
+def _ensure_group():
+    try:
+        redis_client.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def _store(session, entries):
+    fields = {stream_id: values for stream_id, values in entries}
+    film_ids = {int(values["film_id"]) for values in fields.values()}
+    user_ids = {int(values["user_id"]) for values in fields.values()}
+    # comments of films or users deleted in the meantime are dropped
+    film_ids = set(session.scalars(select(Film.id).where(Film.id.in_(film_ids))))
+    user_ids = set(session.scalars(select(User.id).where(User.id.in_(user_ids))))
+    rows = [
+        {
+            "stream_id": stream_id,
+            "text": values["text"],
+            "film_id": int(values["film_id"]),
+            "user_id": int(values["user_id"]),
+            "created_at": datetime.fromisoformat(values["created_at"]),
+        }
+        for stream_id, values in fields.items()
+        if int(values["film_id"]) in film_ids and int(values["user_id"]) in user_ids
+    ]
+    if rows:
+        session.execute(
+            _insert(session, Comments)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[Comments.stream_id])
+        )
+        recount(session, Film, {row["film_id"] for row in rows})
+        uuids = {fields[row["stream_id"]]["film_uuid"] for row in rows}
+        mark_changed(session, *(f"film:{uuid}" for uuid in uuids))
+    session.commit()
+
+    pipe = redis_client.pipeline()
+    pipe.xack(STREAM, GROUP, *fields)
+    pipe.xdel(STREAM, *fields)
+    for stream_id, values in fields.items():
+        pipe.hdel(pending_key(values["film_uuid"]), stream_id)
+    pipe.execute()
+    return len(rows)
+
+
+def drain(session, consumer, batch_size, claim_idle):
+    """Store buffered comments until the stream is empty
+
+    Entries left pending for ``claim_idle`` milliseconds by another
+    consumer are claimed first. Returns the number of stored comments.
+    """
+    _ensure_group()
+    _, entries, *_ = redis_client.xautoclaim(
+        STREAM, GROUP, consumer, min_idle_time=claim_idle, count=batch_size
+    )
+    stored = 0
+    while True:
+        if entries:
+            stored += _store(session, entries)
+        response = redis_client.xreadgroup(
+            GROUP, consumer, {STREAM: ">"}, count=batch_size
+        )
+        entries = response[0][1] if response else []
+        if not entries:
+            return stored
@@ -0,0 +1,33 @@
+from sqlalchemy import tuple_
+from sqlalchemy.orm.session import Session
+
+from filmapi.models import Comments, User
+
+
+class CommentService:
+    @staticmethod
+    def fetch_latest(session: Session, film_id, limit, before=None):
+        """Comments of a film, newest first, older than the ``before`` key
+
+        ``before`` is the ``(created_at, id)`` of the last comment already
+        returned. Both the filter and the order follow the
+        ``(film_id, created_at, id)`` index.
+        """
+        query = (
+            session.query(
+                Comments.id,
+                Comments.stream_id,
+                Comments.text,
+                Comments.created_at,
+                User.username,
+            )
+            .join(User, User.id == Comments.user_id)
+            .filter(Comments.film_id == film_id)
+        )
+        if before is not None:
+            query = query.filter(tuple_(Comments.created_at, Comments.id) < before)
+        return (
+            query.order_by(Comments.created_at.desc(), Comments.id.desc())
+            .limit(limit)
+            .all()
+        )
@@ -0,0 +1,277 @@
+"""In-memory co-star graph
+
+Actors and films form a bipartite graph stored in compressed sparse row
+form: ``actor_offsets[i]:actor_offsets[i + 1]`` slices ``actor_films``, the
+positions in ``film_ids`` of the films of the actor at position ``i`` of
+``actor_ids``, and the film side mirrors it. Everything lives in a few flat
+``array`` buffers of integers instead of millions of Python objects, so a
+graph built before gunicorn forks (``--preload`` with
+``COSTAR_GRAPH_PRELOAD``) stays shared copy-on-write by every worker:
+reading it never writes to its pages. Co-stars of an actor are the actors
+of its films, counted on demand, which avoids materializing the quadratic
+actor to actor edges of large casts.
+
+The graph is built in a background thread and swapped in when complete;
+until the first build finishes ``costar_graph()`` returns ``None``. Films
+added after a build are fetched by id and kept in a small overlay, whenever
+the ``films`` generation moves. Deleted films, edited casts and catalog
+resets move the ``casts`` generation instead, which triggers a rebuild, as
+does every ``COSTAR_GRAPH_REBUILD_INTERVAL`` seconds; the previous graph is
+served meanwhile, so readers must expect ids that no longer exist.
+"""
+import copy
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from flask import current_app
+from sqlalchemy import select
+
+from filmapi.extensions import db
+from filmapi.models import MoviesActors
+from filmapi.services.generations import CASTS_KEY, generations
+
+LINKS_BATCH_SIZE = 100000
+
+
+def _index(ids, id_):
+    position = bisect_left(ids, id_)
+    if position < len(ids) and ids[position] == id_:
+        return position
+    return None
+
+
+def _transpose(offsets, targets, size):
+    """The CSR arrays of the reversed edges of ``offsets``/``targets``"""
+    counts = array("q", bytes(8 * (size + 1)))
+    for target in targets:
+        counts[target + 1] += 1
+    for position in range(size):
+        counts[position + 1] += counts[position]
+    reversed_offsets = array("q", counts)
+    sources = array("q", bytes(8 * len(targets)))
+    for source in range(len(offsets) - 1):
+        for edge in range(offsets[source], offsets[source + 1]):
+            target = targets[edge]
+            sources[counts[target]] = source
+            counts[target] += 1
+    return reversed_offsets, sources
+
+
+def _depth(parents, actor_id):
+    depth = 0
+    while parents[actor_id] is not None:
+        actor_id, _ = parents[actor_id]
+        depth += 1
+    return depth
+
+
+class CostarGraph:
+    def __init__(self, actor_ids, actor_offsets, actor_films, film_ids, max_film_id):
+        self.actor_ids = actor_ids
+        self.actor_offsets = actor_offsets
+        self.actor_films = actor_films
+        self.film_ids = film_ids
+        self.film_offsets, self.film_actors = _transpose(
+            actor_offsets, actor_films, len(film_ids)
+        )
+        self.max_film_id = max_film_id
+        # links of films added after the build, by actor and by film id
+        self.extra_films = {}
+        self.extra_actors = {}
+
+    @classmethod
+    def build(cls, session):
+        """Read ``movies_actors`` once, ordered by actor, into CSR arrays"""
+        film_ids = array(
+            "q",
+            session.scalars(
+                select(MoviesActors.film_id).distinct().order_by(MoviesActors.film_id)
+            ),
+        )
+        actor_ids, actor_offsets, actor_films = array("q"), array("q"), array("q")
+        links = session.execute(
+            select(MoviesActors.actor_id, MoviesActors.film_id)
+            .order_by(MoviesActors.actor_id, MoviesActors.film_id)
+            .execution_options(yield_per=LINKS_BATCH_SIZE)
+        )
+        for actor_id, film_id in links:
+            if not actor_ids or actor_ids[-1] != actor_id:
+                actor_ids.append(actor_id)
+                actor_offsets.append(len(actor_films))
+            actor_films.append(bisect_left(film_ids, film_id))
+        actor_offsets.append(len(actor_films))
+        max_film_id = film_ids[-1] if film_ids else 0
+        return cls(actor_ids, actor_offsets, actor_films, film_ids, max_film_id)
+
+    def extended(self, session):
+        """This graph plus the links of films added since it was built"""
+        links = session.execute(
+            select(MoviesActors.film_id, MoviesActors.actor_id).where(
+                MoviesActors.film_id > self.max_film_id
+            )
+        ).all()
+        if not links:
+            return self
+        # readers may hold this graph, the copy gets overlays of its own
+        graph = copy.copy(self)
+        extra_films = defaultdict(list, self.extra_films)
+        extra_actors = defaultdict(list, self.extra_actors)
+        for film_id, actor_id in links:
+            extra_films[actor_id] = [*extra_films[actor_id], film_id]
+            extra_actors[film_id] = [*extra_actors[film_id], actor_id]
+        graph.extra_films, graph.extra_actors = dict(extra_films), dict(extra_actors)
+        graph.max_film_id = max(film_id for film_id, _ in links)
+        return graph
+
+    def films_of(self, actor_id):
+        position = _index(self.actor_ids, actor_id)
+        films = []
+        if position is not None:
+            start, end = self.actor_offsets[position], self.actor_offsets[position + 1]
+            films = [self.film_ids[film] for film in self.actor_films[start:end]]
+        return films + self.extra_films.get(actor_id, [])
+
+    def actors_of(self, film_id):
+        position = _index(self.film_ids, film_id)
+        if position is None:
+            return self.extra_actors.get(film_id, [])
+        start, end = self.film_offsets[position], self.film_offsets[position + 1]
+        return [self.actor_ids[actor] for actor in self.film_actors[start:end]]
+
+    def costars(self, actor_id, limit):
+        """Actors sharing most films with ``actor_id``, with the film counts"""
+        counts = Counter()
+        for film_id in self.films_of(actor_id):
+            counts.update(self.actors_of(film_id))
+        counts.pop(actor_id, None)
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def _expand(self, frontier, parents, films_seen):
+        """Next BFS level from ``frontier``, recording how actors were reached"""
+        level = []
+        for actor_id in frontier:
+            for film_id in self.films_of(actor_id):
+                if film_id in films_seen:
+                    continue
+                films_seen.add(film_id)
+                for costar in self.actors_of(film_id):
+                    if costar not in parents:
+                        parents[costar] = (actor_id, film_id)
+                        level.append(costar)
+        return level
+
+    def path(self, source, target, max_degrees):
+        """Shortest chain of co-stars from ``source`` to ``target``
+
+        Returns ``(actor_ids, film_ids)``, film ``i`` linking actors ``i``
+        and ``i + 1``, or ``None`` beyond ``max_degrees``. The smaller of
+        the two frontiers is expanded first, a level at a time.
+        """
+        if source == target:
+            return [source], []
+        forward, backward = {source: None}, {target: None}
+        forward_frontier, backward_frontier = [source], [target]
+        forward_films, backward_films = set(), set()
+        degrees = 0
+        while forward_frontier and backward_frontier and degrees < max_degrees:
+            degrees += 1
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier = self._expand(
+                    forward_frontier, forward, forward_films
+                )
+                met = [actor for actor in forward_frontier if actor in backward]
+            else:
+                backward_frontier = self._expand(
+                    backward_frontier, backward, backward_films
+                )
+                met = [actor for actor in backward_frontier if actor in forward]
+            if met:
+                # actors met on this level may be of different depths
+                meeting = min(
+                    met,
+                    key=lambda actor: _depth(forward, actor) + _depth(backward, actor),
+                )
+                return self._join(meeting, forward, backward)
+        return None
+
+    @staticmethod
+    def _join(meeting, forward, backward):
+        actors, films = [meeting], []
+        actor = meeting
+        while forward[actor] is not None:
+            actor, film = forward[actor]
+            actors.insert(0, actor)
+            films.insert(0, film)
+        actor = meeting
+        while backward[actor] is not None:
+            actor, film = backward[actor]
+            actors.append(actor)
+            films.append(film)
+        return actors, films
+
+
+class _State:
+    graph = None
+    generation = None
+    built_at = 0.0
+    rebuilding = False
+    lock = threading.Lock()
+
+
+def _generation():
+    return tuple(generations("films", CASTS_KEY))
+
+
+def _rebuild(app):
+    try:
+        with app.app_context():
+            # changes committed during the build move it again afterwards
+            generation = _generation()
+            graph = CostarGraph.build(db.session)
+            db.session.remove()
+        with _State.lock:
+            _State.graph, _State.generation = graph, generation
+            _State.built_at = time.monotonic()
+    finally:
+        _State.rebuilding = False
+
+
+def _start_rebuild():
+    """Rebuild in a background thread unless one is running, under the lock"""
+    if not _State.rebuilding:
+        _State.rebuilding = True
+        app = current_app._get_current_object()
+        threading.Thread(target=_rebuild, args=(app,), daemon=True).start()
+
+
+def costar_graph():
+    """The graph of this process, or ``None`` while it is first built"""
+    with _State.lock:
+        if _State.graph is None:
+            _start_rebuild()
+            return None
+        films, casts = generation = _generation()
+        if casts != _State.generation[1]:
+            # links were removed or films reused: serve the old graph meanwhile
+            _start_rebuild()
+        elif films != _State.generation[0]:
+            _State.graph = _State.graph.extended(db.session)
+            _State.generation = generation
+        interval = current_app.config["COSTAR_GRAPH_REBUILD_INTERVAL"]
+        if time.monotonic() - _State.built_at > interval:
+            _start_rebuild()
+        return _State.graph
+
+
+def preload_costar_graph(app):
+    """Build the graph in the master process so forked workers share it"""
+    with app.app_context():
+        _State.generation = _generation()
+        _State.graph = CostarGraph.build(db.session)
+        _State.built_at = time.monotonic()
+        db.session.remove()
+        # workers must not inherit the connections of the master
+        db.engine.dispose()
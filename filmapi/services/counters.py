@@ -0,0 +1,128 @@
+"""Denormalized counters
+
+``films.comment_count``, ``actors.film_count`` and ``genres.film_count``
+let lists filter and sort by popularity from an index instead of
+aggregating the association tables on every request.
+
+ORM writes adjust the counters in the same flush with relative updates,
+so concurrent writers never overwrite each other's increments. Bulk writes
+done with Core statements ``recount`` the rows they touched, and
+``reconcile`` repairs whatever drift is left by writes that bypass both.
+Counters are derived data, updating them does not touch ``updated_at``.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from filmapi.models import Actor, Comments, Film, Genre, MoviesActors, MoviesGenres
+
+# counter column and the column of the rows it counts, per model
+COUNTERS = {
+    Film: (Film.comment_count, Comments.film_id),
+    Actor: (Actor.film_count, MoviesActors.actor_id),
+    Genre: (Genre.film_count, MoviesGenres.genre_id),
+}
+IN_BATCH_SIZE = 1000
+
+
+def _actual(model):
+    counter, column = COUNTERS[model]
+    return (
+        select(func.count())
+        .select_from(column.table)
+        .where(column == model.id)
+        .scalar_subquery()
+    )
+
+
+def _counter_values(model, value):
+    counter, _ = COUNTERS[model]
+    values = {counter.key: value}
+    if "updated_at" in model.__table__.columns:
+        values["updated_at"] = model.updated_at
+    return values
+
+
+def recount(session: Session, model, ids=None):
+    """Recount the counter of ``model`` for ``ids``, every row when ``None``
+
+    Only rows whose stored value is wrong are written. Returns how many.
+    """
+    counter, _ = COUNTERS[model]
+    actual = _actual(model)
+    stmt = (
+        update(model.__table__)
+        .where(counter != actual)
+        .values(_counter_values(model, actual))
+    )
+    if ids is None:
+        return session.execute(stmt).rowcount
+    ids = sorted(set(ids))
+    repaired = 0
+    for start in range(0, len(ids), IN_BATCH_SIZE):
+        batch = ids[start:][:IN_BATCH_SIZE]
+        repaired += session.execute(stmt.where(model.id.in_(batch))).rowcount
+    return repaired
+
+
+def reconcile(session: Session):
+    """Repair every counter, returning the number of fixed rows per table"""
+    repaired = {model.__tablename__: recount(session, model) for model in COUNTERS}
+    session.commit()
+    return repaired
+
+
+def _collection_changes(session, deltas):
+    for film in session.new | session.dirty | session.deleted:
+        if not isinstance(film, Film):
+            continue
+        state = inspect(film)
+        for model, attribute in ((Actor, "actors"), (Genre, "genres")):
+            history = state.attrs[attribute].history
+            if film in session.deleted:
+                removed, added = [*history.unchanged, *history.deleted], ()
+            else:
+                removed, added = history.deleted, history.added
+            for linked in removed:
+                deltas[model][linked.id] -= 1
+            for linked in added:
+                deltas[model][linked.id] += 1
+
+
+def _comment_changes(session, deltas):
+    for comment in session.new:
+        if isinstance(comment, Comments):
+            deltas[Film][comment.film_id] += 1
+    for comment in session.deleted:
+        if isinstance(comment, Comments):
+            deltas[Film][comment.film_id] -= 1
+
+
+@event.listens_for(Session, "after_flush")
+def adjust_counters(session, flush_context):
+    deltas = {model: defaultdict(int) for model in COUNTERS}
+    _collection_changes(session, deltas)
+    _comment_changes(session, deltas)
+    adjusted = session.info.setdefault("adjusted_counters", [])
+    for model, by_id in deltas.items():
+        counter, _ = COUNTERS[model]
+        ids_by_delta = defaultdict(list)
+        for id_, delta in by_id.items():
+            if delta:
+                ids_by_delta[delta].append(id_)
+        for delta, ids in ids_by_delta.items():
+            session.connection().execute(
+                update(model.__table__)
+                .where(model.id.in_(ids))
+                .values(_counter_values(model, counter + delta))
+            )
+            adjusted += [(model, id_) for id_ in ids]
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def expire_counters(session, flush_context):
+    for model, id_ in session.info.pop("adjusted_counters", ()):
+        instance = session.identity_map.get(session.identity_key(model, id_))
+        if instance is not None:
+            session.expire(instance, [COUNTERS[model][0].key])
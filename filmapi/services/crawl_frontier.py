@@ -0,0 +1,113 @@
+from redis import Redis
+
+
+class CrawlFrontier:
+    """Crawl frontier persisted in Redis
+
+    Listing pages (charts, lists, search results) and film pages are kept in
+    two separate queues. Every url passes through a persistent seen-set, so
+    a url is only ever queued once, even across runs. Popped urls are moved
+    to a processing list until they are acknowledged, which lets a crashed
+    crawl be resumed with ``recover`` without losing work. Titles are only
+    acknowledged once their films are saved, and a page whose titles did not
+    fit in the budget is requeued rather than acknowledged.
+    """
+
+    def __init__(self, redis: Redis, name="imdb"):
+        self.redis = redis
+        self.name = name
+        self.seen_key = f"frontier:{name}:seen"
+        self.pages_key = f"frontier:{name}:pages"
+        self.pages_processing_key = f"frontier:{name}:pages:processing"
+        self.titles_key = f"frontier:{name}:titles"
+        self.titles_processing_key = f"frontier:{name}:titles:processing"
+        self.budget_key = f"frontier:{name}:budget"
+
+    def reset(self):
+        self.redis.delete(
+            self.seen_key,
+            self.pages_key,
+            self.pages_processing_key,
+            self.titles_key,
+            self.titles_processing_key,
+            self.budget_key,
+        )
+
+    def set_budget(self, pages=None, titles=None):
+        """Limit the number of pages expanded and titles queued in this run"""
+        self.redis.delete(self.budget_key)
+        budget = {
+            kind: value
+            for kind, value in (("pages", pages), ("titles", titles))
+            if value is not None
+        }
+        if budget:
+            self.redis.hset(self.budget_key, mapping=budget)
+
+    def spend_budget(self, kind):
+        if not self.redis.hexists(self.budget_key, kind):
+            return True
+        return self.redis.hincrby(self.budget_key, kind, -1) >= 0
+
+    def budget_exhausted(self, kind):
+        """Whether an url was refused for lack of ``kind`` budget in this run"""
+        spent = self.redis.hget(self.budget_key, kind)
+        return spent is not None and int(spent) < 0
+
+    def recover(self):
+        """Requeue urls that were popped but never acknowledged"""
+        while self.redis.lmove(self.pages_processing_key, self.pages_key, "LEFT"):
+            pass
+        while self.redis.lmove(self.titles_processing_key, self.titles_key, "LEFT"):
+            pass
+
+    def add_pages(self, urls):
+        return self._add(self.pages_key, urls)
+
+    def add_titles(self, urls):
+        return self._add(self.titles_key, urls, budget="titles")
+
+    def _add(self, queue_key, urls, budget=None):
+        added = 0
+        for url in urls:
+            if not self.redis.sadd(self.seen_key, url):
+                continue
+            if budget and not self.spend_budget(budget):
+                self.redis.srem(self.seen_key, url)
+                break
+            self.redis.lpush(queue_key, url)
+            added += 1
+        return added
+
+    def next_page(self):
+        if not self.redis.llen(self.pages_key) or not self.spend_budget("pages"):
+            return None
+        return self.redis.lmove(self.pages_key, self.pages_processing_key, "RIGHT")
+
+    def ack_page(self, url):
+        self.redis.lrem(self.pages_processing_key, 1, url)
+
+    def requeue_page(self, url):
+        """Put a popped page back at the head of the queue"""
+        pipe = self.redis.pipeline()
+        pipe.lrem(self.pages_processing_key, 1, url)
+        pipe.rpush(self.pages_key, url)
+        pipe.execute()
+
+    def pop_titles(self, count):
+        titles = []
+        for _ in range(count):
+            url = self.redis.lmove(self.titles_key, self.titles_processing_key, "RIGHT")
+            if url is None:
+                break
+            titles.append(url)
+        return titles
+
+    def ack_titles(self, urls):
+        pipe = self.redis.pipeline()
+        for url in urls:
+            pipe.lrem(self.titles_processing_key, 1, url)
+        pipe.execute()
+
+    def pending_titles(self):
+        return self.redis.llen(self.titles_key)
@@ -1,41 +1,236 @@
-from datetime import date
-from sqlalchemy import func
-from filmapi.models import Actor, Film, Genre, MoviesGenres
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+from uuid import uuid4
+from elasticsearch import helpers
+from sqlalchemy import exists, func, literal, select, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from filmapi.commons.cache_control import ALL_SURROGATE_KEY
+from filmapi.extensions import es
+from filmapi.models import (
+    Actor,
+    Comments,
+    Film,
+    FilmNeighbor,
+    Genre,
+    MoviesActors,
+    MoviesGenres,
+    PlotNeighbor,
+    PlotPosting,
+    PlotTerm,
+)
+from filmapi.models.film import rating_sort_key
+from filmapi.services import leaderboards
+from filmapi.services.counters import recount
+from filmapi.services.generations import (
+    CASTS_KEY,
+    CATALOG_KEYS,
+    film_keys,
+    mark_changed,
+)
 from sqlalchemy.orm.session import Session
 from filmapi.api.schemas import FilmSchema
 
+FILM_COLUMNS = (
+    "imdb_id",
+    "title",
+    "title_original",
+    "release_date",
+    "description",
+    "distributed_by",
+    "length",
+    "rating",
+    "budget",
+    "poster",
+    "trailer",
+)
+LIST_COLUMNS = (
+    "title",
+    "uuid",
+    "title_original",
+    "poster",
+    "rating",
+    "description",
+    "release_date",
+)
+# columns of the films nested in an actor
+FILMOGRAPHY_COLUMNS = ("title", "title_original", "uuid", "poster")
+# columns of similar films
+SIMILAR_COLUMNS = ("title", "title_original", "uuid", "poster", "rating")
+# sort keys of a filmography, unrated films sort below every rating
+FILMOGRAPHY_SORTS = {
+    "release_date": Film.release_date,
+    "rating": rating_sort_key,
+}
+# sort keys of film lists, each backed by an index on (key, id)
+FILM_SORTS = {
+    "rating": rating_sort_key,
+    "release_date": Film.release_date,
+    "title": Film.title,
+}
+UPSERT_BATCH_SIZE = 1000
+INGEST_BATCH_SIZE = 50000
+TRUNCATE_CATALOG = (
+    "TRUNCATE film_neighbors, plot_neighbors, plot_postings, plot_terms, "
+    "movies_actors, movies_genres, comments, actors, genres, films "
+    "RESTART IDENTITY CASCADE"
+)
+
+CREATE_STAGE_TABLE = """
+CREATE TEMPORARY TABLE IF NOT EXISTS films_stage (
+    imdb_id text,
+    title text,
+    title_original text,
+    release_date date,
+    description text,
+    distributed_by text,
+    length double precision,
+    rating double precision,
+    budget text,
+    poster text,
+    trailer text,
+    actors text[],
+    genres text[],
+    film_id integer
+) ON COMMIT DELETE ROWS
+"""
+COPY_STAGE_TABLE = (
+    f"COPY films_stage ({', '.join(FILM_COLUMNS)}, actors, genres) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+MERGE_NAMES = """
+INSERT INTO {table} (name)
+SELECT DISTINCT left(stage_name, 50) FROM films_stage, unnest({column}) AS stage_name
+ON CONFLICT (name) DO NOTHING
+"""
+# stored films of staged rows, by IMDb id or else by original title and
+# release date, see _natural_key
+RESOLVE_STAGED_FILMS = """
+UPDATE films_stage AS stage SET film_id = coalesce(
+    (SELECT films.id FROM films WHERE films.imdb_id = stage.imdb_id),
+    (
+        SELECT films.id FROM films
+        WHERE films.imdb_id IS NULL
+          AND films.title_original = stage.title_original
+          AND films.release_date = stage.release_date
+        LIMIT 1
+    )
+)
+WHERE stage.film_id IS NULL
+"""
+MERGE_UPDATED_FILMS = """
+UPDATE films SET
+    imdb_id = coalesce(stage.imdb_id, films.imdb_id),
+    title = coalesce(stage.title, films.title),
+    release_date = coalesce(stage.release_date, films.release_date),
+    description = coalesce(stage.description, films.description),
+    distributed_by = coalesce(stage.distributed_by, films.distributed_by),
+    length = coalesce(stage.length, films.length),
+    rating = coalesce(stage.rating, films.rating),
+    budget = coalesce(stage.budget, films.budget),
+    poster = coalesce(stage.poster, films.poster),
+    trailer = coalesce(stage.trailer, films.trailer),
+    updated_at = timezone('utc', now())
+FROM (
+    SELECT DISTINCT ON (film_id) * FROM films_stage
+    WHERE film_id IS NOT NULL
+    ORDER BY film_id
+) AS stage
+WHERE films.id = stage.film_id
+RETURNING films.id, films.uuid, films.title, films.title_original, films.release_date,
+          films.description, films.distributed_by, films.length, films.rating,
+          films.budget, films.poster, films.trailer
+"""
+MERGE_INSERTED_FILMS = """
+INSERT INTO films (uuid, imdb_id, title, title_original, release_date,
+                   description, distributed_by, length, rating, budget, poster,
+                   trailer, updated_at)
+SELECT DISTINCT ON (stage.imdb_id, natural_key.title_original, natural_key.release_date)
+    gen_random_uuid()::text, stage.imdb_id, stage.title, stage.title_original,
+    stage.release_date, stage.description, coalesce(stage.distributed_by, ''),
+    stage.length, stage.rating, stage.budget, stage.poster, stage.trailer,
+    timezone('utc', now())
+FROM films_stage AS stage
+-- rows with an IMDb id are told apart by it alone
+LEFT JOIN LATERAL (
+    SELECT stage.title_original, stage.release_date WHERE stage.imdb_id IS NULL
+) AS natural_key ON true
+WHERE stage.film_id IS NULL
+ORDER BY stage.imdb_id, natural_key.title_original, natural_key.release_date
+RETURNING uuid, title, title_original, release_date, description,
+          distributed_by, length, rating, budget, poster, trailer
+"""
+STAGED_FILM_IDS = """
+SELECT DISTINCT film_id FROM films_stage
+"""
+MERGE_LINKS = """
+INSERT INTO {table} (film_id, {column})
+SELECT DISTINCT stage.film_id, linked.id
+FROM films_stage AS stage
+CROSS JOIN LATERAL unnest(stage.{names}) AS stage_name
+JOIN {linked_table} AS linked ON linked.name = left(stage_name, 50)
+ON CONFLICT DO NOTHING
+"""
+RECOUNT_LINKED = """
+UPDATE {linked_table} SET film_count = linked.film_count
+FROM (
+    SELECT {column} AS id, count(*) AS film_count FROM {table}
+    WHERE {column} IN (
+        SELECT {linked_table}.id
+        FROM films_stage, unnest(films_stage.{names}) AS stage_name
+        JOIN {linked_table} ON {linked_table}.name = left(stage_name, 50)
+    )
+    GROUP BY {column}
+) AS linked
+WHERE {linked_table}.id = linked.id AND {linked_table}.film_count <> linked.film_count
+"""
+
 
 class FilmService:
     @staticmethod
     def fetch_all_films(
-        session: Session, page, offset, year_from=None, year_to=None, rating_from=None
+        session: Session,
+        page,
+        offset,
+        year_from=None,
+        year_to=None,
+        rating_from=None,
+        columns=LIST_COLUMNS,
+        sort=None,
     ):
-        query = (
-            session.query(
-                Film.title,
-                Film.uuid,
-                Film.title_original,
-                Film.poster,
-                Film.rating,
-                Film.description,
-                Film.release_date,
-            )
-            .join(MoviesGenres, MoviesGenres.film_id == Film.id)
-            .group_by(Film.id)
-        )
+        """A page of the films with genres
 
-        if year_from:
-            query = query.filter(Film.release_date >= date(year_from, 1, 1))
-        if year_to:
-            query = query.filter(Film.release_date <= date(year_to, 12, 31))
-        if rating_from:
-            query = query.filter(Film.rating >= rating_from)
-        return query.offset(page * offset).limit(offset)
+        ``sort`` names a key of ``FILM_SORTS``, prefixed with ``-`` for
+        descending order, films are in id order without it. Genres are
+        checked with ``EXISTS`` rather than a join, so the rows come in the
+        order of the sort index and no sort is needed.
+        """
+        query = session.query(*(getattr(Film, column) for column in columns)).filter(
+            exists().where(MoviesGenres.film_id == Film.id)
+        )
+        query = _filter_films(query, year_from, year_to, rating_from)
+        return _sort_films(query, sort).offset(page * offset).limit(offset)
 
     @classmethod
     def fetch_film_by_uuid(cls, session: Session, uuid):
         return session.query(Film).filter_by(uuid=uuid)
 
+    @staticmethod
+    def fetch_linked_keys(session: Session, film_id):
+        """``actor:<id>`` and ``genre:<id>`` keys of the rows a film shows"""
+        links = select(literal("actor"), MoviesActors.actor_id).where(
+            MoviesActors.film_id == film_id
+        )
+        links = links.union_all(
+            select(literal("genre"), MoviesGenres.genre_id).where(
+                MoviesGenres.film_id == film_id
+            )
+        )
+        return sorted(
+            f"{kind}:{linked_id}" for kind, linked_id in session.execute(links)
+        )
+
     @staticmethod
     def fetch_films_by_genre(
         session: Session,
@@ -45,72 +240,454 @@ class FilmService:
         year_from=None,
         year_to=None,
         rating_from=None,
+        columns=LIST_COLUMNS,
+        sort=None,
+    ):
+        """A page of the films of a genre, sorted as in ``fetch_all_films``"""
+        in_genre = (
+            exists()
+            .where(MoviesGenres.film_id == Film.id)
+            .where(MoviesGenres.genre_id == Genre.id)
+            .where(func.lower(Genre.name) == genre_name.lower())
+        )
+        query = session.query(*(getattr(Film, column) for column in columns)).filter(
+            in_genre
+        )
+        query = _filter_films(query, year_from, year_to, rating_from)
+        return _sort_films(query, sort).offset(page * offset).limit(offset)
+
+    @staticmethod
+    def fetch_films_by_actor(
+        session: Session,
+        actor_id,
+        limit,
+        sort="-release_date",
+        after=None,
+        columns=FILMOGRAPHY_COLUMNS,
     ):
+        """A page of the films of an actor, selecting only ``columns``
+
+        ``sort`` names a key of ``FILMOGRAPHY_SORTS``, prefixed with ``-``
+        for descending order. Rows also carry ``id`` and ``sort_key``, and
+        ``after`` is the ``(sort_key, id)`` of the last row already returned.
+        """
+        descending = sort.startswith("-")
+        key = FILMOGRAPHY_SORTS[sort.lstrip("-")]
         query = (
             session.query(
-                Film.title,
-                Film.uuid,
-                Film.title_original,
-                Film.poster,
-                Film.rating,
-                Film.description,
-                Film.release_date,
+                *(getattr(Film, column) for column in columns),
+                Film.id,
+                key.label("sort_key"),
             )
-            .join(MoviesGenres, MoviesGenres.film_id == Film.id)
-            .join(Genre, Genre.id == MoviesGenres.genre_id)
-            .group_by(Film.id)
-            .filter(func.lower(Genre.name) == genre_name.lower())
-        )
-        if year_from:
-            query = query.filter(Film.release_date >= date(year_from, 1, 1))
-        if year_to:
-            query = query.filter(Film.release_date <= date(year_to, 12, 31))
-        if rating_from:
-            query = query.filter(Film.rating >= rating_from)
-        return query.offset(page * offset).limit(offset)
+            .join(MoviesActors, MoviesActors.film_id == Film.id)
+            .filter(MoviesActors.actor_id == actor_id)
+        )
+        if after is not None:
+            position = tuple_(key, Film.id)
+            query = query.filter(position < after if descending else position > after)
+        if descending:
+            query = query.order_by(key.desc(), Film.id.desc())
+        else:
+            query = query.order_by(key, Film.id)
+        return query.limit(limit).all()
 
     @staticmethod
-    def bulk_create_films(session: Session, films):
-        film_schema = FilmSchema()
-        films_to_create = []
+    def fetch_films_by_id(session: Session, film_ids, columns=LIST_COLUMNS):
+        """Films of ``film_ids`` in the same order, missing ones left out"""
+        rows = (
+            session.query(Film.id, *(getattr(Film, column) for column in columns))
+            .filter(Film.id.in_(film_ids))
+            .all()
+        )
+        by_id = {row.id: row for row in rows}
+        return [by_id[film_id] for film_id in film_ids if film_id in by_id]
+
+    @staticmethod
+    def fetch_similar_films(
+        session: Session,
+        film_id,
+        limit,
+        columns=SIMILAR_COLUMNS,
+        neighbors=FilmNeighbor,
+    ):
+        """Stored similar films of a film, closest first, with their ``score``
+
+        ``neighbors`` is the model of the stored lists, ``FilmNeighbor`` for
+        genres and cast or ``PlotNeighbor`` for descriptions.
+        """
+        return (
+            session.query(*(getattr(Film, column) for column in columns))
+            .add_columns(neighbors.score)
+            .join(neighbors, neighbors.neighbor_id == Film.id)
+            .filter(neighbors.film_id == film_id)
+            .order_by(neighbors.rank)
+            .limit(limit)
+            .all()
+        )
 
-        all_actors = {actor.name: actor for actor in session.query(Actor).all()}
-        all_genres = {genre.name: genre for genre in session.query(Genre).all()}
+    @staticmethod
+    def bulk_create_films(session: Session, films):
+        """Upsert a batch of parsed films with set-based statements.
 
+        Existing films are matched by IMDb id, or by original title and
+        release date when there is none (see ``_natural_key``), with ``IN``
+        lookups and updated in place, keeping the stored value of columns
+        missing from the parsed data. Actors, genres and the association
+        tables are upserted with ``INSERT ... ON CONFLICT``, so the work done
+        depends on the size of the batch and not on the whole catalog.
+        Inserted and updated films are both (re)indexed for search.
+        """
+        film_schema = FilmSchema(exclude=("actors", "genres"), load_instance=False)
+        rows, actors_by_film, genres_by_film = {}, {}, {}
         for film_data in films:
-            existing_film = (
-                session.query(Film)
-                .filter_by(title_original=film_data["title_original"])
-                .first()
+            film_data = dict(film_data)
+            actors_data = film_data.pop("actors", [])
+            genres_data = film_data.pop("genres", [])
+            imdb_id = film_data.pop("imdb_id", None)
+            film = {**film_schema.load(film_data), "imdb_id": imdb_id}
+            key = _natural_key(film)
+            rows[key] = {column: film.get(column) for column in FILM_COLUMNS}
+            actors_by_film[key] = actors_data
+            genres_by_film[key] = genres_data
+        if not rows:
+            return {"inserted": 0, "updated": 0}
+
+        existing = _existing_uuids(session, rows)
+        updated_at = datetime.utcnow()
+        for key, row in rows.items():
+            row["uuid"] = existing.get(key) or str(uuid4())
+            row["updated_at"] = updated_at
+
+        film_ids, saved = {}, []
+        for batch in chunked(list(rows.values()), UPSERT_BATCH_SIZE):
+            stmt = _insert(session, Film).values(batch)
+            set_ = {
+                column: func.coalesce(stmt.excluded[column], getattr(Film, column))
+                for column in FILM_COLUMNS
+            }
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Film.uuid],
+                set_={**set_, "updated_at": stmt.excluded.updated_at},
+            ).returning(
+                Film.id, *(getattr(Film, field) for field in Film.SEARCH_FIELDS)
             )
+            for row in session.execute(stmt).mappings():
+                film_ids[row["uuid"]] = row["id"]
+                saved.append(row)
+
+        known_actors = _max_actor_id(session)
+        actor_ids = _upsert_names(session, Actor, actors_by_film.values())
+        genre_ids = _upsert_names(session, Genre, genres_by_film.values())
+        _link(
+            session,
+            MoviesActors,
+            "actor_id",
+            rows,
+            film_ids,
+            actors_by_film,
+            actor_ids,
+        )
+        _link(
+            session,
+            MoviesGenres,
+            "genre_id",
+            rows,
+            film_ids,
+            genres_by_film,
+            genre_ids,
+        )
+        recount(session, Actor, actor_ids.values())
+        recount(session, Genre, genre_ids.values())
+        leaderboards.track(session, film_ids.values())
+        _mark_films_changed(
+            session,
+            film_ids.values(),
+            [film_ids[uuid] for uuid in existing.values()],
+            known_actors,
+        )
+        if existing:
+            # links may have been added to films the co-star graph knows
+            mark_changed(session, CASTS_KEY)
+        session.commit()
+
+        _index_films(saved)
+        inserted = len(rows) - len(existing)
+        return {"inserted": inserted, "updated": len(existing)}
 
-            if existing_film is None:
-                actors_data = film_data.pop("actors", [])
-                genres_data = film_data.pop("genres", [])
-                actors = []
-                genres = []
-
-                for actor_name in actors_data:
-                    actor = all_actors.get(actor_name)
-                    if actor is None:
-                        actor = Actor(name=actor_name)
-                        all_actors[actor_name] = actor
-                        films_to_create.append(actor)
-                    actors.append(actor)
-
-                for genre_name in genres_data:
-                    genre = all_genres.get(genre_name)
-                    if genre is None:
-                        genre = Genre(name=genre_name)
-                        all_genres[genre_name] = genre
-                        films_to_create.append(genre)
-                    genres.append(genre)
-
-                film = film_schema.load(film_data, session=session)
-                film.actors = actors
-                film.genres = genres
-                films_to_create.append(film)
-
-        session.add_all(films_to_create)
+    @staticmethod
+    def reset_catalog(session: Session):
+        """Delete the whole catalog, with ``TRUNCATE`` where it is available"""
+        if session.get_bind().dialect.name == "postgresql":
+            session.execute(text(TRUNCATE_CATALOG))
+        else:
+            for model in (
+                FilmNeighbor,
+                PlotNeighbor,
+                PlotPosting,
+                PlotTerm,
+                MoviesActors,
+                MoviesGenres,
+                Comments,
+                Actor,
+                Genre,
+                Film,
+            ):
+                session.query(model).delete()
+        mark_changed(session, *CATALOG_KEYS, CASTS_KEY, ALL_SURROGATE_KEY)
         session.commit()
-        return len(films_to_create)
+        leaderboards.clear()
+
+    @staticmethod
+    def ingest_films(session: Session, films, batch_size=INGEST_BATCH_SIZE):
+        """Load a stream of films, far beyond what fits in memory.
+
+        On Postgres every batch is streamed with ``COPY FROM STDIN`` into a
+        temporary staging table and merged into the catalog with set-based
+        SQL. Other databases fall back to ``bulk_create_films``. ``films``
+        may be any iterable, it is consumed lazily one batch at a time, so
+        memory is bounded by ``batch_size``.
+        """
+        films = iter(films)
+        totals = {"inserted": 0, "updated": 0}
+        if session.get_bind().dialect.name == "postgresql":
+            ingest_batch = _copy_ingest
+        else:
+            ingest_batch = FilmService.bulk_create_films
+        while batch := list(islice(films, batch_size)):
+            counts = ingest_batch(session, batch)
+            totals["inserted"] += counts["inserted"]
+            totals["updated"] += counts["updated"]
+        return totals
+
+
+def _filter_films(query, year_from=None, year_to=None, rating_from=None):
+    if year_from:
+        query = query.filter(Film.release_date >= date(year_from, 1, 1))
+    if year_to:
+        query = query.filter(Film.release_date <= date(year_to, 12, 31))
+    if rating_from:
+        query = query.filter(Film.rating >= rating_from)
+    return query
+
+
+def _sort_films(query, sort=None):
+    if sort is None:
+        return query.order_by(Film.id)
+    key = FILM_SORTS[sort.lstrip("-")]
+    if sort.startswith("-"):
+        return query.order_by(key.desc(), Film.id.desc())
+    return query.order_by(key, Film.id)
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        end = start + size
+        yield items[start:end]
+
+
+def _insert(session: Session, model):
+    """Dialect specific ``INSERT`` supporting ``ON CONFLICT`` clauses"""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def _upsert_names(session: Session, model, names_per_film):
+    names = sorted({name for names in names_per_film for name in names})
+    ids = {}
+    for batch in chunked(names, UPSERT_BATCH_SIZE):
+        session.execute(
+            _insert(session, model)
+            .values([{"name": name} for name in batch])
+            .on_conflict_do_nothing(index_elements=[model.name])
+        )
+        ids.update(
+            session.execute(
+                select(model.name, model.id).where(model.name.in_(batch))
+            ).all()
+        )
+    return ids
+
+
+def _natural_key(film):
+    """The IMDb id of a film, or its original title and release date"""
+    return film.get("imdb_id") or (film["title_original"], film["release_date"])
+
+
+def _existing_uuids(session: Session, rows):
+    """Uuids of the stored films of ``rows``, by natural key
+
+    A film stored without an IMDb id is matched by original title and
+    release date, by one row at most, and gets the IMDb id of that row.
+    """
+    imdb_ids = {row["imdb_id"]: key for key, row in rows.items() if row["imdb_id"]}
+    existing = {}
+    for batch in chunked(list(imdb_ids), UPSERT_BATCH_SIZE):
+        stored = session.execute(
+            select(Film.imdb_id, Film.uuid).where(Film.imdb_id.in_(batch))
+        )
+        existing.update((imdb_ids[imdb_id], uuid) for imdb_id, uuid in stored)
+    unmatched = {
+        (row["title_original"], row["release_date"]): key
+        for key, row in rows.items()
+        if key not in existing
+    }
+    for batch in chunked(list(unmatched), UPSERT_BATCH_SIZE):
+        stored = session.execute(
+            select(Film.title_original, Film.release_date, Film.uuid).where(
+                Film.imdb_id.is_(None),
+                tuple_(Film.title_original, Film.release_date).in_(batch),
+            )
+        )
+        for title_original, release_date, uuid in stored:
+            key = unmatched.pop((title_original, release_date), None)
+            if key is not None:
+                existing[key] = uuid
+    return existing
+
+
+def _link(session: Session, model, column, rows, film_ids, names_by_film, ids):
+    links = {
+        (film_ids[row["uuid"]], ids[name])
+        for key, row in rows.items()
+        for name in names_by_film[key]
+    }
+    links = [{"film_id": film_id, column: other_id} for film_id, other_id in links]
+    for batch in chunked(links, UPSERT_BATCH_SIZE):
+        session.execute(_insert(session, model).values(batch).on_conflict_do_nothing())
+
+
+def _max_actor_id(session: Session) -> int:
+    return session.scalar(select(func.max(Actor.id))) or 0
+
+
+def _mark_films_changed(session: Session, film_ids, updated_ids, known_actors):
+    """Publish the lists, the updated films and the filmographies of their actors
+
+    Films inserted by the batch and actors created by it (ids above
+    ``known_actors``) were never served, so no key is published for them: a
+    fresh import only bumps the list generations instead of leaving a key that
+    never expires, and a purge, for every row.
+    """
+    mark_changed(session, *CATALOG_KEYS)
+    updated_ids = set(updated_ids)
+    for batch in chunked(sorted(film_ids), UPSERT_BATCH_SIZE):
+        updated = [film_id for film_id in batch if film_id in updated_ids]
+        uuids = (
+            session.scalars(select(Film.uuid).where(Film.id.in_(updated)))
+            if updated
+            else ()
+        )
+        actor_ids = session.scalars(
+            select(MoviesActors.actor_id)
+            .where(
+                MoviesActors.film_id.in_(batch),
+                MoviesActors.actor_id <= known_actors,
+            )
+            .distinct()
+        )
+        mark_changed(session, *film_keys(uuids, actor_ids))
+
+
+def _index_films(rows):
+    """Index ``rows`` by uuid, replacing the documents of updated films"""
+    if rows:
+        helpers.bulk(
+            es,
+            (
+                {
+                    "_index": "films",
+                    "_id": row["uuid"],
+                    "_source": {field: row[field] for field in Film.SEARCH_FIELDS},
+                }
+                for row in rows
+            ),
+        )
+
+
+class _LineStream(io.TextIOBase):
+    """File-like wrapper feeding lines from an iterator to ``copy_expert``"""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            parts.append(line)
+            length += len(line)
+        data = "".join(parts)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _pg_array(values):
+    escaped = (
+        '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        for value in values or []
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _csv_lines(films):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for film in films:
+        writer.writerow(
+            [film.get(column) for column in FILM_COLUMNS]
+            + [_pg_array(film.get("actors")), _pg_array(film.get("genres"))]
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _copy_ingest(session: Session, films):
+    connection = session.connection()
+    connection.execute(text(CREATE_STAGE_TABLE))
+    with connection.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(COPY_STAGE_TABLE, _LineStream(_csv_lines(films)))
+    # temporary tables are never analyzed by autovacuum
+    connection.execute(text("ANALYZE films_stage"))
+
+    known_actors = _max_actor_id(session)
+    for table, column in (("genres", "genres"), ("actors", "actors")):
+        connection.execute(text(MERGE_NAMES.format(table=table, column=column)))
+    connection.execute(text(RESOLVE_STAGED_FILMS))
+    updated = connection.execute(text(MERGE_UPDATED_FILMS)).mappings().all()
+    inserted = connection.execute(text(MERGE_INSERTED_FILMS)).mappings().all()
+    connection.execute(text(RESOLVE_STAGED_FILMS))
+    for table, column, names, linked_table in (
+        ("movies_actors", "actor_id", "actors", "actors"),
+        ("movies_genres", "genre_id", "genres", "genres"),
+    ):
+        for statement in (MERGE_LINKS, RECOUNT_LINKED):
+            connection.execute(
+                text(
+                    statement.format(
+                        table=table,
+                        column=column,
+                        names=names,
+                        linked_table=linked_table,
+                    )
+                )
+            )
+    film_ids = connection.execute(text(STAGED_FILM_IDS)).scalars().all()
+    leaderboards.track(session, film_ids)
+    _mark_films_changed(session, film_ids, [row["id"] for row in updated], known_actors)
+    if updated:
+        mark_changed(session, CASTS_KEY)
+    session.commit()
+    _index_films([*updated, *inserted])
+    return {"inserted": len(inserted), "updated": len(updated)}
@@ -0,0 +1,141 @@
+"""Change tracking for cached API representations
+
+Every committed write is translated into keys naming what it changed: the
+``films``, ``actors`` and ``genres`` lists and single entities such as
+``film:<uuid>``, ``actor:<id>``, ``genre:<id>`` and the filmography of an
+actor, ``actor:<id>:films``. Details are versioned on the keys of the rows
+they show, a film on its actors and genres, so a write only changes the
+ETags of the details it touches. The same keys tag responses in their
+``Surrogate-Key`` header. After commit they bump generation counters in
+Redis that version ETags, and are handed to the callbacks registered with
+``on_publish``, the CDN purge among them.
+
+ORM writes are picked up from the session on flush, bulk writes done with
+Core statements name their keys with ``mark_changed``. Nothing is
+published for a rolled back transaction.
+"""
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from filmapi.extensions import redis_client
+from filmapi.models import Actor, Comments, Film, Genre, User
+
+# keys of the lists
+CATALOG_KEYS = ("films", "actors", "genres")
+# bumped when links between films and actors are removed, or added to films
+# that already existed, which extending the co-star graph cannot pick up
+CASTS_KEY = "casts"
+# callbacks receiving the keys of every commit
+subscribers = []
+
+
+def generation_key(key):
+    return f"generation:{key}"
+
+
+def generations(*keys):
+    """Current counters of ``keys``, in order"""
+    values = redis_client.mget([generation_key(key) for key in keys])
+    return [int(value or 0) for value in values]
+
+
+def bump(*keys):
+    pipe = redis_client.pipeline()
+    for key in keys:
+        pipe.incr(generation_key(key))
+    pipe.execute()
+
+
+def publish(*keys):
+    """Bump ``keys`` and hand them to the subscribers right away
+
+    For writes that happen outside a database transaction.
+    """
+    bump(*keys)
+    for callback in subscribers:
+        callback(set(keys))
+
+
+def on_publish(callback):
+    """Call ``callback`` with the keys published by every commit"""
+    if callback not in subscribers:
+        subscribers.append(callback)
+    return callback
+
+
+def mark_changed(session: Session, *keys):
+    """Publish ``keys`` once ``session`` commits"""
+    session.info.setdefault("changed_keys", set()).update(keys)
+
+
+def film_keys(film_uuids=(), actor_ids=()):
+    """Keys of films and of the filmographies of actors they are linked to"""
+    return (
+        *(f"film:{uuid}" for uuid in film_uuids),
+        *(f"actor:{actor_id}:films" for actor_id in actor_ids),
+    )
+
+
+def _linked(instance, relationship, load=True):
+    """Rows linked before or after the flush, and whether the links changed"""
+    attr = inspect(instance).attrs[relationship]
+    history = attr.load_history() if load else attr.history
+    linked = [*history.added, *history.unchanged, *history.deleted]
+    return linked, history.has_changes()
+
+
+def changed_keys(instance, change="dirty"):
+    """Keys published for ``instance``, ``change`` is new, dirty or deleted"""
+    if isinstance(instance, Film):
+        actors, actors_changed = _linked(instance, "actors")
+        _, genres_changed = _linked(instance, "genres", load=False)
+        keys = ["films", *film_keys([instance.uuid], [actor.id for actor in actors])]
+        # lists count the films of actors and genres
+        if change != "dirty" or actors_changed:
+            keys.append("actors")
+        if change != "dirty" or genres_changed:
+            keys.append("genres")
+        if change == "deleted" or (change == "dirty" and actors_changed):
+            keys.append(CASTS_KEY)
+        return keys
+    if isinstance(instance, Actor):
+        films, films_changed = _linked(instance, "films", load=False)
+        keys = ["actors", f"actor:{instance.id}"]
+        if films_changed:
+            keys += ["films", *film_keys([film.uuid for film in films], [instance.id])]
+        if change == "deleted" or films_changed:
+            keys.append(CASTS_KEY)
+        return keys
+    if isinstance(instance, Genre):
+        # lists filter films by genre name
+        return ("genres", f"genre:{instance.id}", "films")
+    if isinstance(instance, Comments) and instance.film is not None:
+        return (f"film:{instance.film.uuid}",)
+    if isinstance(instance, User) and change != "dirty":
+        # only the total of the user list is versioned
+        return ("users",)
+    return ()
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changed_keys(session, flush_context):
+    for instances, change in (
+        (session.new, "new"),
+        (session.dirty, "dirty"),
+        (session.deleted, "deleted"),
+    ):
+        for instance in instances:
+            if keys := changed_keys(instance, change):
+                mark_changed(session, *keys)
+
+
+@event.listens_for(Session, "after_commit")
+def publish_changed_keys(session):
+    keys = session.info.pop("changed_keys", None)
+    if keys:
+        publish(*keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changed_keys(session):
+    session.info.pop("changed_keys", None)
@@ -0,0 +1,155 @@
+import csv
+import gzip
+import os
+import sqlite3
+import tempfile
+from itertools import groupby, islice
+from operator import itemgetter
+
+MISSING = "\\N"
+CAST_CATEGORIES = ("actor", "actress")
+NAME_INDEX_BATCH_SIZE = 50000
+PROGRESS_EVERY = 10000
+
+
+def read_tsv(path, columns):
+    """Stream selected columns of a gzip compressed IMDb TSV file"""
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as file:
+        reader = csv.reader(file, delimiter="\t", quoting=csv.QUOTE_NONE)
+        header = next(reader)
+        getter = itemgetter(*(header.index(column) for column in columns))
+        for row in reader:
+            yield getter(row)
+
+
+def imdb_id(value):
+    """Numeric part of a ``tt``/``nm`` identifier, the order datasets use"""
+    return int(value[2:])
+
+
+class _MergeLookup:
+    """Lookup into rows grouped by title, for titles requested in order"""
+
+    def __init__(self, rows):
+        self._groups = (
+            (imdb_id(tconst), list(group))
+            for tconst, group in groupby(rows, key=itemgetter(0))
+        )
+        self._current = next(self._groups, None)
+
+    def get(self, number):
+        while self._current is not None and self._current[0] < number:
+            self._current = next(self._groups, None)
+        if self._current is not None and self._current[0] == number:
+            return self._current[1]
+        return None
+
+
+class IMDbDatasetReader:
+    """Join the IMDb TSV datasets into film dicts with bounded memory
+
+    ``title.basics``, ``title.ratings`` and ``title.principals`` are sorted
+    by title id, so they are merge-joined while streaming. Actor names come
+    from ``name.basics``, which is sorted by name id, so it is first copied
+    into an on-disk SQLite index instead of being held in memory.
+    """
+
+    def __init__(
+        self,
+        basics,
+        ratings,
+        principals,
+        names,
+        title_types=("movie",),
+        min_votes=0,
+        max_cast=10,
+    ):
+        self.basics = basics
+        self.ratings = ratings
+        self.principals = principals
+        self.names = names
+        self.title_types = set(title_types)
+        self.min_votes = min_votes
+        self.max_cast = max_cast
+
+    def build_name_index(self, connection, progress=None):
+        connection.execute("CREATE TABLE names (nconst INTEGER PRIMARY KEY, name TEXT)")
+        rows = (
+            (imdb_id(nconst), name)
+            for nconst, name in read_tsv(self.names, ("nconst", "primaryName"))
+        )
+        indexed = 0
+        while batch := list(islice(rows, NAME_INDEX_BATCH_SIZE)):
+            connection.executemany("INSERT OR REPLACE INTO names VALUES (?, ?)", batch)
+            indexed += len(batch)
+            if progress:
+                progress("names indexed", indexed)
+        connection.commit()
+
+    def films(self, progress=None):
+        with tempfile.TemporaryDirectory() as directory:
+            connection = sqlite3.connect(os.path.join(directory, "names.sqlite"))
+            try:
+                self.build_name_index(connection, progress)
+                for count, film in enumerate(self._join(connection), start=1):
+                    yield film
+                    if progress and count % PROGRESS_EVERY == 0:
+                        progress("films read", count)
+            finally:
+                connection.close()
+
+    def _join(self, names):
+        ratings = _MergeLookup(
+            read_tsv(self.ratings, ("tconst", "averageRating", "numVotes"))
+        )
+        principals = _MergeLookup(
+            row
+            for row in read_tsv(self.principals, ("tconst", "nconst", "category"))
+            if row[2] in CAST_CATEGORIES
+        )
+        basics = read_tsv(
+            self.basics,
+            (
+                "tconst",
+                "titleType",
+                "primaryTitle",
+                "originalTitle",
+                "startYear",
+                "runtimeMinutes",
+                "genres",
+            ),
+        )
+        max_cast = self.max_cast
+        for tconst, title_type, title, original, year, runtime, genres in basics:
+            if title_type not in self.title_types or year == MISSING:
+                continue
+            number = imdb_id(tconst)
+            rating = ratings.get(number)
+            votes = int(rating[0][2]) if rating else 0
+            if votes < self.min_votes:
+                continue
+            cast = (principals.get(number) or [])[:max_cast]
+            yield {
+                "imdb_id": tconst,
+                "title": title,
+                "title_original": original,
+                "release_date": f"{year}-1-1",
+                "distributed_by": "",
+                "length": None if runtime == MISSING else float(runtime),
+                "rating": float(rating[0][1]) if rating else None,
+                "actors": self._actor_names(names, cast),
+                "genres": [] if genres == MISSING else genres.split(","),
+            }
+
+    @staticmethod
+    def _actor_names(names, cast):
+        if not cast:
+            return []
+        ids = [imdb_id(nconst) for _, nconst, _ in cast]
+        placeholders = ", ".join("?" * len(ids))
+        found = dict(
+            names.execute(
+                f"SELECT nconst, name FROM names WHERE nconst IN ({placeholders})", ids
+            )
+        )
+        return list(dict.fromkeys(found[id_] for id_ in ids if id_ in found))
@@ -1,11 +1,16 @@
 import asyncio
+import re
 
 from bs4 import BeautifulSoup
 import concurrent.futures
 import json
+from urllib.parse import urljoin
 from flask import current_app as app
 from aiohttp import ClientSession
 
+TITLE_HREF = re.compile(r"^(?:https?://(?:www\.)?imdb\.com)?/title/(tt\d+)")
+NEXT_PAGE_CLASS = re.compile(r"next-page|lister-page-next")
+
 
 class IMDbParser:
     def __init__(self, headers):
@@ -25,6 +30,22 @@ class IMDbParser:
                 f"{self.base_url}{movie.a.attrs['href']}" for movie in movie_containers
             ]
 
+    def get_links_from_listing(self, html_content, page_url):
+        """Return film links and the next page url found on a listing page"""
+        soup = BeautifulSoup(html_content, "lxml")
+        title_ids = []
+        for anchor in soup.find_all("a", href=TITLE_HREF):
+            title_ids.append(TITLE_HREF.match(anchor.attrs["href"]).group(1))
+        links = [f"{self.base_url}/title/{title_id}/" for title_id in title_ids]
+
+        next_anchor = soup.find("a", attrs={"rel": "next"}) or soup.find(
+            "a", class_=NEXT_PAGE_CLASS, href=True
+        )
+        next_page = None
+        if next_anchor and next_anchor.attrs.get("href"):
+            next_page = urljoin(page_url, next_anchor.attrs["href"])
+        return list(dict.fromkeys(links)), next_page
+
     async def get_response_from_link(self, session: ClientSession, link: str):
         async with session.get(link, headers=self.headers) as response:
             return await response.text()
@@ -32,8 +53,9 @@ class IMDbParser:
     def get_data_from_response(self, response) -> dict:
         soup = BeautifulSoup(response, "lxml")
         data = soup.find("script", id="__NEXT_DATA__")
-        if data:
-            json_data = json.loads(data.string)
+        if not data:
+            raise ValueError("Page does not contain film data")
+        json_data = json.loads(data.string)
         film_info_1: dict = json_data["props"]["pageProps"]["aboveTheFoldData"]
         film_info_2: dict = json_data["props"]["pageProps"]["mainColumnData"]
 
@@ -92,6 +114,8 @@ class IMDbParser:
             trailer = ""
 
         return {
+            "imdb_id": json_data["props"]["pageProps"].get("tconst")
+            or film_info_1.get("id"),
             "title": title,
             "rating": rating,
             "description": description,
@@ -106,6 +130,31 @@ class IMDbParser:
             "trailer": trailer,
         }
 
+    async def discover_movie_links(self):
+        async with ClientSession(headers=self.headers) as session:
+            await self.get_movie_links(session)
+        return self.movie_links
+
+    async def fetch_pages(self, links):
+        """Fetch pages concurrently, pages that failed to load are skipped"""
+        async with ClientSession(headers=self.headers) as session:
+            responses = await asyncio.gather(
+                *(self.get_response_from_link(session, link) for link in links),
+                return_exceptions=True,
+            )
+        return [page for page in responses if not isinstance(page, BaseException)]
+
+    def parse_pages(self, pages):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            films = executor.map(self.safe_get_data_from_response, pages)
+            return [film for film in films if film is not None]
+
+    def safe_get_data_from_response(self, response):
+        try:
+            return self.get_data_from_response(response)
+        except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+            return None
+
     async def parse_movies(self, link=None):
         async with ClientSession(headers=app.config.get("HEADERS", {})) as session:
             if link:
@@ -0,0 +1,204 @@
+"""Highest rated films by genre and decade in Redis sorted sets
+
+Every rated film is a member of the sorted sets of the whole catalog, of
+its decade, of each of its genres and of each genre in its decade, scored
+by its rating, so a top ``k`` is one ``ZREVRANGE`` in O(log n + k). The
+``leaderboard:films`` hash remembers the sets a film is in, which lets
+one Lua script move it atomically when its rating, release date or
+genres change.
+
+ORM writes are picked up on flush, bulk writes name their films with
+``track``. Either way the films are read back inside the transaction and
+the sorted sets updated once it commits, nothing is published for a
+rolled back transaction. ``rebuild`` restores every set from the
+database.
+"""
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from filmapi.extensions import redis_client
+from filmapi.models import Film, MoviesGenres
+
+PREFIX = "leaderboard:"
+REBUILD_PREFIX = "leaderboard-rebuild:"
+MEMBERSHIPS = f"{PREFIX}films"
+IN_BATCH_SIZE = 1000
+FILMS_BATCH_SIZE = 10000
+# attributes of a film deciding its place in the leaderboards
+RANKED_ATTRIBUTES = ("rating", "release_date", "genres")
+
+PLACE = """
+local film = ARGV[1]
+local keys = {}
+for i = 3, #ARGV do
+    keys[ARGV[i]] = true
+end
+local previous = redis.call("HGET", KEYS[1], film)
+if previous then
+    for key in string.gmatch(previous, "%S+") do
+        if not keys[key] then
+            redis.call("ZREM", key, film)
+        end
+    end
+end
+if #ARGV < 3 then
+    redis.call("HDEL", KEYS[1], film)
+    return 0
+end
+for i = 3, #ARGV do
+    redis.call("ZADD", ARGV[i], ARGV[2], film)
+end
+redis.call("HSET", KEYS[1], film, table.concat(ARGV, " ", 3))
+return #ARGV - 2
+"""
+place = redis_client.register_script(PLACE)
+
+
+def leaderboard_key(genre_id=None, decade=None):
+    parts = [f"genre:{genre_id}"] if genre_id is not None else []
+    if decade is not None:
+        parts.append(f"decade:{decade}")
+    return PREFIX + (":".join(parts) or "all")
+
+
+def film_keys(rating, release_date, genre_ids):
+    """Sorted sets a film belongs to, none when it is not rated"""
+    if rating is None:
+        return []
+    decade = release_date.year // 10 * 10
+    keys = [leaderboard_key(), leaderboard_key(decade=decade)]
+    for genre_id in sorted(genre_ids):
+        keys += [leaderboard_key(genre_id), leaderboard_key(genre_id, decade)]
+    return keys
+
+
+def _entries(session, film_ids=None):
+    """``(film_id, rating, keys)`` of films, of every rated one by default"""
+    query = (
+        select(Film.id, Film.rating, Film.release_date, MoviesGenres.genre_id)
+        .outerjoin(MoviesGenres, MoviesGenres.film_id == Film.id)
+        .order_by(Film.id)
+    )
+    if film_ids is None:
+        batches = [
+            session.execute(
+                query.where(Film.rating.is_not(None)).execution_options(
+                    yield_per=FILMS_BATCH_SIZE
+                )
+            )
+        ]
+    else:
+        film_ids = sorted(film_ids)
+        batches = (
+            session.execute(query.where(Film.id.in_(film_ids[start:][:IN_BATCH_SIZE])))
+            for start in range(0, len(film_ids), IN_BATCH_SIZE)
+        )
+    for rows in batches:
+        film = None
+        for film_id, rating, release_date, genre_id in rows:
+            if film is not None and film[0] != film_id:
+                yield film[0], film[1], film_keys(*film[1:])
+                film = None
+            if film is None:
+                film = (film_id, rating, release_date, set())
+            if genre_id is not None:
+                film[3].add(genre_id)
+        if film is not None:
+            yield film[0], film[1], film_keys(*film[1:])
+
+
+def track(session: Session, film_ids):
+    """Update the leaderboards of ``film_ids`` once ``session`` commits"""
+    pending = session.info.setdefault("leaderboard_films", {})
+    film_ids = set(film_ids)
+    for film_id, rating, keys in _entries(session, film_ids):
+        pending[film_id] = (rating, keys)
+    # deleted films
+    for film_id in film_ids - pending.keys():
+        pending[film_id] = (None, [])
+
+
+def _ranking_changed(film):
+    attrs = inspect(film).attrs
+    return any(attrs[name].history.has_changes() for name in RANKED_ATTRIBUTES)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_films(session, flush_context):
+    films = session.info.setdefault("leaderboard_flushed", set())
+    for instance in (*session.new, *session.deleted):
+        if isinstance(instance, Film):
+            films.add(instance.id)
+    for instance in session.dirty:
+        if isinstance(instance, Film) and _ranking_changed(instance):
+            films.add(instance.id)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def read_films(session, flush_context):
+    if films := session.info.pop("leaderboard_flushed", None):
+        track(session, films)
+
+
+@event.listens_for(Session, "after_commit")
+def publish_films(session):
+    films = session.info.pop("leaderboard_films", None)
+    if not films:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for film_id, (rating, keys) in films.items():
+        place(keys=[MEMBERSHIPS], args=[film_id, rating or 0, *keys], client=pipe)
+    pipe.execute()
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_films(session):
+    session.info.pop("leaderboard_flushed", None)
+    session.info.pop("leaderboard_films", None)
+
+
+def top(genre_id=None, decade=None, limit=10):
+    """``(film_id, rating)`` of the ``limit`` highest rated films"""
+    key = leaderboard_key(genre_id, decade)
+    members = redis_client.zrevrange(key, 0, limit - 1, withscores=True)
+    return [(int(film_id), rating) for film_id, rating in members]
+
+
+def clear():
+    """Remove every leaderboard"""
+    keys = list(redis_client.scan_iter(f"{PREFIX}*", count=1000))
+    for start in range(0, len(keys), IN_BATCH_SIZE):
+        redis_client.delete(*keys[start:][:IN_BATCH_SIZE])
+
+
+def rebuild(session: Session):
+    """Restore every leaderboard from the database, returning the film count
+
+    The sets are written under temporary names and renamed over the
+    current ones at the end. Writes committed while it runs may be lost,
+    run it when the catalog is quiet.
+    """
+    # leftovers of an interrupted rebuild
+    for key in redis_client.scan_iter(f"{REBUILD_PREFIX}*", count=1000):
+        redis_client.delete(key)
+    staged, films = set(), 0
+    pipe = redis_client.pipeline(transaction=False)
+    for film_id, rating, keys in _entries(session):
+        for key in keys:
+            pipe.zadd(REBUILD_PREFIX + key, {film_id: rating})
+        pipe.hset(REBUILD_PREFIX + MEMBERSHIPS, film_id, " ".join(keys))
+        staged.update(keys)
+        films += 1
+        if len(pipe) >= FILMS_BATCH_SIZE:
+            pipe.execute()
+    pipe.execute()
+
+    renamed = {*staged, MEMBERSHIPS} if films else set()
+    stale = set(redis_client.scan_iter(f"{PREFIX}*", count=1000)) - renamed
+    pipe = redis_client.pipeline()
+    for key in renamed:
+        pipe.rename(REBUILD_PREFIX + key, key)
+    for key in stale:
+        pipe.delete(key)
+    pipe.execute()
+    return films
@@ -0,0 +1,272 @@
+"""TF-IDF index of film descriptions
+
+Descriptions are split into lowercase words, stop words dropped, and
+weighted with sublinear term frequency times smoothed idf. Only the
+``max_terms`` heaviest terms of a description are kept, L2 normalized, so
+the dot product of two vectors is their cosine similarity. Postings of a
+term are pruned to its ``max_postings`` heaviest at build time: scoring a
+film then costs at most ``max_terms * max_postings`` additions, whereas
+common terms would make it quadratic in the catalog size, and only films
+for which a common term matters little lose it.
+
+``rebuild_plot_index`` computes the vocabulary, the postings and the
+closest films of every film from scratch. ``update_plot_index`` only
+indexes films added since, scoring them against the stored postings with
+the stored idf, and inserts them into the neighbor lists of the films
+they are close to. Terms unknown to the vocabulary are ignored until the
+next rebuild.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, func, insert, select
+
+from filmapi.models import Film, PlotNeighbor, PlotPosting, PlotTerm
+from filmapi.services.film_service import chunked
+from filmapi.services.generations import mark_changed
+
+DESCRIPTIONS_BATCH_SIZE = 10000
+INSERT_BATCH_SIZE = 10000
+IN_BATCH_SIZE = 1000
+MAX_TERM_LENGTH = 64
+
+TOKEN = re.compile(r"[a-z][a-z']+")
+STOP_WORDS = frozenset(
+    """
+    about above after again against all also and any are because been before
+    being below between both but can could did does doing down during each
+    few for from further had has have having her here hers herself him
+    himself his how into its itself just more most must not now off once
+    only other our ours out over own same she should some such than that
+    the their theirs them then there these they this those through too
+    under until very was were what when where which while who whom why will
+    with would you your yours yourself
+    """.split()
+)
+
+
+def tokenize(text):
+    """Indexed words of ``text``, in order"""
+    words = (word.strip("'") for word in TOKEN.findall(text.lower()))
+    return [
+        word[:MAX_TERM_LENGTH]
+        for word in words
+        if len(word) > 2 and word not in STOP_WORDS
+    ]
+
+
+def plot_vector(terms, idf, max_terms):
+    """Normalized weights of the ``max_terms`` heaviest known ``terms``"""
+    counts = Counter(term for term in terms if term in idf)
+    weights = {
+        term: (1 + math.log(count)) * idf[term] for term, count in counts.items()
+    }
+    top = heapq.nlargest(
+        max_terms, weights.items(), key=lambda item: (item[1], item[0])
+    )
+    norm = math.sqrt(sum(weight * weight for _, weight in top))
+    return {term: weight / norm for term, weight in top}
+
+
+def similarities(vector, postings):
+    """Cosine similarity of ``vector`` with every film sharing a term
+
+    ``postings`` maps terms to ``(film_id, weight)`` pairs.
+    """
+    scores = defaultdict(float)
+    for term, weight in vector.items():
+        for film_id, other in postings.get(term, ()):
+            scores[film_id] += weight * other
+    return scores
+
+
+def closest(scores, film_id, k):
+    scores.pop(film_id, None)
+    return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def _descriptions(session, after=0):
+    return session.execute(
+        select(Film.id, Film.description)
+        .where(Film.id > after, Film.description.is_not(None))
+        .order_by(Film.id)
+        .execution_options(yield_per=DESCRIPTIONS_BATCH_SIZE)
+    )
+
+
+def _insert_batches(session, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == INSERT_BATCH_SIZE:
+            session.execute(insert(model), batch)
+            batch = []
+    if batch:
+        session.execute(insert(model), batch)
+
+
+def _neighbor_rows(film_id, neighbors):
+    return (
+        {"film_id": film_id, "rank": rank, "neighbor_id": other, "score": score}
+        for rank, (other, score) in enumerate(neighbors)
+    )
+
+
+def rebuild_plot_index(session, k, max_terms, max_df, max_postings):
+    """Index every description and store the ``k`` closest films of each
+
+    Terms in a single description or in more than ``max_df`` of them are
+    left out of the vocabulary. Returns the number of indexed films.
+    """
+    document_counts, documents = Counter(), 0
+    for _, description in _descriptions(session):
+        document_counts.update(set(tokenize(description)))
+        documents += 1
+    idf = {
+        term: math.log((1 + documents) / (1 + count)) + 1
+        for term, count in document_counts.items()
+        if 1 < count <= max_df * documents
+    }
+    vectors, postings = {}, defaultdict(list)
+    for film_id, description in _descriptions(session):
+        if vector := plot_vector(tokenize(description), idf, max_terms):
+            vectors[film_id] = vector
+            for term, weight in vector.items():
+                postings[term].append((film_id, weight))
+    for term, films in postings.items():
+        if len(films) > max_postings:
+            postings[term] = heapq.nlargest(
+                max_postings, films, key=lambda item: (item[1], -item[0])
+            )
+
+    for model in (PlotNeighbor, PlotPosting, PlotTerm):
+        session.execute(delete(model))
+    _insert_batches(
+        session, PlotTerm, ({"term": term, "idf": value} for term, value in idf.items())
+    )
+    _insert_batches(
+        session,
+        PlotPosting,
+        (
+            {"term": term, "film_id": film_id, "weight": weight}
+            for term, films in postings.items()
+            for film_id, weight in films
+        ),
+    )
+    _insert_batches(
+        session,
+        PlotNeighbor,
+        (
+            row
+            for film_id, vector in vectors.items()
+            for row in _neighbor_rows(
+                film_id, closest(similarities(vector, postings), film_id, k)
+            )
+        ),
+    )
+    mark_changed(session, "plots")
+    session.commit()
+    return len(vectors)
+
+
+def _stored_postings(session, terms):
+    postings = defaultdict(list)
+    for batch in chunked(sorted(terms), IN_BATCH_SIZE):
+        rows = session.execute(
+            select(PlotPosting.term, PlotPosting.film_id, PlotPosting.weight).where(
+                PlotPosting.term.in_(batch)
+            )
+        )
+        for term, film_id, weight in rows:
+            postings[term].append((film_id, weight))
+    return postings
+
+
+def _stored_neighbors(session, film_ids):
+    neighbors = defaultdict(list)
+    for batch in chunked(sorted(film_ids), IN_BATCH_SIZE):
+        rows = session.execute(
+            select(PlotNeighbor.film_id, PlotNeighbor.neighbor_id, PlotNeighbor.score)
+            .where(PlotNeighbor.film_id.in_(batch))
+            .order_by(PlotNeighbor.film_id, PlotNeighbor.rank)
+        )
+        for film_id, other, score in rows:
+            neighbors[film_id].append((other, score))
+    return neighbors
+
+
+def update_plot_index(session, k, max_terms, max_df, max_postings):
+    """Index the films added since the last run
+
+    Falls back to ``rebuild_plot_index`` while the index is empty. Returns
+    the number of indexed films.
+    """
+    if session.scalar(select(func.count()).select_from(PlotTerm)) == 0:
+        return rebuild_plot_index(session, k, max_terms, max_df, max_postings)
+    # films whose description has no known term, or whose postings were all
+    # pruned, are looked at again next time
+    after = session.scalar(select(func.max(PlotPosting.film_id))) or 0
+    descriptions = {
+        film_id: tokenize(description)
+        for film_id, description in _descriptions(session, after)
+    }
+    terms = {term for words in descriptions.values() for term in words}
+    idf = {}
+    for batch in chunked(sorted(terms), IN_BATCH_SIZE):
+        idf.update(
+            session.execute(
+                select(PlotTerm.term, PlotTerm.idf).where(PlotTerm.term.in_(batch))
+            ).all()
+        )
+    vectors = {}
+    for film_id, words in descriptions.items():
+        if vector := plot_vector(words, idf, max_terms):
+            vectors[film_id] = vector
+    if not vectors:
+        return 0
+    _insert_batches(
+        session,
+        PlotPosting,
+        (
+            {"term": term, "film_id": film_id, "weight": weight}
+            for film_id, vector in vectors.items()
+            for term, weight in vector.items()
+        ),
+    )
+
+    postings = _stored_postings(session, {term for v in vectors.values() for term in v})
+    lists, candidates = {}, defaultdict(list)
+    for film_id, vector in vectors.items():
+        scores = similarities(vector, postings)
+        lists[film_id] = closest(scores, film_id, k)
+        for other, score in scores.items():
+            if other not in vectors:
+                candidates[other].append((film_id, score))
+    # similarity is symmetric, new films may enter the lists of older ones
+    stored = _stored_neighbors(session, candidates)
+    for other, scores in candidates.items():
+        current = stored.get(other, [])
+        merged = heapq.nlargest(
+            k, current + scores, key=lambda item: (item[1], -item[0])
+        )
+        if merged != current:
+            lists[other] = merged
+
+    for batch in chunked(sorted(lists), IN_BATCH_SIZE):
+        session.execute(delete(PlotNeighbor).where(PlotNeighbor.film_id.in_(batch)))
+    _insert_batches(
+        session,
+        PlotNeighbor,
+        (
+            row
+            for film_id, neighbors in lists.items()
+            for row in _neighbor_rows(film_id, neighbors)
+        ),
+    )
+    for batch in chunked(sorted(lists), IN_BATCH_SIZE):
+        uuids = session.scalars(select(Film.uuid).where(Film.id.in_(batch)))
+        mark_changed(session, *(f"film:{uuid}" for uuid in uuids))
+    session.commit()
+    return len(vectors)
@@ -0,0 +1,56 @@
+from uuid import uuid4
+
+from filmapi.extensions import es
+
+FILMS_ALIAS = "films"
+# explicit mappings, an index created by a write would guess them
+FILMS_MAPPINGS = {
+    "properties": {
+        "title": {"type": "text"},
+        "title_original": {"type": "text"},
+        "description": {"type": "text"},
+        "uuid": {"type": "keyword"},
+        "release_date": {"type": "date"},
+        "distributed_by": {"type": "keyword"},
+        "length": {"type": "float"},
+        "rating": {"type": "float"},
+        "budget": {"type": "keyword", "index": False},
+        "poster": {"type": "keyword", "index": False},
+        "trailer": {"type": "keyword", "index": False},
+    }
+}
+
+
+def swap_in_empty_index(alias=FILMS_ALIAS):
+    """Point ``alias`` at a new empty index and drop the indices behind it.
+
+    Searches and writes keep working during the swap, readers see either
+    the old documents or an empty index, never a missing one. The swap is a
+    single ``update_aliases`` call, so no write can create a concrete index
+    named as the alias in between.
+    """
+    new_index = f"{alias}-{uuid4().hex[:12]}"
+    es.indices.create(index=new_index, mappings=FILMS_MAPPINGS)
+    if es.indices.exists_alias(name=alias):
+        old_indices = list(es.indices.get_alias(name=alias))
+        es.indices.update_aliases(
+            actions=[
+                *(
+                    {"remove": {"index": index, "alias": alias}}
+                    for index in old_indices
+                ),
+                {"add": {"index": new_index, "alias": alias}},
+            ]
+        )
+        es.indices.delete(index=",".join(old_indices))
+    elif es.indices.exists(index=alias):
+        # first reset, the data still lives in a concrete index named as the alias
+        es.indices.update_aliases(
+            actions=[
+                {"remove_index": {"index": alias}},
+                {"add": {"index": new_index, "alias": alias}},
+            ]
+        )
+    else:
+        es.indices.put_alias(index=new_index, name=alias)
+    return new_index
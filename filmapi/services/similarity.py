@@ -0,0 +1,156 @@
+"""Similar films from shared genres and cast
+
+Films are compared by cosine similarity of their genre and actor
+memberships, weighted and summed:
+
+    score = genre_weight * cos(genres) + actor_weight * cos(actors)
+
+Both memberships are kept sparse, as the films of every actor and of
+every genre set, so a film is only scored against the films it shares an
+actor with. Films sharing no actor all score ``genre_weight * cos(genres)``,
+which only depends on their genre set: they are taken in bulk from the
+closest genre sets, whose similarities are computed once per set. The
+``compute_similar_films`` task stores the top films of every film in
+``film_neighbors``, which the similar films endpoint reads by primary key.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import groupby
+
+from sqlalchemy import delete, insert, select
+
+from filmapi.models import FilmNeighbor, MoviesActors, MoviesGenres
+from filmapi.services.generations import mark_changed
+
+LINKS_BATCH_SIZE = 100000
+NEIGHBORS_BATCH_SIZE = 10000
+
+
+def _cosine(shared, size, other_size):
+    return shared / math.sqrt(size * other_size)
+
+
+def _memberships(session, film_column, member_column):
+    """Sorted ``member_column`` ids of every film of a link table"""
+    rows = session.execute(
+        select(film_column, member_column)
+        .order_by(film_column, member_column)
+        .execution_options(yield_per=LINKS_BATCH_SIZE)
+    )
+    return {
+        film_id: tuple(member for _, member in members)
+        for film_id, members in groupby(rows, key=lambda row: row[0])
+    }
+
+
+class SimilarityIndex:
+    def __init__(self, genres, actors, genre_weight, actor_weight):
+        self.genres = genres
+        self.actors = actors
+        self.genre_weight = genre_weight
+        self.actor_weight = actor_weight
+        self.films_by_actor = defaultdict(list)
+        for film_id, cast in actors.items():
+            for actor_id in cast:
+                self.films_by_actor[actor_id].append(film_id)
+        # cast sizes are folded into one factor per film: 1 / sqrt(size)
+        self.cast_norms = {
+            film_id: 1 / math.sqrt(len(cast)) for film_id, cast in actors.items()
+        }
+        self.films_by_genres = defaultdict(list)
+        for film_id in sorted(genres.keys() | actors.keys()):
+            self.films_by_genres[genres.get(film_id, ())].append(film_id)
+
+    @classmethod
+    def build(cls, session, genre_weight, actor_weight):
+        genres = _memberships(session, MoviesGenres.film_id, MoviesGenres.genre_id)
+        actors = _memberships(session, MoviesActors.film_id, MoviesActors.actor_id)
+        return cls(genres, actors, genre_weight, actor_weight)
+
+    def genre_similarity(self, genres, other):
+        if not genres or not other:
+            return 0.0
+        return _cosine(len(set(genres).intersection(other)), len(genres), len(other))
+
+    def closest_genre_sets(self, genres):
+        """Genre sets sharing a genre with ``genres``, most similar first"""
+        similar = (
+            (self.genre_similarity(genres, other), other)
+            for other in self.films_by_genres
+        )
+        return sorted(
+            (item for item in similar if item[0] > 0),
+            key=lambda item: (-item[0], item[1]),
+        )
+
+    def nearest(self, film_id, k, closest_genre_sets=None):
+        """The ``k`` most similar films of ``film_id`` with their scores
+
+        ``closest_genre_sets`` of the genres of the film may be passed when
+        several films of the same genre set are scored in a row.
+        """
+        if closest_genre_sets is None:
+            closest_genre_sets = self.closest_genre_sets(self.genres.get(film_id, ()))
+        genre_scores = {
+            genres: self.genre_weight * similarity
+            for similarity, genres in closest_genre_sets
+        }
+        shared = Counter()
+        for actor_id in self.actors.get(film_id, ()):
+            shared.update(self.films_by_actor[actor_id])
+        shared.pop(film_id, None)
+        film_genres, cast_norms = self.genres, self.cast_norms
+        cast_weight = self.actor_weight * cast_norms.get(film_id, 0.0)
+        scores = {
+            other: genre_scores.get(film_genres.get(other, ()), 0.0)
+            + cast_weight * count * cast_norms[other]
+            for other, count in shared.items()
+        }
+        # the others only score by genres, equally within a genre set
+        taken = 0
+        for genres in genre_scores:
+            for other in self.films_by_genres[genres]:
+                if other == film_id or other in scores:
+                    continue
+                scores[other] = genre_scores[genres]
+                taken += 1
+                if taken == k:
+                    break
+            if taken == k:
+                break
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def all_nearest(self, k):
+        """``(film_id, neighbors)`` of every film, a genre set at a time"""
+        for genres, film_ids in self.films_by_genres.items():
+            closest = self.closest_genre_sets(genres)
+            for film_id in film_ids:
+                yield film_id, self.nearest(film_id, k, closest)
+
+
+def compute_similar_films(
+    session, k, genre_weight, actor_weight, batch_size=NEIGHBORS_BATCH_SIZE
+):
+    """Replace the stored similar films of every film
+
+    The table is rewritten in one transaction, readers see the previous
+    neighbors until it commits. Returns the number of films with neighbors.
+    """
+    index = SimilarityIndex.build(session, genre_weight, actor_weight)
+    session.execute(delete(FilmNeighbor))
+    rows, films = [], 0
+    for film_id, neighbors in index.all_nearest(k):
+        films += bool(neighbors)
+        rows.extend(
+            {"film_id": film_id, "rank": rank, "neighbor_id": other, "score": score}
+            for rank, (other, score) in enumerate(neighbors)
+        )
+        if len(rows) >= batch_size:
+            session.execute(insert(FilmNeighbor), rows)
+            rows = []
+    if rows:
+        session.execute(insert(FilmNeighbor), rows)
+    mark_changed(session, "similar")
+    session.commit()
+    return films
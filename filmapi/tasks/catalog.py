@@ -0,0 +1,57 @@
+from filmapi.extensions import celery, db
+from filmapi.services import counters, plot_index, similarity
+from filmapi.services.film_service import FilmService
+from filmapi.services.search_index import swap_in_empty_index
+from flask import current_app as app
+
+
+@celery.task
+def reset_catalog():
+    """Remove every film, actor, genre and comment and empty the search index"""
+    FilmService.reset_catalog(db.session)
+    index = swap_in_empty_index()
+    return {"index": index}
+
+
+@celery.task
+def reconcile_counters():
+    """Recount comments and films per actor and genre where they drifted"""
+    return counters.reconcile(db.session)
+
+
+@celery.task
+def compute_similar_films():
+    """Recompute the stored similar films of every film"""
+    films = similarity.compute_similar_films(
+        db.session,
+        k=app.config["SIMILAR_FILMS"],
+        genre_weight=app.config["SIMILAR_GENRE_WEIGHT"],
+        actor_weight=app.config["SIMILAR_ACTOR_WEIGHT"],
+    )
+    return {"films": films}
+
+
+@celery.task
+def update_plot_index():
+    """Index the descriptions of the films added since the last run"""
+    films = plot_index.update_plot_index(
+        db.session,
+        k=app.config["PLOT_NEIGHBORS"],
+        max_terms=app.config["PLOT_TERMS_PER_FILM"],
+        max_df=app.config["PLOT_MAX_DF"],
+        max_postings=app.config["PLOT_MAX_POSTINGS"],
+    )
+    return {"films": films}
+
+
+@celery.task
+def rebuild_plot_index():
+    """Rebuild the description index, picking up new terms and edits"""
+    films = plot_index.rebuild_plot_index(
+        db.session,
+        k=app.config["PLOT_NEIGHBORS"],
+        max_terms=app.config["PLOT_TERMS_PER_FILM"],
+        max_df=app.config["PLOT_MAX_DF"],
+        max_postings=app.config["PLOT_MAX_POSTINGS"],
+    )
+    return {"films": films}
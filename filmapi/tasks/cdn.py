@@ -0,0 +1,40 @@
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from filmapi.commons.cache_control import ALL_SURROGATE_KEY
+from filmapi.extensions import celery
+from flask import current_app as app, has_app_context
+
+# most CDNs cap the number of keys of a batch purge, Fastly at 256
+PURGE_BATCH_SIZE = 256
+
+
+@celery.task(autoretry_for=(URLError,), retry_backoff=True, max_retries=5)
+def purge_surrogate_keys(keys):
+    """Purge every CDN object tagged with one of ``keys``
+
+    Keys are sent space separated in a ``Surrogate-Key`` header to
+    ``CDN_PURGE_URL``, the batch purge endpoint Fastly and compatible CDNs
+    expose. ``CDN_PURGE_HEADERS`` carries the credentials.
+    """
+    request = Request(
+        app.config["CDN_PURGE_URL"],
+        method="POST",
+        headers={**app.config["CDN_PURGE_HEADERS"], "Surrogate-Key": " ".join(keys)},
+    )
+    with urlopen(request, timeout=10) as response:
+        return response.status
+
+
+def purge_changed_keys(keys):
+    """Purge the CDN objects of the entities a commit changed
+
+    List keys are left out, nearly every write changes them and purging
+    them would empty the CDN of lists. Lists rely on their short
+    ``s-maxage`` instead and are purged through the entities they show.
+    """
+    if not has_app_context() or not app.config.get("CDN_PURGE_URL"):
+        return
+    keys = sorted(key for key in keys if ":" in key or key == ALL_SURROGATE_KEY)
+    for start in range(0, len(keys), PURGE_BATCH_SIZE):
+        purge_surrogate_keys.delay(keys[start:][:PURGE_BATCH_SIZE])
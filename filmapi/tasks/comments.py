@@ -0,0 +1,17 @@
+import os
+import socket
+
+from filmapi.extensions import celery, db
+from filmapi.services import comment_buffer
+from flask import current_app as app
+
+
+@celery.task
+def drain_comments():
+    """Store the comments buffered in the Redis stream"""
+    return comment_buffer.drain(
+        db.session,
+        consumer=f"{socket.gethostname()}-{os.getpid()}",
+        batch_size=app.config["COMMENT_DRAIN_BATCH_SIZE"],
+        claim_idle=app.config["COMMENT_DRAIN_CLAIM_IDLE"],
+    )
@@ -0,0 +1,76 @@
+"""Locks making task submission idempotent
+
+A lock is a Redis key holding the id of the task that owns it. The key is
+written with ``SET NX EX`` before the task is enqueued, so concurrent
+requests for the same work all get the id of the one task that runs it.
+Owners release the lock when the work is done, or from an error callback
+when it fails, and extend it while long work is still running. The expiry
+frees locks of workers that died before they could do either.
+"""
+from uuid import uuid4
+
+from filmapi.extensions import celery, redis_client
+
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+EXTEND_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("EXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class TaskLock:
+    def __init__(self, name):
+        self.key = f"task-lock:{name}"
+
+    def acquire(self, token, ttl):
+        """Take the lock for ``token``, return the token of the owner"""
+        while True:
+            if redis_client.set(self.key, token, nx=True, ex=ttl):
+                return token
+            owner = redis_client.get(self.key)
+            if owner is not None:
+                return owner
+
+    def owner(self):
+        return redis_client.get(self.key)
+
+    def release(self, token):
+        """Release the lock if ``token`` still owns it"""
+        return bool(redis_client.eval(RELEASE_SCRIPT, 1, self.key, token))
+
+    def extend(self, token, ttl):
+        """Expire the lock ``ttl`` seconds from now if ``token`` still owns it"""
+        return bool(redis_client.eval(EXTEND_SCRIPT, 1, self.key, token, ttl))
+
+
+@celery.task
+def release_lock(request, exc, traceback, name=None, token=None):
+    """Error callback releasing the lock ``name`` held by a failed job"""
+    TaskLock(name).release(token)
+
+
+def submit_once(task, lock_name, ttl, *args):
+    """Enqueue ``task`` unless a task holding ``lock_name`` is already running
+
+    Returns the id of the task doing the work and whether it was started by
+    this call.
+    """
+    task_id = str(uuid4())
+    lock = TaskLock(lock_name)
+    owner = lock.acquire(task_id, ttl)
+    if owner != task_id:
+        return owner, False
+    try:
+        task.apply_async(args, task_id=task_id)
+    except Exception:
+        lock.release(task_id)
+        raise
+    return task_id, True
@@ -1,20 +1,182 @@
 import asyncio
-from filmapi.extensions import celery, db
+import time
+from aiohttp import ClientSession
+from celery import chord, group
+from filmapi.extensions import celery, db, redis_client
+from filmapi.services.crawl_frontier import CrawlFrontier
 from filmapi.services.film_service import FilmService
 from filmapi.services.imdb_parser import IMDbParser
+from filmapi.tasks.locks import TaskLock, release_lock
+from filmapi.tasks.progress import TaskProgress, record_failure
 from flask import current_app as app
 
 
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        end = start + size
+        yield items[start:end]
+
+
+def populate_lock_name(link=None):
+    """Name of the lock deduplicating population runs for ``link``"""
+    return f"populate:{link or 'full-chart'}"
+
+
+# crawls share one frontier, a second one would recover the titles in flight
+CRAWL_LOCK = populate_lock_name("crawl")
+
+
+def dispatch_links(links, progress_id=None, lock=None, frontier=None):
+    """Fan links out to chunked parse subtasks joined by a save_films chord
+
+    With the name of a crawl ``frontier``, the callback acknowledges the
+    links once saved, a failed run leaves them to ``recover``.
+    """
+    chunks = list(chunked(links, app.config["PARSER_CHUNK_SIZE"]))
+    TaskProgress(progress_id).update(chunks=len(chunks))
+    header = group(parse_imdb_films.s(chunk, progress_id, lock) for chunk in chunks)
+    callback = save_films.s(discovered=len(links), progress_id=progress_id, lock=lock)
+    if frontier:
+        callback.kwargs.update(frontier=frontier, titles=links)
+    if progress_id:
+        callback.on_error(record_failure.s(progress_id=progress_id))
+    if lock:
+        # a failed chunk never runs the callback, which would release it
+        callback.on_error(release_lock.s(name=lock, token=progress_id))
+    return chord(header)(callback)
+
+
+@celery.task(bind=True)
+def parse_imdb_data(self, link=None):
+    """Discover film links and fan them out to the scraping workers.
+
+    Links are split into chunks of ``PARSER_CHUNK_SIZE``, every chunk is
+    fetched and parsed by its own subtask and a chord callback writes the
+    results to the database in one batch.
+
+    The populate lock taken when the run was submitted is handed over to
+    the chord, so it is held until the films are saved or a chunk fails.
+    Every chunk extends it by ``POPULATE_LOCK_TTL``.
+    """
+    lock = populate_lock_name(link)
+    progress = TaskProgress(self.request.id)
+    progress.start()
+    try:
+        if link:
+            links = [link]
+        else:
+            scraper = IMDbParser(app.config.get("HEADERS", {}))
+            links = asyncio.run(scraper.discover_movie_links())
+
+        progress.update(discovered=len(links))
+        result = dispatch_links(links, progress_id=self.request.id, lock=lock)
+    except Exception:
+        TaskLock(lock).release(self.request.id)
+        raise
+    progress.set(dispatched_at=time.time())
+    return result.id
+
+
+@celery.task(bind=True)
+def crawl_imdb(self, seeds=None, max_pages=None, max_titles=None, restart=False):
+    """Crawl listing pages from the frontier and dispatch discovered films.
+
+    The frontier lives in Redis, so a crawl interrupted by a worker crash
+    continues where it stopped when the task is started again. Titles are
+    acknowledged by ``save_films`` once stored, so the titles of failed runs
+    are crawled again too. Budgets are applied per run, ``restart`` also
+    forgets every url seen so far.
+
+    Runs hold ``CRAWL_LOCK``, taken when the crawl was submitted with
+    ``submit_once`` or else by the task itself, and extend it by
+    ``POPULATE_LOCK_TTL`` for every listing page. While another run holds
+    it the task returns right away with the id of that run.
+    """
+    lock = TaskLock(CRAWL_LOCK)
+    ttl = app.config["POPULATE_LOCK_TTL"]
+    owner = lock.acquire(self.request.id, ttl)
+    if owner != self.request.id:
+        return {"running": owner}
+    try:
+        return _crawl(self.request.id, lock, ttl, seeds, max_pages, max_titles, restart)
+    finally:
+        lock.release(self.request.id)
+
+
+def _crawl(progress_id, lock, ttl, seeds, max_pages, max_titles, restart):
+    progress = TaskProgress(progress_id)
+    progress.start()
+    frontier = CrawlFrontier(redis_client)
+    if restart:
+        frontier.reset()
+    frontier.recover()
+    frontier.set_budget(pages=max_pages, titles=max_titles)
+    frontier.add_pages(seeds or app.config["CRAWL_SEEDS"])
+
+    batch_size = app.config["PARSER_CHUNK_SIZE"] * app.config["CRAWL_CHUNKS_PER_BATCH"]
+    scraper = IMDbParser(app.config.get("HEADERS", {}))
+    totals = {"pages": 0, "titles": 0}
+
+    def dispatch_pending(force=False):
+        while frontier.pending_titles() >= batch_size or (
+            force and frontier.pending_titles()
+        ):
+            links = frontier.pop_titles(batch_size)
+            dispatch_links(links, progress_id=progress_id, frontier=frontier.name)
+            totals["titles"] += len(links)
+
+    async def expand_pages():
+        async with ClientSession(headers=scraper.headers) as session:
+            while (page := frontier.next_page()) is not None:
+                lock.extend(progress_id, ttl)
+                html_content = await scraper.get_response_from_link(session, page)
+                links, next_page = scraper.get_links_from_listing(html_content, page)
+                progress.update(discovered=frontier.add_titles(links))
+                if frontier.budget_exhausted("titles"):
+                    # expanded again by a later run, its queued titles deduped
+                    frontier.requeue_page(page)
+                    break
+                if next_page:
+                    frontier.add_pages([next_page])
+                frontier.ack_page(page)
+                totals["pages"] += 1
+                dispatch_pending()
+
+    asyncio.run(expand_pages())
+    dispatch_pending(force=True)
+    progress.set(dispatched_at=time.time())
+    return totals
+
+
+def extend_lock(lock, progress_id):
+    if lock:
+        TaskLock(lock).extend(progress_id, app.config["POPULATE_LOCK_TTL"])
+
+
+@celery.task
+def parse_imdb_films(links, progress_id=None, lock=None):
+    """Fetch and parse one chunk of film pages"""
+    extend_lock(lock, progress_id)
+    scraper = IMDbParser(app.config.get("HEADERS", {}))
+    pages = asyncio.run(scraper.fetch_pages(links))
+    films = scraper.parse_pages(pages)
+    TaskProgress(progress_id).update(fetched=len(pages), parsed=len(films))
+    extend_lock(lock, progress_id)
+    return films
+
+
 @celery.task
-def parse_imdb_data(link=None):
-    headers = app.config.get("HEADERS", {})
-    scraper = IMDbParser(headers)
-
-    if link:
-        films = asyncio.run(scraper.parse_movies(link))
-        FilmService.bulk_create_films(db.session, films)
-        return f"{films[0].title} added to database"
-    else:
-        films = asyncio.run(scraper.parse_movies())
-        FilmService.bulk_create_films(db.session, films)
-        return f"{len(films)} films added to database"
+def save_films(
+    chunks, discovered=0, progress_id=None, lock=None, frontier=None, titles=()
+):
+    """Chord callback, stores films parsed by all chunks and reports totals"""
+    films = [film for chunk in chunks for film in chunk]
+    try:
+        counts = FilmService.bulk_create_films(db.session, films)
+    finally:
+        if lock:
+            TaskLock(lock).release(progress_id)
+    if frontier:
+        CrawlFrontier(redis_client, name=frontier).ack_titles(titles)
+    TaskProgress(progress_id).update(chunks_saved=len(chunks), **counts)
+    return {"discovered": discovered, "parsed": len(films), **counts}
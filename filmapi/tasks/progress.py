@@ -0,0 +1,79 @@
+"""Progress of multi-stage background jobs
+
+Every stage of a pipeline adds its counters to one Redis hash keyed by the
+id of the task that started the job, so clients poll a single cheap key
+instead of the Celery result of every subtask. A failed chunk or callback
+is recorded there too by ``record_failure``, as the Celery state of the
+task that started the job does not see it.
+"""
+import time
+
+from filmapi.extensions import celery, redis_client
+
+PROGRESS_TTL = 24 * 60 * 60
+COUNTERS = (
+    "discovered",
+    "fetched",
+    "parsed",
+    "inserted",
+    "updated",
+    "chunks",
+    "chunks_saved",
+)
+
+
+class TaskProgress:
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.key = f"task-progress:{task_id}"
+
+    def start(self):
+        self.set(started_at=time.time())
+
+    def set(self, **fields):
+        if self.task_id is None:
+            return
+        pipe = redis_client.pipeline()
+        pipe.hset(self.key, mapping=fields)
+        pipe.expire(self.key, PROGRESS_TTL)
+        pipe.execute()
+
+    def update(self, **counts):
+        if self.task_id is None:
+            return
+        pipe = redis_client.pipeline()
+        for counter, value in counts.items():
+            pipe.hincrby(self.key, counter, value)
+        pipe.expire(self.key, PROGRESS_TTL)
+        pipe.execute()
+
+    def snapshot(self):
+        """Counters with throughput and ETA, ``None`` if nothing was recorded"""
+        fields = redis_client.hgetall(self.key)
+        if not fields:
+            return None
+        progress = {counter: int(fields.get(counter, 0)) for counter in COUNTERS}
+        failed = "failed_at" in fields
+        finished = failed or (
+            "dispatched_at" in fields and progress["chunks_saved"] >= progress["chunks"]
+        )
+        elapsed = time.time() - float(fields.get("started_at", time.time()))
+        throughput = progress["parsed"] / elapsed if elapsed > 0 else 0.0
+        remaining = max(progress["discovered"] - progress["parsed"], 0)
+        progress.update(
+            finished=finished,
+            failed=failed,
+            error=fields.get("error"),
+            elapsed=round(elapsed, 1),
+            throughput=round(throughput, 2),
+            eta=round(remaining / throughput, 1)
+            if throughput and not finished
+            else None,
+        )
+        return progress
+
+
+@celery.task
+def record_failure(request, exc, traceback, progress_id=None):
+    """Error callback marking the job of ``progress_id`` as failed"""
+    TaskProgress(progress_id).set(failed_at=time.time(), error=repr(exc))
@@ -1,3 +1,6 @@
 from filmapi.app import create_app
+from filmapi.services.costar_graph import preload_costar_graph
 
 app = create_app()
+if app.config["COSTAR_GRAPH_PRELOAD"]:
+    preload_costar_graph(app)
@@ -8,7 +8,7 @@ from dotenv import load_dotenv
 from datetime import date
 from filmapi.models import User, Film, Actor, Genre
 from filmapi.app import create_app
-from filmapi.extensions import db as _db
+from filmapi.extensions import db as _db, redis_client
 from pytest_factoryboy import register
 from tests.factories import UserFactory, FilmFactory, ActorFactory
 from filmapi.app import init_celery
@@ -125,3 +125,16 @@ def actor(db: SQLAlchemy) -> Actor:
     db.session.add(actor)
     db.session.commit()
     return actor
+
+
+@pytest.fixture
+def populate_locks():
+    """Frees population locks taken by a test, they outlive it otherwise"""
+
+    def clear():
+        for key in redis_client.scan_iter("task-lock:populate:*"):
+            redis_client.delete(key)
+
+    clear()
+    yield
+    clear()
@@ -17,7 +17,9 @@ def test_get_actor_by_id(client: testing.FlaskClient, actor: Actor, db: SQLAlche
     assert data["name"] == actor.name
     assert data["birthday"] == date.strftime(actor.birthday, "%Y-%m-%d")
     assert data["is_active"] == actor.is_active
-    assert len(data) == 5
+    assert data["film_count"] == 0
+    assert data["films"] == [] and data["films_next"] is None
+    assert len(data) == 7
 
 
 def test_get_actor_not_found(client: testing.FlaskClient, actor: Actor):
@@ -148,3 +150,90 @@ def test_delete_actor(
     rep = client.delete(user_url, headers=admin_headers)
     assert rep.status_code == 204
     assert db.session.query(Film).filter_by(id=actor.id).first() is None
+
+
+def test_actor_sparse_fieldsets(
+    client: testing.FlaskClient, db: SQLAlchemy, film: Film, actor: Actor
+):
+    film.actors = [actor]
+    db.session.commit()
+
+    response = client.get(url_for("api.actors", fields="name"))
+    assert response.get_json() == [{"name": actor.name}]
+
+    response = client.get(url_for("api.actor_id", id=actor.id, fields="name"))
+    assert response.get_json() == {"name": actor.name}
+
+    response = client.get(url_for("api.actor_id", id=actor.id, fields="id,films"))
+    assert response.get_json() == {
+        "id": actor.id,
+        "films": [
+            {
+                "title": film.title,
+                "title_original": film.title_original,
+                "uuid": film.uuid,
+                "poster": film.poster,
+            }
+        ],
+        "films_next": None,
+    }
+
+    response = client.get(url_for("api.actor_id", id=actor.id, fields="age"))
+    assert response.status_code == 400
+
+
+def test_actor_films_pages(
+    client: testing.FlaskClient,
+    app,
+    db: SQLAlchemy,
+    film_factory: Factory,
+    actor: Actor,
+):
+    films = film_factory.create_batch(5)
+    for year, film in zip((2001, 2003, 2002, 2005, 2004), films):
+        film.release_date = date(year, 1, 1)
+        film.actors = [actor]
+    films[1].rating, films[2].rating, films[4].rating = 9.0, None, 6.0
+    db.session.add_all(films)
+    db.session.commit()
+
+    def titles(sort):
+        url, titles = url_for("api.actor_films", id=actor.id, limit=2, sort=sort), []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            assert len(response.json["films"]) <= 2
+            titles += [film["title"] for film in response.json["films"]]
+            url = response.json["next"]
+        return titles
+
+    by_year = sorted(films, key=lambda film: film.release_date)
+    assert titles("release_date") == [film.title for film in by_year]
+    assert titles("-release_date") == [film.title for film in reversed(by_year)]
+    by_rating = [films[2], films[4], films[0], films[3], films[1]]
+    assert titles("rating") == [film.title for film in by_rating]
+
+    app.config["ACTOR_FILMS_PAGE_SIZE"] = 2
+    try:
+        response = client.get(url_for("api.actor_id", id=actor.id))
+    finally:
+        app.config["ACTOR_FILMS_PAGE_SIZE"] = 20
+    assert [film["title"] for film in response.json["films"]] == titles(
+        "-release_date"
+    )[:2]
+    assert set(response.json["films"][0]) == {
+        "title",
+        "title_original",
+        "uuid",
+        "poster",
+    }
+    next_page = client.get(response.json["films_next"]).json["films"]
+    assert next_page[0]["title"] == by_year[2].title
+
+
+def test_actor_films_errors(client: testing.FlaskClient, actor: Actor):
+    url = url_for("api.actor_films", id=actor.id, sort="title")
+    assert client.get(url).status_code == 400
+    url = url_for("api.actor_films", id=actor.id, sort="rating", cursor="bad")
+    assert client.get(url).status_code == 400
+    assert client.get(url_for("api.actor_films", id=12345)).status_code == 404
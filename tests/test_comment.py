@@ -1,9 +1,15 @@
 from typing import Dict
+from datetime import datetime, timedelta
+
+import mock
 
 from flask import url_for, testing
 from flask_sqlalchemy import SQLAlchemy
 
+from filmapi.extensions import redis_client
 from filmapi.models import Film, Comments, User
+from filmapi.services import comment_buffer
+from filmapi.tasks.comments import drain_comments
 
 
 def test_post_comment(
@@ -28,3 +34,140 @@ def test_post_comment(
     assert comment_in_db.text == comment_data["text"]
     assert comment_in_db.film_id == film.id
     assert comment_in_db.user_id == admin_user.id
+
+
+def test_get_comments_pages_with_cursor(
+    client: testing.FlaskClient,
+    app,
+    db: SQLAlchemy,
+    film: Film,
+    admin_user: User,
+):
+    created_at = datetime(2023, 9, 26, 12, 0)
+    for number in range(7):
+        comment = Comments(text=f"Comment {number}", user=admin_user, film=film)
+        # two comments per second, the id breaks the tie
+        comment.created_at = created_at + timedelta(seconds=number // 2)
+        db.session.add(comment)
+    db.session.commit()
+
+    texts = []
+    url = url_for("api.comments", uuid=film.uuid, limit=3)
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        texts += [comment["text"] for comment in response.json["comments"]]
+        url = response.json["next"]
+    assert texts == [f"Comment {number}" for number in reversed(range(7))]
+
+    response = client.get(url_for("api.film_by_uuid", uuid=film.uuid))
+    assert response.json["comment_count"] == 7
+    embedded = [comment["text"] for comment in response.json["comments"]]
+    assert embedded == texts[: app.config["COMMENTS_EMBEDDED"]]
+
+
+def test_get_comments_errors(client: testing.FlaskClient, film: Film):
+    url = url_for("api.comments", uuid=film.uuid, cursor="not-a-cursor")
+    assert client.get(url).status_code == 400
+    url = url_for("api.comments", uuid=film.uuid, limit=1000)
+    assert client.get(url).status_code == 400
+    url = url_for("api.comments", uuid="invalid_uuid")
+    assert client.get(url).status_code == 404
+
+    response = client.get(url_for("api.comments", uuid=film.uuid))
+    assert response.json == {"comments": [], "next": None}
+
+
+def test_buffered_comments(
+    client: testing.FlaskClient,
+    app,
+    db: SQLAlchemy,
+    admin_headers: Dict[str, str],
+    film: Film,
+):
+    url = url_for("api.comments", uuid=film.uuid)
+    app.config["COMMENTS_BUFFERED"] = True
+    try:
+        ids = [
+            client.post(url, json={"text": text}, headers=admin_headers).json["id"]
+            for text in ("First", "Second")
+        ]
+        response = client.post(url, json={"text": " "}, headers=admin_headers)
+        assert response.status_code == 400
+    finally:
+        app.config["COMMENTS_BUFFERED"] = False
+    assert db.session.query(Comments).count() == 0
+
+    # authors read their comments before they are stored
+    texts = [comment["text"] for comment in client.get(url).json["comments"]]
+    assert texts == ["Second", "First"]
+    detail = client.get(url_for("api.film_by_uuid", uuid=film.uuid)).json
+    assert detail["comment_count"] == 2
+    etag = client.get(url).headers["ETag"]
+
+    assert drain_comments() == 2
+    comments = db.session.query(Comments).order_by(Comments.id).all()
+    assert [comment.stream_id for comment in comments] == ids
+    db.session.refresh(film)
+    assert film.comment_count == 2
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    texts = [comment["text"] for comment in response.json["comments"]]
+    assert texts == ["Second", "First"]
+    assert drain_comments() == 0
+
+
+def test_drain_claims_abandoned_entries_once(
+    db: SQLAlchemy, film: Film, admin_user: User
+):
+    stream_id = comment_buffer.buffer_comment(film, admin_user, "Comment")
+    # a drainer stored the entry and died before acknowledging it
+    comment_buffer._ensure_group()
+    redis_client.xreadgroup(
+        comment_buffer.GROUP, "crashed", {comment_buffer.STREAM: ">"}
+    )
+    db.session.add(Comments(text="Comment", user=admin_user, film=film))
+    db.session.flush()
+    db.session.query(Comments).update({"stream_id": stream_id})
+    db.session.commit()
+
+    comment_buffer.drain(db.session, "worker", batch_size=10, claim_idle=0)
+    assert db.session.query(Comments).count() == 1
+    assert redis_client.xlen(comment_buffer.STREAM) == 0
+    assert comment_buffer.pending_comments(film.uuid) == []
+
+
+def test_first_page_merges_pending_comments(
+    client: testing.FlaskClient,
+    app,
+    db: SQLAlchemy,
+    film: Film,
+    admin_user: User,
+):
+    created_at = datetime(2023, 9, 26, 12, 0)
+    for number in range(3):
+        comment = Comments(text=f"Stored {number}", user=admin_user, film=film)
+        comment.created_at = created_at + timedelta(seconds=number)
+        db.session.add(comment)
+    db.session.commit()
+    app.config["CDN_PURGE_URL"] = "https://cdn.example.com/purge"
+    try:
+        with mock.patch("filmapi.tasks.cdn.purge_surrogate_keys") as purge:
+            for text in ("Pending 0", "Pending 1"):
+                comment_buffer.buffer_comment(film, admin_user, text)
+        purge.delay.assert_called_with([f"film:{film.uuid}"])
+    finally:
+        app.config["CDN_PURGE_URL"] = None
+
+    def pages(limit):
+        url = url_for("api.comments", uuid=film.uuid, limit=limit)
+        while url:
+            response = client.get(url).json
+            assert len(response["comments"]) <= limit
+            yield [comment["text"] for comment in response["comments"]]
+            url = response["next"]
+
+    stored = ["Stored 2", "Stored 1", "Stored 0"]
+    assert list(pages(3)) == [["Pending 1", "Pending 0", "Stored 2"], stored[1:]]
+    # a first page of pending comments only is followed by every stored one
+    assert list(pages(2)) == [["Pending 1", "Pending 0"], stored[:2], stored[2:]]
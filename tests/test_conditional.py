@@ -0,0 +1,291 @@
+from typing import Dict
+
+import gzip
+
+import mock
+import pytest
+from cachelib import SimpleCache
+from flask import url_for, testing
+from flask_sqlalchemy import SQLAlchemy
+
+from filmapi.models import Actor, Film
+from filmapi.services.film_service import FilmService
+from filmapi.tasks.cdn import purge_changed_keys, purge_surrogate_keys
+
+
+def test_film_detail_not_modified(
+    client: testing.FlaskClient,
+    db: SQLAlchemy,
+    film: Film,
+    admin_headers: Dict[str, str],
+):
+    url = url_for("api.film_by_uuid", uuid=film.uuid)
+    response = client.get(url)
+    etag = response.headers["ETag"]
+
+    with mock.patch.object(FilmService, "fetch_film_by_uuid") as fetch:
+        response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    fetch.assert_not_called()
+
+    fields_etag = client.get(
+        url_for("api.film_by_uuid", uuid=film.uuid, fields="title")
+    )
+    assert fields_etag.headers["ETag"] != etag
+
+    client.post(
+        url_for("api.comments", uuid=film.uuid),
+        json={"text": "Comment"},
+        headers=admin_headers,
+    )
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    etag = response.headers["ETag"]
+
+    client.patch(url, json={"rating": 9.1}, headers=admin_headers)
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["film"]["rating"] == 9.1
+
+
+def test_film_detail_without_film_has_no_etag(client: testing.FlaskClient, db):
+    response = client.get(url_for("api.film_by_uuid", uuid="missing"))
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+
+
+def test_lists_change_version_on_writes(
+    client: testing.FlaskClient, db: SQLAlchemy, film: Film, actor: Actor
+):
+    urls = [url_for("api.films"), url_for("api.actors"), url_for("api.genres")]
+    etags = [client.get(url).headers["ETag"] for url in urls]
+    for url, etag in zip(urls, etags):
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    actor_url = url_for("api.actor_id", id=actor.id)
+    actor_etag = client.get(actor_url).headers["ETag"]
+    film_url = url_for("api.film_by_uuid", uuid=film.uuid)
+    film_etag = client.get(film_url).headers["ETag"]
+
+    FilmService.bulk_create_films(
+        db.session,
+        [
+            {
+                "title": "New film",
+                "title_original": "New film",
+                "release_date": "2023-9-26",
+                "distributed_by": "Distributor",
+                "actors": ["New actor"],
+                "genres": ["New genre"],
+            }
+        ],
+    )
+    for url, etag in zip(urls, etags):
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+    # details of films and actors the write did not touch keep their ETag
+    response = client.get(actor_url, headers={"If-None-Match": actor_etag})
+    assert response.status_code == 304
+    response = client.get(film_url, headers={"If-None-Match": film_etag})
+    assert response.status_code == 304
+
+
+def test_details_change_version_with_linked_rows(
+    client: testing.FlaskClient,
+    db: SQLAlchemy,
+    film: Film,
+    admin_headers: Dict[str, str],
+):
+    star, other = film.actors
+    film_url = url_for("api.film_by_uuid", uuid=film.uuid)
+    star_url = url_for("api.actor_id", id=star.id)
+
+    def etag(url):
+        return client.get(url).headers["ETag"]
+
+    def modified(url, etag):
+        return client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+    film_etag, star_etag = etag(film_url), etag(star_url)
+    star.name = "Renamed"
+    db.session.commit()
+    assert modified(film_url, film_etag)
+    assert modified(star_url, star_etag)
+
+    film_etag, star_etag = etag(film_url), etag(star_url)
+    client.patch(film_url, json={"rating": 9.1}, headers=admin_headers)
+    assert modified(star_url, star_etag)
+
+    film_etag, star_etag = etag(film_url), etag(star_url)
+    film.actors = [other]
+    db.session.commit()
+    assert modified(film_url, film_etag)
+    assert modified(star_url, star_etag)
+
+    film_etag = etag(film_url)
+    film.genres[0].name = "Renamed genre"
+    db.session.commit()
+    assert modified(film_url, film_etag)
+
+
+def test_cache_headers_and_purge(
+    client: testing.FlaskClient,
+    app,
+    db: SQLAlchemy,
+    film: Film,
+    admin_headers: Dict[str, str],
+):
+    response = client.get(url_for("api.films"))
+    assert response.headers["Cache-Control"].startswith("public, max-age=60")
+    assert response.headers["Surrogate-Key"] == f"films film:{film.uuid} all"
+
+    url = url_for("api.film_by_uuid", uuid=film.uuid)
+    response = client.get(url)
+    actor_ids = sorted(actor.id for actor in film.actors)
+    genre_ids = sorted(genre.id for genre in film.genres)
+    assert response.headers["Surrogate-Key"] == " ".join(
+        [
+            f"film:{film.uuid}",
+            *(f"actor:{actor_id}" for actor_id in actor_ids),
+            *(f"genre:{genre_id}" for genre_id in genre_ids),
+            "plots",
+            "all",
+        ]
+    )
+    response = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    assert "max-age=300" in response.headers["Cache-Control"]
+    assert "Cache-Control" not in client.get(url_for("api.actor_id", id=0)).headers
+
+    app.config["CDN_PURGE_URL"] = "https://cdn.example.com/purge"
+    try:
+        with mock.patch("filmapi.tasks.cdn.purge_surrogate_keys") as purge:
+            client.patch(url, json={"rating": 9.1}, headers=admin_headers)
+            # list keys are left to expire
+            purge.delay.assert_called_once_with(
+                sorted(
+                    [f"film:{film.uuid}"]
+                    + [f"actor:{actor_id}:films" for actor_id in actor_ids]
+                )
+            )
+            purge.reset_mock()
+            FilmService.reset_catalog(db.session)
+            purge.delay.assert_called_once_with(["all"])
+    finally:
+        app.config["CDN_PURGE_URL"] = None
+
+
+@pytest.mark.parametrize("ingest", ["bulk_create_films", "ingest_films"])
+def test_ingest_purges_only_served_rows(app, db: SQLAlchemy, film: Film, ingest):
+    actor = film.actors[0]
+    actor_ids = sorted(actor.id for actor in film.actors)
+    app.config["CDN_PURGE_URL"] = "https://cdn.example.com/purge"
+    try:
+        with mock.patch("filmapi.tasks.cdn.purge_surrogate_keys") as purge:
+            getattr(FilmService, ingest)(
+                db.session,
+                [
+                    {
+                        "title": "New film",
+                        "title_original": "New film",
+                        "release_date": "2023-9-26",
+                        "distributed_by": "Distributor",
+                        "actors": [actor.name, "New actor"],
+                    }
+                ],
+            )
+            # the new film and the new actor were never served
+            purge.delay.assert_called_once_with([f"actor:{actor.id}:films"])
+            purge.reset_mock()
+            getattr(FilmService, ingest)(
+                db.session,
+                [
+                    {
+                        "title": "Updated film",
+                        "title_original": film.title_original,
+                        "release_date": film.release_date.isoformat(),
+                        "distributed_by": "Distributor",
+                    }
+                ],
+            )
+            purge.delay.assert_called_once_with(
+                sorted(
+                    [f"film:{film.uuid}"]
+                    + [f"actor:{actor_id}:films" for actor_id in actor_ids]
+                )
+            )
+    finally:
+        app.config["CDN_PURGE_URL"] = None
+
+
+def test_film_detail_precompressed(client: testing.FlaskClient, app, film: Film):
+    url = url_for("api.film_by_uuid", uuid=film.uuid)
+    app.config["COMPRESSION_MIN_SIZE"] = 0
+    try:
+        identity = client.get(url, headers={"Accept-Encoding": "identity"})
+        response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    finally:
+        app.config["COMPRESSION_MIN_SIZE"] = 512
+    assert identity.headers["Vary"] == "Accept-Encoding"
+    assert "Content-Encoding" not in identity.headers
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == identity.data
+    assert response.headers["ETag"] == identity.headers["ETag"][:-1] + '-gzip"'
+
+    response = client.get(
+        url,
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+def test_small_responses_are_not_compressed(client: testing.FlaskClient, film: Film):
+    response = client.get(url_for("api.genres"), headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.json
+
+
+def test_purge_surrogate_keys_task(app):
+    app.config["CDN_PURGE_HEADERS"] = {"Fastly-Key": "token"}
+    app.config["CDN_PURGE_URL"] = "https://cdn.example.com/purge"
+    try:
+        with mock.patch("filmapi.tasks.cdn.urlopen") as urlopen:
+            purge_surrogate_keys(["films", "film:1"])
+    finally:
+        app.config["CDN_PURGE_URL"] = None
+        app.config["CDN_PURGE_HEADERS"] = {}
+    request = urlopen.call_args.args[0]
+    assert request.full_url == "https://cdn.example.com/purge"
+    assert request.get_method() == "POST"
+    assert request.headers == {"Fastly-key": "token", "Surrogate-key": "films film:1"}
+
+
+def test_purge_changed_keys_in_batches(app):
+    keys = {"films", "actors", *(f"film:{i:03}" for i in range(300))}
+    app.config["CDN_PURGE_URL"] = "https://cdn.example.com/purge"
+    try:
+        with mock.patch("filmapi.tasks.cdn.purge_surrogate_keys") as purge:
+            purge_changed_keys(keys)
+    finally:
+        app.config["CDN_PURGE_URL"] = None
+    batches = [call.args[0] for call in purge.delay.call_args_list]
+    assert [len(batch) for batch in batches] == [256, 44]
+    assert batches[0][0] == "film:000"
+
+
+def test_cached_pages_replay_their_surrogate_keys(
+    client: testing.FlaskClient, film: Film
+):
+    url = url_for("api.films", fields="title")
+    with mock.patch("filmapi.commons.compression.cache", SimpleCache()):
+        response = client.get(url)
+        with mock.patch.object(FilmService, "fetch_all_films") as fetch:
+            cached = client.get(url)
+    fetch.assert_not_called()
+    assert response.get_json() == [{"title": film.title}]
+    assert cached.headers["Surrogate-Key"] == f"films film:{film.uuid} all"
+    assert cached.headers["X-Total-Count"] == "1"
@@ -0,0 +1,129 @@
+import time
+
+import pytest
+from flask import url_for, testing
+from flask_sqlalchemy import SQLAlchemy
+from factory import Factory
+
+from filmapi.models import Actor, Film
+from filmapi.services import costar_graph
+from filmapi.services.costar_graph import CostarGraph
+
+
+@pytest.fixture
+def actors(db: SQLAlchemy, film_factory: Factory, actor_factory: Factory):
+    """Co-stars a-b, b-c twice, b-d, c-d and d-e, f alone"""
+    actors = actor_factory.create_batch(6)
+    a, b, c, d, e, f = actors
+    casts = [[a, b], [b, c], [b, c, d], [d, e], [f]]
+    for film, cast in zip(film_factory.create_batch(len(casts)), casts):
+        film.actors = cast
+        db.session.add(film)
+    db.session.commit()
+    costar_graph._State.graph = None
+    yield actors
+    wait_for_graph()
+    costar_graph._State.graph = None
+
+
+def wait_for_graph(timeout=10):
+    """Let the background build of the graph finish"""
+    deadline = time.monotonic() + timeout
+    while costar_graph._State.rebuilding and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not costar_graph._State.rebuilding
+
+
+def test_graph_costars_and_paths(db: SQLAlchemy, actors):
+    a, b, c, d, e, f = [actor.id for actor in actors]
+    graph = CostarGraph.build(db.session)
+    assert list(graph.actor_ids) == sorted([a, b, c, d, e, f])
+    assert graph.costars(b, 10) == [(c, 2), (a, 1), (d, 1)]
+    assert graph.costars(b, 1) == [(c, 2)]
+
+    actor_ids, film_ids = graph.path(a, e, max_degrees=6)
+    assert actor_ids[0] == a and actor_ids[-1] == e
+    assert len(actor_ids) == 4 and len(film_ids) == 3
+    for (left, right), film_id in zip(zip(actor_ids, actor_ids[1:]), film_ids):
+        assert {left, right} <= set(graph.actors_of(film_id))
+    assert graph.path(a, e, max_degrees=2) is None
+    assert graph.path(a, f, max_degrees=6) is None
+    assert graph.path(c, c, max_degrees=6) == ([c], [])
+
+
+def test_graph_is_extended_with_new_films(
+    db: SQLAlchemy, actors, film_factory: Factory
+):
+    a, b, c, d, e, f = actors
+    graph = CostarGraph.build(db.session)
+    film = film_factory.create()
+    film.actors = [a, f]
+    db.session.add(film)
+    db.session.commit()
+
+    extended = graph.extended(db.session)
+    assert graph.path(a.id, f.id, max_degrees=6) is None
+    assert extended.path(a.id, f.id, max_degrees=6) == ([a.id, f.id], [film.id])
+    assert extended.costars(a.id, 10) == [(b.id, 1), (f.id, 1)]
+    assert extended.extended(db.session) is extended
+
+
+def test_costar_endpoints(
+    client: testing.FlaskClient, app, db: SQLAlchemy, actors, film_factory: Factory
+):
+    a, b, c, d, e, f = actors
+    response = client.get(url_for("api.actor_costars", id=b.id, limit=2))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    wait_for_graph()
+    response = client.get(url_for("api.actor_costars", id=b.id, limit=2))
+    assert response.json == [
+        {"id": c.id, "name": c.name, "films": 2},
+        {"id": a.id, "name": a.name, "films": 1},
+    ]
+    response = client.get(url_for("api.actor_path", **{"from": a.id, "to": e.id}))
+    assert response.json["degrees"] == 3
+    assert [actor["name"] for actor in response.json["actors"]][::3] == [
+        a.name,
+        e.name,
+    ]
+    assert len(response.json["films"]) == 3
+
+    url = url_for("api.actor_path", **{"from": a.id, "to": f.id})
+    assert client.get(url).status_code == 404
+    film = film_factory.create()
+    film.actors = [e, f]
+    db.session.add(film)
+    db.session.commit()
+    assert client.get(url).json["degrees"] == 4
+
+    assert client.get(url_for("api.actor_path", to=a.id)).status_code == 400
+    url = url_for("api.actor_path", **{"from": a.id, "to": 12345})
+    assert client.get(url).status_code == 404
+    assert client.get(url_for("api.actor_costars", id=12345)).status_code == 404
+    url = url_for("api.actor_costars", id=b.id)
+    assert len(client.get(url).json) == 3
+    app.config["ACTOR_COSTARS_LIMIT"] = 1
+    try:
+        assert client.get(url).json == [{"id": c.id, "name": c.name, "films": 2}]
+    finally:
+        app.config["ACTOR_COSTARS_LIMIT"] = 20
+    assert db.session.query(Actor).count() == 6
+
+
+def test_path_through_deleted_film(
+    client: testing.FlaskClient, db: SQLAlchemy, actors, film_factory: Factory
+):
+    a, b, c, d, e, f = actors
+    url = url_for("api.actor_path", **{"from": a.id, "to": b.id})
+    assert client.get(url).status_code == 503
+    wait_for_graph()
+    assert client.get(url).json["degrees"] == 1
+
+    # the graph still links a and b until the rebuild swaps it
+    db.session.delete(db.session.get(Film, a.films[0].id))
+    db.session.commit()
+    assert client.get(url).status_code == 404
+    wait_for_graph()
+    assert costar_graph._State.graph.path(a.id, b.id, max_degrees=6) is None
+    assert client.get(url).status_code == 404
@@ -0,0 +1,86 @@
+from flask import url_for, testing
+from flask_sqlalchemy import SQLAlchemy
+from factory import Factory
+
+from filmapi.models import Actor, Comments, Film, Genre, User
+from filmapi.services import counters
+from filmapi.services.film_service import FilmService
+from filmapi.tasks.catalog import reconcile_counters
+
+
+def test_orm_writes_adjust_counters(
+    db: SQLAlchemy, film: Film, admin_user: User, actor_factory: Factory
+):
+    first, second = film.actors
+    updated_at = first.updated_at
+    assert (first.film_count, second.film_count) == (1, 1)
+    assert [genre.film_count for genre in film.genres] == [1, 1]
+
+    comments = [Comments(text=f"Comment {n}", user=admin_user, film=film) for n in "ab"]
+    db.session.add_all(comments)
+    db.session.commit()
+    assert film.comment_count == 2
+    db.session.delete(comments[0])
+    db.session.commit()
+    assert film.comment_count == 1
+
+    newcomer = actor_factory.create()
+    film.actors = [second, newcomer]
+    db.session.commit()
+    assert (first.film_count, second.film_count, newcomer.film_count) == (0, 1, 1)
+    assert first.updated_at == updated_at
+
+    db.session.delete(comments[1])
+    db.session.delete(film)
+    db.session.commit()
+    assert (second.film_count, newcomer.film_count) == (0, 0)
+    assert [genre.film_count for genre in db.session.query(Genre)] == [0, 0]
+
+
+def test_bulk_writes_recount_and_reconcile(db: SQLAlchemy, film: Film):
+    films = [
+        {
+            "title": title,
+            "title_original": title,
+            "release_date": "2023-9-26",
+            "distributed_by": "Distributor",
+            "actors": ["Actor 1", "Actor 3"],
+            "genres": ["Genre 1"],
+        }
+        for title in ("First", "Second")
+    ]
+    FilmService.bulk_create_films(db.session, films)
+    counts = dict(db.session.query(Actor.name, Actor.film_count))
+    assert counts == {"Actor 1": 3, "Actor 2": 1, "Actor 3": 2}
+    genre = db.session.query(Genre).filter_by(name="Genre 1").one()
+    assert genre.film_count == 3
+
+    db.session.query(Actor).update({"film_count": 7})
+    db.session.commit()
+    repaired = reconcile_counters()
+    assert repaired == {"films": 0, "actors": 3, "genres": 0}
+    counts = dict(db.session.query(Actor.name, Actor.film_count))
+    assert counts == {"Actor 1": 3, "Actor 2": 1, "Actor 3": 2}
+    assert counters.reconcile(db.session)["actors"] == 0
+
+
+def test_actor_list_filters_and_sorts_by_film_count(
+    client: testing.FlaskClient,
+    db: SQLAlchemy,
+    film_factory: Factory,
+    actor_factory: Factory,
+):
+    actors = actor_factory.create_batch(3)
+    for count, actor in enumerate(actors):
+        for film in film_factory.create_batch(count):
+            film.actors = [actor]
+            db.session.add(film)
+    db.session.add_all(actors)
+    db.session.commit()
+
+    response = client.get(url_for("api.actors", sort="popular"))
+    assert [actor["film_count"] for actor in response.json] == [2, 1]
+    response = client.get(url_for("api.actors", min_films=2))
+    assert [actor["name"] for actor in response.json] == [actors[2].name]
+    assert response.headers["X-Total-Count"] == "1"
+    assert client.get(url_for("api.actors", sort="name")).status_code == 400
@@ -0,0 +1,75 @@
+import pytest
+
+from filmapi.extensions import redis_client
+from filmapi.services.crawl_frontier import CrawlFrontier
+from filmapi.services.imdb_parser import IMDbParser
+
+
+@pytest.fixture
+def frontier() -> CrawlFrontier:
+    frontier = CrawlFrontier(redis_client, name="test")
+    frontier.reset()
+    yield frontier
+    frontier.reset()
+
+
+def test_frontier_dedupes_urls(frontier: CrawlFrontier):
+    assert frontier.add_titles(["a", "b", "a"]) == 2
+    assert frontier.add_titles(["b", "c"]) == 1
+    assert frontier.pop_titles(10) == ["a", "b", "c"]
+
+
+def test_frontier_recovers_unacknowledged_urls(frontier: CrawlFrontier):
+    frontier.add_pages(["page-1", "page-2"])
+    assert frontier.next_page() == "page-1"
+    assert frontier.next_page() == "page-2"
+    frontier.ack_page("page-2")
+
+    frontier.recover()
+    assert frontier.next_page() == "page-1"
+    assert frontier.next_page() is None
+
+
+def test_frontier_budget(frontier: CrawlFrontier):
+    frontier.set_budget(pages=1, titles=2)
+    frontier.add_pages(["page-1", "page-2"])
+    assert frontier.add_titles(["a", "b", "c"]) == 2
+    assert frontier.next_page() == "page-1"
+    assert frontier.next_page() is None
+
+    frontier.set_budget()
+    assert frontier.add_titles(["c"]) == 1
+
+
+def test_get_links_from_listing():
+    html = """
+    <a href="/title/tt0111161/?ref_=chttp_t_1">The Shawshank Redemption</a>
+    <a href="/title/tt0111161/">The Shawshank Redemption</a>
+    <a href="https://www.imdb.com/title/tt0068646/">The Godfather</a>
+    <a href="/name/nm0000209/">Tim Robbins</a>
+    <a href="?start=51" class="lister-page-next next-page">Next</a>
+    """
+    parser = IMDbParser({})
+    links, next_page = parser.get_links_from_listing(
+        html, "https://www.imdb.com/search/title/?start=1"
+    )
+    assert links == [
+        "https://www.imdb.com/title/tt0111161/",
+        "https://www.imdb.com/title/tt0068646/",
+    ]
+    assert next_page == "https://www.imdb.com/search/title/?start=51"
+
+
+def test_frontier_requeues_pages_cut_off_by_the_budget(frontier: CrawlFrontier):
+    frontier.set_budget(titles=2)
+    frontier.add_pages(["page-1", "page-2"])
+    assert frontier.next_page() == "page-1"
+    assert frontier.add_titles(["a", "b"]) == 2
+    assert not frontier.budget_exhausted("titles")
+    assert frontier.add_titles(["c"]) == 0
+    assert frontier.budget_exhausted("titles")
+
+    frontier.requeue_page("page-1")
+    frontier.set_budget()
+    assert frontier.next_page() == "page-1"
+    assert frontier.add_titles(["a", "b", "c"]) == 1
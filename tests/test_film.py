@@ -1,11 +1,16 @@
 import json
+import mock
+import pytest
+from datetime import date
 from typing import Dict, List
 
+from cachelib import SimpleCache
 from flask import url_for, testing
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
 from factory import Factory
 
-from filmapi.models import Genre, Film
+from filmapi.models import Actor, Genre, Film
 from filmapi.services.film_service import FilmService
 
 
@@ -16,7 +21,8 @@ def test_get_film_by_uuid(client: testing.FlaskClient, film: Film, db: SQLAlchem
     data = json.loads(response.data.decode("utf-8"))
     assert data["film"]["title"] == film.title
     assert data["film"]["rating"] == film.rating
-    assert len(data["film"]) == 13
+    assert data["film"]["comment_count"] == 0
+    assert len(data["film"]) == 14
 
 
 def test_get_film_not_found(client: testing.FlaskClient, film: Film):
@@ -179,3 +185,336 @@ def test_delete_film(
     rep = client.delete(user_url, headers=admin_headers)
     assert rep.status_code == 204
     assert db.session.query(Film).filter_by(uuid=film.uuid).first() is None
+
+
+def test_bulk_create_films_upserts(db: SQLAlchemy, film: Film):
+    films = [
+        {
+            "title": "Updated Film",
+            "title_original": film.title_original,
+            "poster": "poster_url",
+            "rating": 9.1,
+            "description": "Film description",
+            "release_date": "2023-9-26",
+            "budget": "Budget",
+            "distributed_by": "Distributor",
+            "length": 120,
+            "trailer": "trailer_url",
+            "actors": ["Actor 1", "Actor 3"],
+            "genres": ["Genre 3"],
+        },
+        {
+            "title": "New Film",
+            "title_original": "New Original Title",
+            "poster": "poster_url",
+            "rating": 8.0,
+            "description": "Film description",
+            "release_date": "2001-1-1",
+            "budget": "Budget",
+            "distributed_by": "Distributor",
+            "length": 90,
+            "trailer": "trailer_url",
+            "actors": ["Actor 3"],
+            "genres": ["Genre 1"],
+        },
+    ]
+    counts = FilmService.bulk_create_films(db.session, films)
+    assert counts == {"inserted": 1, "updated": 1}
+
+    db.session.expire_all()
+    updated: Film = db.session.query(Film).filter_by(uuid=film.uuid).one()
+    assert updated.title == "Updated Film"
+    assert updated.rating == 9.1
+    assert sorted(actor.name for actor in updated.actors) == [
+        "Actor 1",
+        "Actor 2",
+        "Actor 3",
+    ]
+    new_film: Film = (
+        db.session.query(Film).filter_by(title_original="New Original Title").one()
+    )
+    assert [genre.name for genre in new_film.genres] == ["Genre 1"]
+    assert db.session.query(Actor).count() == 3
+
+
+def test_bulk_create_films_keeps_missing_columns_and_reindexes(
+    db: SQLAlchemy, film: Film
+):
+    partial = {
+        "title": "Updated Film",
+        "title_original": film.title_original,
+        "release_date": "2023-9-26",
+        "distributed_by": "Distributor",
+    }
+    with mock.patch("filmapi.services.film_service.helpers.bulk") as bulk:
+        counts = FilmService.bulk_create_films(db.session, [partial])
+    assert counts == {"inserted": 0, "updated": 1}
+
+    db.session.expire_all()
+    updated: Film = db.session.query(Film).filter_by(uuid=film.uuid).one()
+    assert updated.title == "Updated Film"
+    assert (updated.budget, updated.rating) == (film.budget, film.rating)
+    [document] = bulk.call_args.args[1]
+    assert document["_id"] == film.uuid
+    assert document["_source"]["title"] == "Updated Film"
+    assert document["_source"]["budget"] == film.budget
+
+    # the COPY merge on Postgres
+    with mock.patch("filmapi.services.film_service.helpers.bulk") as bulk:
+        counts = FilmService.ingest_films(db.session, [{**partial, "title": "Again"}])
+    assert counts == {"inserted": 0, "updated": 1}
+    [document] = bulk.call_args.args[1]
+    assert document["_id"] == film.uuid
+    assert document["_source"]["title"] == "Again"
+    assert document["_source"]["rating"] == film.rating
+
+
+@pytest.mark.parametrize("ingest", ["bulk_create_films", "ingest_films"])
+def test_remakes_are_kept_apart_and_merged_by_imdb_id(
+    db: SQLAlchemy, film: Film, ingest
+):
+    def remake(imdb_id, release_date, title="Remake"):
+        return {
+            "imdb_id": imdb_id,
+            "title": title,
+            "title_original": film.title_original,
+            "release_date": release_date,
+            "distributed_by": "Distributor",
+        }
+
+    # the stored film, without an IMDb id, is adopted by the row of its date
+    counts = getattr(FilmService, ingest)(
+        db.session,
+        [remake("tt0000001", "2023-9-26"), remake("tt0000002", "1990-1-1")],
+    )
+    assert counts == {"inserted": 1, "updated": 1}
+    counts = getattr(FilmService, ingest)(
+        db.session,
+        [
+            remake("tt0000002", "1990-1-2", title="Renamed"),
+            remake(None, "1970-1-1"),
+        ],
+    )
+    assert counts == {"inserted": 1, "updated": 1}
+
+    db.session.expire_all()
+    films = db.session.query(Film).order_by(Film.release_date).all()
+    assert [(film.imdb_id, film.title) for film in films] == [
+        (None, "Remake"),
+        ("tt0000002", "Renamed"),
+        ("tt0000001", "Remake"),
+    ]
+    assert films[-1].uuid == film.uuid
+
+
+def test_ingest_films_consumes_a_generator_in_batches(db: SQLAlchemy):
+    films = (
+        {
+            "title": f"Ingested Film {i}",
+            "title_original": f"Ingested Original {i}",
+            "release_date": "1999-1-1",
+            "distributed_by": "Distributor",
+            "rating": 7.0,
+            "actors": [f"Actor {i % 2}"],
+            "genres": ["Drama"],
+        }
+        for i in range(5)
+    )
+    counts = FilmService.ingest_films(db.session, films, batch_size=2)
+    assert counts == {"inserted": 5, "updated": 0}
+    assert db.session.query(Film).count() == 5
+    assert db.session.query(Actor).count() == 2
+    counts = dict(db.session.query(Actor.name, Actor.film_count))
+    assert counts == {"Actor 0": 3, "Actor 1": 2}
+    assert db.session.query(Genre.film_count).scalar() == 5
+
+
+def test_film_list_total_headers(
+    client: testing.FlaskClient, db: SQLAlchemy, film_factory: Factory
+):
+    genre = Genre(name="Drama")
+    films = film_factory.create_batch(5)
+    for film in films:
+        film.genres = [genre]
+    db.session.add_all(films)
+    db.session.commit()
+
+    response = client.get(url_for("api.films", offset=2))
+    assert len(response.get_json()) == 2
+    assert response.headers["X-Total-Count"] == "5"
+    assert response.headers["X-Total-Count-Exact"] == "true"
+
+    with mock.patch("filmapi.commons.pagination.estimate_rows", return_value=10**6):
+        response = client.get(url_for("api.films", offset=2))
+    assert response.headers["X-Total-Count"] == "1000000"
+    assert response.headers["X-Total-Count-Exact"] == "false"
+
+
+def test_film_list_totals_are_cached_until_films_change(
+    client: testing.FlaskClient, db: SQLAlchemy, film_factory: Factory
+):
+    genre = Genre(name="Drama")
+    films = film_factory.create_batch(3)
+    for film in films:
+        film.genres = [genre]
+    db.session.add_all(films)
+    db.session.commit()
+
+    with mock.patch("filmapi.commons.pagination.cache", SimpleCache()), mock.patch(
+        "filmapi.commons.pagination.estimate_rows", return_value=None
+    ) as estimate_rows:
+        assert client.get(url_for("api.films")).headers["X-Total-Count"] == "3"
+        assert client.get(url_for("api.films")).headers["X-Total-Count"] == "3"
+        assert estimate_rows.call_count == 1
+
+        film = film_factory.create()
+        film.genres = [genre]
+        db.session.add(film)
+        db.session.commit()
+        assert client.get(url_for("api.films")).headers["X-Total-Count"] == "4"
+        assert estimate_rows.call_count == 2
+
+
+def test_film_sparse_fieldsets(client: testing.FlaskClient, db: SQLAlchemy, film: Film):
+    response = client.get(url_for("api.films", fields="uuid,title"))
+    assert response.get_json() == [{"uuid": film.uuid, "title": film.title}]
+
+    response = client.get(url_for("api.films", fields="title,plot"))
+    assert response.status_code == 400
+
+    response = client.get(
+        url_for("api.film_by_uuid", uuid=film.uuid, fields="title,actors")
+    )
+    data = response.get_json()["film"]
+    assert data.keys() == {"title", "actors"}
+    assert sorted(actor["name"] for actor in data["actors"]) == ["Actor 1", "Actor 2"]
+
+
+def test_film_list_sorts(
+    client: testing.FlaskClient, db: SQLAlchemy, film_factory: Factory
+):
+    genre = Genre(name="Drama")
+    films = [
+        film_factory.create(title="B", rating=7.0, release_date=date(1990, 1, 1)),
+        film_factory.create(title="C", rating=None, release_date=date(1980, 1, 1)),
+        film_factory.create(title="A", rating=9.0, release_date=date(2000, 1, 1)),
+        film_factory.create(title="D", rating=7.0, release_date=date(1970, 1, 1)),
+    ]
+    for film in films:
+        film.genres = [genre]
+    db.session.add_all(films)
+    db.session.commit()
+
+    def titles(**params):
+        response = client.get(url_for("api.films", fields="title", **params))
+        assert response.status_code == 200
+        return "".join(film["title"] for film in response.get_json())
+
+    assert titles() == "BCAD"
+    assert titles(sort="rating") == "CBDA"
+    assert titles(sort="-rating") == "ADBC"
+    assert titles(sort="release_date") == "DCBA"
+    assert titles(sort="-title", genre="drama") == "DCBA"
+    assert titles(sort="title", year_from=1975, year_to=1995) == "BC"
+    assert titles(sort="-rating", offset=1, page=1) == "D"
+    response = client.get(url_for("api.films", sort="-uuid"))
+    assert response.status_code == 400
+
+
+FILM_LIST_SORTS = [
+    None,
+    "rating",
+    "-rating",
+    "release_date",
+    "-release_date",
+    "title",
+    "-title",
+]
+FILM_LIST_FILTERS = [
+    {},
+    {"year_from": 1990},
+    {"year_from": 1990, "year_to": 1999},
+    {"rating_from": 7.0},
+    {"year_from": 1990, "year_to": 1999, "rating_from": 7.0},
+]
+# a catalog of 100000 films over 120 years, a tenth of them unrated, each
+# in one of 20 genres, Drama holding a twentieth of them
+SEED_CATALOG = """
+INSERT INTO genres (name, film_count)
+SELECT CASE WHEN i = 1 THEN 'Drama' ELSE 'Genre ' || i END, 5000
+FROM generate_series(1, 20) AS i;
+INSERT INTO films (uuid, title, title_original, release_date, distributed_by,
+                   rating)
+SELECT gen_random_uuid()::text, 'Film ' || md5(i::text), 'Film ' || i,
+       date '1900-01-01' + (i * 7919) % 43800, '',
+       CASE WHEN i % 10 <> 0 THEN (i * 31) % 91 / 10.0 + 1 END
+FROM generate_series(1, 100000) AS i;
+INSERT INTO movies_genres (film_id, genre_id)
+SELECT films.id, genres.id FROM films
+JOIN genres ON genres.id = films.id % 20 + 1;
+ANALYZE films, genres, movies_genres;
+"""
+
+
+def film_list_plan(db: SQLAlchemy, sort, filters, genre):
+    """The root node of the ``EXPLAIN (FORMAT JSON)`` plan of a page of films"""
+    if genre:
+        query = FilmService.fetch_films_by_genre(
+            db.session, genre, 1, 20, sort=sort, **filters
+        )
+    else:
+        query = FilmService.fetch_all_films(db.session, 1, 20, sort=sort, **filters)
+    connection = db.session.connection()
+    statement = query.statement.compile(dialect=connection.dialect)
+    return connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {statement}", statement.params
+    ).scalar()[0]["Plan"]
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+@pytest.mark.parametrize("sort", FILM_LIST_SORTS)
+@pytest.mark.parametrize("filters", FILM_LIST_FILTERS)
+@pytest.mark.parametrize("genre", [None, "Drama"])
+def test_film_list_plans_can_read_sort_indexes(db: SQLAlchemy, sort, filters, genre):
+    """Every filter and sort combination has a plan reading a sort index"""
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("plans are checked on Postgres")
+    # with sorts priced out, a Sort node means no index gives the order
+    db.session.execute(text("SET LOCAL enable_sort = off"))
+    plan = film_list_plan(db, sort, filters, genre)
+    assert all(node["Node Type"] != "Sort" for node in plan_nodes(plan)), plan
+    db.session.rollback()
+
+
+def test_film_list_plans_on_a_realistic_catalog(db: SQLAlchemy):
+    """With default settings, pages are read in the order of a sort index
+
+    The one exception: a decade, a minimum rating and a genre together match
+    about a hundred films, which Postgres rightly finds with the genre index
+    and sorts rather than walking a sort index for them. Any other
+    combination sorting films, or this one no longer sorting, fails.
+    """
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("plans are checked on Postgres")
+    db.session.execute(text(SEED_CATALOG))
+    db.session.commit()
+    narrowest = FILM_LIST_FILTERS[-1]
+    expected = {(sort, repr(narrowest), "Drama") for sort in FILM_LIST_SORTS if sort}
+    sorting = set()
+    for sort in FILM_LIST_SORTS:
+        for filters in FILM_LIST_FILTERS:
+            for genre in (None, "Drama"):
+                plan = film_list_plan(db, sort, filters, genre)
+                # sorts of genre memberships for a merge join are not pages
+                if any(
+                    node["Node Type"] == "Sort"
+                    and any("films." in key for key in node["Sort Key"])
+                    for node in plan_nodes(plan)
+                ):
+                    sorting.add((sort, repr(filters), genre))
+    assert sorting == expected
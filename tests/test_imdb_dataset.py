@@ -0,0 +1,85 @@
+import gzip
+from pathlib import Path
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from filmapi.models import Film
+from filmapi.services.imdb_dataset import IMDbDatasetReader
+
+DATASETS = {
+    "title.basics": [
+        "tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\t"
+        "endYear\truntimeMinutes\tgenres",
+        "tt0000009\tmovie\tMiss Jerry\tMiss Jerry\t0\t1894\t\\N\t45\tRomance",
+        "tt0000010\tshort\tShort Film\tShort Film\t0\t1895\t\\N\t1\tShort",
+        "tt0111161\tmovie\tShawshank\tThe Shawshank Redemption\t0\t1994\t\\N\t142\t"
+        "Drama",
+        "tt10000000\tmovie\tNo Year\tNo Year\t0\t\\N\t\\N\t\\N\t\\N",
+        "tt10000001\tmovie\tUnrated\tUnrated\t0\t2020\t\\N\t\\N\t\\N",
+    ],
+    "title.ratings": [
+        "tconst\taverageRating\tnumVotes",
+        "tt0000009\t5.3\t200",
+        "tt0111161\t9.3\t2800000",
+    ],
+    "title.principals": [
+        "tconst\tordering\tnconst\tcategory\tjob\tcharacters",
+        "tt0000009\t1\tnm0063086\tactress\t\\N\t\\N",
+        "tt0000009\t2\tnm0183823\tdirector\t\\N\t\\N",
+        "tt0111161\t1\tnm0000209\tactor\t\\N\t\\N",
+        "tt0111161\t2\tnm0000151\tactor\t\\N\t\\N",
+    ],
+    "name.basics": [
+        "nconst\tprimaryName\tbirthYear\tdeathYear\tprimaryProfession\tknownForTitles",
+        "nm0000151\tMorgan Freeman\t1937\t\\N\tactor\ttt0111161",
+        "nm0000209\tTim Robbins\t1958\t\\N\tactor\ttt0111161",
+        "nm0063086\tBlanche Bayliss\t1878\t1951\tactress\ttt0000009",
+    ],
+}
+
+
+def write_datasets(directory: Path) -> Path:
+    for name, lines in DATASETS.items():
+        with gzip.open(directory / f"{name}.tsv.gz", "wt", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+    return directory
+
+
+def test_reader_joins_datasets(tmp_path: Path):
+    write_datasets(tmp_path)
+    reader = IMDbDatasetReader(
+        *(
+            tmp_path / f"{name}.tsv.gz"
+            for name in ("title.basics", "title.ratings", "title.principals")
+        ),
+        tmp_path / "name.basics.tsv.gz",
+    )
+    films = {film["title_original"]: film for film in reader.films()}
+
+    assert sorted(films) == ["Miss Jerry", "The Shawshank Redemption", "Unrated"]
+    shawshank = films["The Shawshank Redemption"]
+    assert shawshank["rating"] == 9.3
+    assert shawshank["release_date"] == "1994-1-1"
+    assert shawshank["actors"] == ["Tim Robbins", "Morgan Freeman"]
+    assert shawshank["genres"] == ["Drama"]
+    assert films["Miss Jerry"]["actors"] == ["Blanche Bayliss"]
+    assert films["Unrated"]["rating"] is None
+
+
+def test_import_imdb_tsv_command(app: Flask, db: SQLAlchemy, tmp_path: Path):
+    write_datasets(tmp_path)
+    runner = app.test_cli_runner()
+    result = runner.invoke(
+        args=["import-imdb-tsv", str(tmp_path), "--min-votes", "1000"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "imported 1 new and 0 updated films" in result.output
+
+    film: Film = db.session.query(Film).one()
+    assert film.title_original == "The Shawshank Redemption"
+    assert film.imdb_id == "tt0111161"
+    assert sorted(actor.name for actor in film.actors) == [
+        "Morgan Freeman",
+        "Tim Robbins",
+    ]
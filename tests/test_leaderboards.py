@@ -0,0 +1,100 @@
+from datetime import date
+
+from flask import Flask, url_for, testing
+from flask_sqlalchemy import SQLAlchemy
+from factory import Factory
+
+from filmapi.extensions import redis_client
+from filmapi.models import Genre
+from filmapi.services import leaderboards
+from filmapi.services.film_service import FilmService
+
+
+def titles(client, **params):
+    response = client.get(url_for("api.leaderboards", **params))
+    assert response.status_code == 200
+    return [film["title"] for film in response.json]
+
+
+def test_orm_writes_maintain_leaderboards(
+    client: testing.FlaskClient, db: SQLAlchemy, film_factory: Factory
+):
+    drama, war = Genre(name="Drama"), Genre(name="War")
+    films = [
+        film_factory.create(title="A", rating=8.0, release_date=date(1994, 1, 1)),
+        film_factory.create(title="B", rating=9.0, release_date=date(1972, 1, 1)),
+        film_factory.create(title="C", rating=7.0, release_date=date(1998, 1, 1)),
+        film_factory.create(title="D", rating=None, release_date=date(1999, 1, 1)),
+    ]
+    films[0].genres = [drama]
+    films[1].genres = [drama, war]
+    films[2].genres = [war]
+    films[3].genres = [drama]
+    db.session.add_all(films)
+    db.session.commit()
+
+    assert titles(client) == ["B", "A", "C"]
+    assert titles(client, genre="Drama") == ["B", "A"]
+    assert titles(client, genre="drama") == ["B", "A"]
+    assert titles(client, decade=1990) == ["A", "C"]
+    assert titles(client, genre="War", decade=1990) == ["C"]
+    assert titles(client, limit=1) == ["B"]
+
+    films[2].rating = 9.5
+    films[2].genres = [drama]
+    films[0].release_date = date(2001, 1, 1)
+    db.session.commit()
+    assert titles(client, genre="Drama") == ["C", "B", "A"]
+    assert titles(client, genre="War") == ["B"]
+    assert titles(client, decade=1990) == ["C"]
+    assert titles(client, decade=2000) == ["A"]
+
+    films[1].rating = None
+    db.session.delete(films[2])
+    db.session.commit()
+    assert titles(client, genre="Drama") == ["A"]
+    assert titles(client) == ["A"]
+
+    films[0].rating = 1.0
+    db.session.flush()
+    db.session.rollback()
+    assert titles(client) == ["A"]
+
+    assert client.get(url_for("api.leaderboards", decade=1995)).status_code == 400
+    assert client.get(url_for("api.leaderboards", genre="Anime")).status_code == 404
+    assert client.get(url_for("api.leaderboards", limit=101)).status_code == 400
+
+
+def test_bulk_writes_and_rebuild(
+    app: Flask, client: testing.FlaskClient, db: SQLAlchemy
+):
+    films = [
+        {
+            "title": title,
+            "title_original": title,
+            "release_date": f"{year}-1-1",
+            "rating": rating,
+            "distributed_by": "Distributor",
+            "actors": [],
+            "genres": ["Drama"],
+        }
+        for title, year, rating in (("First", 1995, 6.0), ("Second", 2005, 8.0))
+    ]
+    FilmService.bulk_create_films(db.session, films)
+    assert titles(client, genre="Drama") == ["Second", "First"]
+    films[0]["rating"] = 9.0
+    FilmService.bulk_create_films(db.session, films[:1])
+    assert titles(client, genre="Drama") == ["First", "Second"]
+    third = {**films[1], "title": "Third", "title_original": "Third", "rating": 7.0}
+    FilmService.ingest_films(db.session, [third])
+    assert titles(client, genre="Drama", decade=2000) == ["Second", "Third"]
+
+    redis_client.delete(leaderboards.leaderboard_key(decade=1990))
+    redis_client.zadd(leaderboards.leaderboard_key(decade=1980), {"12345": 10.0})
+    result = app.test_cli_runner().invoke(args=["rebuild-leaderboards"])
+    assert "ranked 3 films" in result.output
+    assert titles(client, decade=1990) == ["First"]
+    assert not redis_client.exists(leaderboards.leaderboard_key(decade=1980))
+
+    FilmService.reset_catalog(db.session)
+    assert titles(client) == []
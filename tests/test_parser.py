@@ -0,0 +1,149 @@
+import mock
+import pytest
+from flask_sqlalchemy import SQLAlchemy
+
+from filmapi.extensions import redis_client
+from filmapi.models import Film
+from filmapi.services.crawl_frontier import CrawlFrontier
+from filmapi.tasks.locks import TaskLock, release_lock
+from filmapi.tasks.progress import TaskProgress, record_failure
+from filmapi.tasks.parser import (
+    CRAWL_LOCK,
+    crawl_imdb,
+    dispatch_links,
+    parse_imdb_data,
+    parse_imdb_films,
+    populate_lock_name,
+    save_films,
+)
+
+pytestmark = pytest.mark.usefixtures("populate_locks")
+
+
+def film_data(title: str) -> dict:
+    return {
+        "title": title,
+        "title_original": title,
+        "poster": "poster_url",
+        "rating": 7.5,
+        "description": "Film description",
+        "release_date": "2023-9-26",
+        "budget": "Budget",
+        "distributed_by": "Distributor",
+        "length": 120,
+        "trailer": "trailer_url",
+        "actors": ["Actor 1"],
+        "genres": ["Genre 1"],
+    }
+
+
+@mock.patch("filmapi.tasks.parser.chord")
+def test_parse_imdb_data_fans_out_chunks(mock_chord, app, db: SQLAlchemy):
+    links = [f"https://www.imdb.com/title/tt{i}/" for i in range(60)]
+    with mock.patch("filmapi.tasks.parser.asyncio.run", return_value=links) as run:
+        parse_imdb_data()
+        run.call_args.args[0].close()
+
+    header = mock_chord.call_args.args[0]
+    chunk_size = app.config["PARSER_CHUNK_SIZE"]
+    assert len(header.tasks) == -(-len(links) // chunk_size)
+    assert sum(len(task.args[0]) for task in header.tasks) == len(links)
+
+    dispatch_links(links, progress_id="fan-out-id", lock=populate_lock_name())
+    redis_client.delete(TaskProgress("fan-out-id").key)
+    callback = mock_chord.return_value.call_args.args[0]
+    errbacks = {errback["task"]: errback for errback in callback.options["link_error"]}
+    assert errbacks[release_lock.name]["kwargs"] == {
+        "name": populate_lock_name(),
+        "token": "fan-out-id",
+    }
+    assert errbacks[record_failure.name]["kwargs"] == {"progress_id": "fan-out-id"}
+
+
+def test_save_films_reports_totals(db: SQLAlchemy):
+    chunks = [[film_data("Film 1"), film_data("Film 2")], [], [film_data("Film 3")]]
+    totals = save_films(chunks, discovered=4)
+    assert totals["discovered"] == 4
+    assert totals["parsed"] == 3
+    assert totals["inserted"] == 3
+    assert db.session.query(Film).count() == 3
+
+
+def test_save_films_releases_populate_lock(db: SQLAlchemy):
+    lock = TaskLock(populate_lock_name())
+    assert lock.acquire("task-id", ttl=60) == "task-id"
+    assert lock.acquire("other-id", ttl=60) == "task-id"
+
+    save_films(
+        [[film_data("Film 1")]], progress_id="other-id", lock=populate_lock_name()
+    )
+    assert lock.owner() == "task-id"
+    save_films(
+        [[film_data("Film 2")]], progress_id="task-id", lock=populate_lock_name()
+    )
+    assert lock.owner() is None
+
+
+def test_failed_chunks_release_and_running_chunks_extend_populate_lock(
+    app, db: SQLAlchemy
+):
+    lock = TaskLock(populate_lock_name())
+    lock.acquire("run-id", ttl=60)
+    with mock.patch("filmapi.tasks.parser.asyncio.run", return_value=[]) as run:
+        parse_imdb_films([], progress_id="run-id", lock=populate_lock_name())
+        run.call_args.args[0].close()
+    assert lock.owner() == "run-id"
+    assert redis_client.ttl(lock.key) > 60
+    assert not lock.extend("other-id", 60)
+
+    release_lock(
+        None, RuntimeError(), None, name=populate_lock_name(), token="other-id"
+    )
+    assert lock.owner() == "run-id"
+    release_lock(None, RuntimeError(), None, name=populate_lock_name(), token="run-id")
+    assert lock.owner() is None
+
+
+@mock.patch("filmapi.tasks.parser.chord")
+def test_crawled_titles_are_acknowledged_once_saved(mock_chord, db: SQLAlchemy):
+    frontier = CrawlFrontier(redis_client, name="test")
+    frontier.reset()
+    frontier.add_titles(["title-1", "title-2"])
+    titles = frontier.pop_titles(2)
+
+    dispatch_links(titles, frontier="test")
+    callback = mock_chord.return_value.call_args.args[0]
+    assert callback.kwargs["titles"] == titles
+    frontier.recover()
+    assert sorted(frontier.pop_titles(2)) == titles
+
+    save_films([[film_data("Film 1")]], **callback.kwargs)
+    frontier.recover()
+    assert frontier.pop_titles(2) == []
+    frontier.reset()
+
+
+def run_crawl(task_id):
+    crawl_imdb.push_request(id=task_id)
+    try:
+        return crawl_imdb()
+    finally:
+        crawl_imdb.pop_request()
+
+
+def test_overlapping_crawls_leave_the_frontier_alone(app):
+    lock = TaskLock(CRAWL_LOCK)
+    lock.acquire("first-crawl", ttl=60)
+    with mock.patch("filmapi.tasks.parser.CrawlFrontier") as frontier:
+        assert run_crawl("second-crawl") == {"running": "first-crawl"}
+    frontier.assert_not_called()
+    assert lock.owner() == "first-crawl"
+
+    # the submitted crawl owns the lock and releases it when done
+    with mock.patch("filmapi.tasks.parser.CrawlFrontier") as frontier:
+        frontier.return_value.next_page.return_value = None
+        frontier.return_value.pending_titles.return_value = 0
+        run_crawl("first-crawl")
+    frontier.return_value.recover.assert_called_once_with()
+    assert lock.owner() is None
+    redis_client.delete(TaskProgress("first-crawl").key)
@@ -0,0 +1,71 @@
+import pytest
+from flask import url_for, testing
+from flask_sqlalchemy import SQLAlchemy
+from factory import Factory
+
+from filmapi.models import PlotNeighbor, PlotPosting
+from filmapi.services.plot_index import plot_vector, tokenize
+from filmapi.tasks.catalog import rebuild_plot_index, update_plot_index
+
+DESCRIPTIONS = [
+    "A detective hunts a serial killer through the rainy streets of the city.",
+    "A rookie detective and a veteran hunt a killer who leaves riddles.",
+    "Pirates sail the ocean looking for buried treasure on a cursed island.",
+    "A young pirate searches for the treasure of a legendary captain.",
+    "A family spends a quiet summer on the farm.",
+]
+
+
+def test_tokenize_and_vector():
+    assert tokenize("The Killer's 2 riddles, and a DETECTIVE") == [
+        "killer's",
+        "riddles",
+        "detective",
+    ]
+    idf = {"killer": 2.0, "detective": 1.0}
+    vector = plot_vector(["killer", "killer", "detective", "unknown"], idf, 1)
+    assert vector == {"killer": 1.0}
+    vector = plot_vector(["killer", "detective"], idf, 2)
+    assert sum(weight**2 for weight in vector.values()) == pytest.approx(1.0)
+    assert plot_vector(["unknown"], idf, 2) == {}
+
+
+def test_related_by_plot(
+    client: testing.FlaskClient, db: SQLAlchemy, film_factory: Factory
+):
+    films = [film_factory.create(description=text) for text in DESCRIPTIONS]
+    db.session.add_all(films)
+    db.session.commit()
+
+    def related(film):
+        response = client.get(url_for("api.film_by_uuid", uuid=film.uuid))
+        return [other["uuid"] for other in response.json["related_by_plot"]]
+
+    assert related(films[0]) == []
+    # an empty index is built from scratch
+    assert update_plot_index() == {"films": 4}
+    assert related(films[0]) == [films[1].uuid]
+    assert related(films[3]) == [films[2].uuid]
+    assert related(films[4]) == []
+    assert update_plot_index() == {"films": 0}
+
+    newcomer = film_factory.create(
+        description="A detective hunts the killer who stole a pirate treasure."
+    )
+    db.session.add(newcomer)
+    db.session.commit()
+    assert update_plot_index() == {"films": 1}
+    assert set(related(newcomer)) == {film.uuid for film in films[:4]}
+    assert related(films[0])[1] == newcomer.uuid
+    assert related(films[2])[1] == newcomer.uuid
+    postings = db.session.query(PlotPosting).filter_by(film_id=newcomer.id).count()
+    assert postings > 0
+    assert update_plot_index() == {"films": 0}
+
+    rebuilt = rebuild_plot_index()
+    assert rebuilt == {"films": 5}
+    assert related(films[0])[0] == films[1].uuid
+    db.session.delete(newcomer)
+    db.session.commit()
+    assert newcomer.uuid not in related(films[0])
+    assert db.session.query(PlotNeighbor).count() > 0
@@ -1,11 +1,20 @@
 from typing import Dict
 
 import mock
+import pytest
 from flask import url_for, testing
 from flask_sqlalchemy import SQLAlchemy
 
+from filmapi.models import Actor, Comments, Film, Genre, User
+from filmapi.services.search_index import FILMS_MAPPINGS, swap_in_empty_index
+from filmapi.tasks.catalog import reset_catalog
+from filmapi.tasks.locks import TaskLock
+from filmapi.tasks.parser import populate_lock_name
 
-@mock.patch("filmapi.tasks.parser.parse_imdb_data")
+pytestmark = pytest.mark.usefixtures("populate_locks")
+
+
+@mock.patch("filmapi.api.resources.populate_db.parse_imdb_data")
 def test_get_method(
     mock_parse_imdb_data,
     client: testing.FlaskClient,
@@ -14,13 +23,14 @@ def test_get_method(
 ):
     response = client.get(url_for("api.populate_db"), headers=admin_headers)
     assert response.status_code == 200
-    mock_parse_imdb_data.assert_not_called()
     data: dict = response.get_json()
-    assert response.status_code == 200
-    assert data == {"message": "Database population task started."}
+    mock_parse_imdb_data.apply_async.assert_called_once_with(
+        (), task_id=data["task_id"]
+    )
+    assert data["message"] == "Database population task started."
 
 
-@mock.patch("filmapi.tasks.parser.parse_imdb_data")
+@mock.patch("filmapi.api.resources.populate_db.parse_imdb_data")
 def test_post_method(
     mock_parse_imdb_data,
     client: testing.FlaskClient,
@@ -31,8 +41,81 @@ def test_post_method(
     response = client.post(
         url_for("api.populate_db"), json=request_data, headers=admin_headers
     )
-    mock_parse_imdb_data.assert_not_called()
     assert response.status_code == 200
     data: dict = response.get_json()
+    mock_parse_imdb_data.apply_async.assert_called_once_with(
+        (request_data["link"],), task_id=data["task_id"]
+    )
     expected_message = f"Film parsing task started for URL: {request_data['link']}"
-    assert data == {"message": expected_message}
+    assert data["message"] == expected_message
+
+
+@mock.patch("filmapi.api.resources.populate_db.parse_imdb_data")
+def test_concurrent_population_attaches_to_running_task(
+    mock_parse_imdb_data,
+    client: testing.FlaskClient,
+    db: SQLAlchemy,
+    admin_headers: Dict[str, str],
+):
+    first = client.get(url_for("api.populate_db"), headers=admin_headers)
+    second = client.get(url_for("api.populate_db"), headers=admin_headers)
+    other_link = client.post(
+        url_for("api.populate_db"),
+        json={"link": "https://example.com/movie"},
+        headers=admin_headers,
+    )
+    assert mock_parse_imdb_data.apply_async.call_count == 2
+    assert second.get_json() == {
+        "message": "Database population task already running.",
+        "task_id": first.get_json()["task_id"],
+    }
+    assert other_link.get_json()["task_id"] != first.get_json()["task_id"]
+
+    TaskLock(populate_lock_name()).release(first.get_json()["task_id"])
+    third = client.get(url_for("api.populate_db"), headers=admin_headers)
+    assert third.get_json()["task_id"] != first.get_json()["task_id"]
+    assert mock_parse_imdb_data.apply_async.call_count == 3
+
+
+@mock.patch("filmapi.api.resources.populate_db.reset_catalog")
+def test_delete_method(
+    mock_reset_catalog,
+    client: testing.FlaskClient,
+    db: SQLAlchemy,
+    admin_headers: Dict[str, str],
+):
+    mock_reset_catalog.delay.return_value.id = "task-id"
+    response = client.delete(url_for("api.populate_db"), headers=admin_headers)
+    assert response.status_code == 202
+    mock_reset_catalog.delay.assert_called_once_with()
+    assert response.get_json()["task_id"] == "task-id"
+
+
+@mock.patch("filmapi.tasks.catalog.swap_in_empty_index", return_value="films-new")
+def test_reset_catalog_task(mock_swap, db: SQLAlchemy, film: Film, admin_user: User):
+    db.session.add(Comments(text="Comment", user=admin_user, film=film))
+    db.session.commit()
+
+    assert reset_catalog() == {"index": "films-new"}
+    mock_swap.assert_called_once_with()
+    for model in (Film, Actor, Genre, Comments):
+        assert db.session.query(model).count() == 0
+    assert db.session.query(User).count() == 1
+
+
+@mock.patch("filmapi.services.search_index.es")
+def test_swap_in_empty_index_replaces_a_concrete_index_atomically(mock_es):
+    mock_es.indices.exists_alias.return_value = False
+    mock_es.indices.exists.return_value = True
+    new_index = swap_in_empty_index()
+
+    mock_es.indices.create.assert_called_once_with(
+        index=new_index, mappings=FILMS_MAPPINGS
+    )
+    mock_es.indices.update_aliases.assert_called_once_with(
+        actions=[
+            {"remove_index": {"index": "films"}},
+            {"add": {"index": new_index, "alias": "films"}},
+        ]
+    )
+    mock_es.indices.delete.assert_not_called()
@@ -0,0 +1,71 @@
+import time
+from typing import Dict
+
+import mock
+from flask import url_for, testing
+from redis.exceptions import ConnectionError
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from filmapi.models import Film
+
+
+def test_token_bucket_limits_each_client(
+    client: testing.FlaskClient, app, film: Film, admin_headers: Dict[str, str]
+):
+    limits = {"lists": {"capacity": 2, "per_second": 0.5}}
+    with mock.patch.dict(app.config["RATE_LIMITS"], limits):
+        responses = [client.get(url_for("api.films")) for _ in range(3)]
+        authenticated = client.get(url_for("api.films"), headers=admin_headers)
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert responses[0].headers["RateLimit-Limit"] == "2"
+    assert responses[0].headers["RateLimit-Remaining"] == "1"
+    assert responses[0].headers["RateLimit-Reset"] == "2"
+    assert "Retry-After" not in responses[1].headers
+    assert responses[2].headers["Retry-After"] == "2"
+    assert responses[2].headers["RateLimit-Remaining"] == "0"
+    # the JWT identity has a bucket of its own
+    assert authenticated.status_code == 200
+
+
+def test_token_bucket_refills(client: testing.FlaskClient, app, film: Film):
+    # slow enough that a request never refills a token on its own
+    limits = {"lists": {"capacity": 1, "per_second": 5}}
+
+    def status():
+        # an address of its own, other tests spent the usual one
+        environ = {"REMOTE_ADDR": "192.0.2.2"}
+        return client.get(url_for("api.films"), environ_base=environ).status_code
+
+    with mock.patch.dict(app.config["RATE_LIMITS"], limits):
+        assert status() == 200
+        assert status() == 429
+        time.sleep(0.2)
+        assert status() == 200
+
+
+def test_requests_pass_when_redis_is_down(client: testing.FlaskClient, film: Film):
+    with mock.patch("filmapi.commons.rate_limit.token_bucket") as bucket:
+        bucket.side_effect = ConnectionError
+        response = client.get(url_for("api.films"))
+    assert response.status_code == 200
+    assert "RateLimit-Limit" not in response.headers
+
+
+def test_clients_behind_trusted_proxies(client: testing.FlaskClient, app, film: Film):
+    limits = {"lists": {"capacity": 1, "per_second": 0.5}}
+
+    def status(address):
+        headers = {"X-Forwarded-For": address}
+        # a proxy address of its own, other tests spent the usual one
+        environ = {"REMOTE_ADDR": "192.0.2.1"}
+        response = client.get(
+            url_for("api.films"), headers=headers, environ_base=environ
+        )
+        return response.status_code
+
+    with mock.patch.dict(app.config["RATE_LIMITS"], limits):
+        # without a trusted proxy the header is the client's to forge
+        assert [status("10.0.0.1"), status("10.0.0.2")] == [200, 429]
+        with mock.patch.object(app, "wsgi_app", ProxyFix(app.wsgi_app, x_for=1)):
+            assert [status("10.0.0.3"), status("10.0.0.4")] == [200, 200]
+            assert status("10.0.0.3") == 429
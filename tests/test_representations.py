@@ -0,0 +1,44 @@
+import json
+from datetime import date, datetime
+from uuid import UUID
+
+import mock
+from flask import Flask
+
+from filmapi.commons import representations
+
+DATA = {
+    "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+    "release_date": date(2023, 9, 26),
+    "created_at": datetime(2023, 9, 26, 12, 30, 15),
+    "rating": 7.5,
+    "title": "Фільм",
+}
+EXPECTED = {
+    "uuid": "12345678-1234-5678-1234-567812345678",
+    "release_date": "2023-09-26",
+    "created_at": "2023-09-26T12:30:15",
+    "rating": 7.5,
+    "title": "Фільм",
+}
+
+
+def test_output_json(app: Flask):
+    with app.test_request_context():
+        response = representations.output_json(DATA, 201, {"X-Test": "1"})
+    assert response.status_code == 201
+    assert response.headers["X-Test"] == "1"
+    assert response.data.endswith(b"\n")
+    assert json.loads(response.data) == EXPECTED
+
+
+def test_output_json_without_orjson(app: Flask):
+    with app.test_request_context(), mock.patch.object(representations, "orjson", None):
+        response = representations.output_json(DATA, 200)
+    assert json.loads(response.data) == EXPECTED
+
+
+def test_output_json_falls_back_for_unsupported_data(app: Flask):
+    with app.test_request_context():
+        response = representations.output_json({1: 2**70}, 200)
+    assert json.loads(response.data) == {"1": 2**70}
@@ -0,0 +1,70 @@
+import json
+from datetime import datetime
+
+import pytest
+from flask_sqlalchemy import SQLAlchemy
+
+from filmapi.api.schemas import (
+    ActorSchema,
+    CommentSchema,
+    FilmSchema,
+    GenreSchema,
+    UserSchema,
+)
+from filmapi.commons.serializers import compiled
+from filmapi.models import Actor, Comments, Film, Genre, User
+
+
+def assert_same_output(schema, serializer, obj, many=False):
+    expected = json.dumps(schema.dump(obj, many=many))
+    assert json.dumps(serializer.dump(obj, many=many)) == expected
+
+
+@pytest.mark.parametrize(
+    "schema_class, only",
+    [
+        (FilmSchema, None),
+        (FilmSchema, ("title", "uuid", "release_date", "rating")),
+        (FilmSchema, ("actors", "genres", "length")),
+        (ActorSchema, None),
+        (ActorSchema, ("name", "films")),
+        (GenreSchema, None),
+    ],
+)
+def test_compiled_matches_marshmallow(
+    db: SQLAlchemy, film: Film, actor: Actor, schema_class, only
+):
+    film.actors.append(actor)
+    film.description = None
+    db.session.commit()
+    schema = schema_class(only=only)
+    serializer = compiled(schema_class, only)
+    objects = {FilmSchema: film, ActorSchema: actor, GenreSchema: film.genres[0]}
+    obj = objects[schema_class]
+
+    assert_same_output(schema, serializer, obj)
+    assert_same_output(schema, serializer, [obj, obj], many=True)
+
+
+def test_compiled_matches_marshmallow_on_rows(db: SQLAlchemy, film: Film):
+    rows = db.session.query(Film.title, Film.uuid, Film.rating, Film.release_date)
+    assert_same_output(FilmSchema(), compiled(FilmSchema), rows.all(), many=True)
+
+    genres = db.session.query(Genre.id, Genre.name).all()
+    assert_same_output(GenreSchema(), compiled(GenreSchema), genres, many=True)
+
+
+def test_compiled_matches_marshmallow_on_other_schemas(
+    db: SQLAlchemy, film: Film, admin_user: User
+):
+    comment = Comments(text="Comment", user=admin_user, film=film)
+    comment.created_at = datetime(2023, 9, 26, 12, 30, 15, 250)
+    db.session.add(comment)
+    db.session.commit()
+
+    assert_same_output(CommentSchema(), compiled(CommentSchema), comment)
+    assert_same_output(UserSchema(), compiled(UserSchema), admin_user)
+    users = compiled(UserSchema, many=True)
+    assert users.dump([admin_user]) == UserSchema(many=True).dump([admin_user])
+    data = {"title": "Film", "rating": 7, "release_date": film.release_date}
+    assert_same_output(FilmSchema(), compiled(FilmSchema), data)
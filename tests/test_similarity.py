@@ -0,0 +1,94 @@
+import random
+
+import pytest
+from flask import url_for, testing
+from flask_sqlalchemy import SQLAlchemy
+from factory import Factory
+
+from filmapi.models import FilmNeighbor, Genre
+from filmapi.services.similarity import SimilarityIndex
+from filmapi.tasks.catalog import compute_similar_films
+
+
+def brute_force(index, film_id, k):
+    scores = {}
+    for other in index.films_by_genres.values():
+        for other_id in other:
+            if other_id == film_id:
+                continue
+            genres = index.genre_similarity(
+                index.genres.get(film_id, ()), index.genres.get(other_id, ())
+            )
+            cast = set(index.actors.get(film_id, ()))
+            other_cast = index.actors.get(other_id, ())
+            actors = 0.0
+            if cast and other_cast:
+                shared = len(cast.intersection(other_cast))
+                actors = shared / (len(cast) * len(other_cast)) ** 0.5
+            score = index.genre_weight * genres + index.actor_weight * actors
+            if score > 0:
+                scores[other_id] = score
+    return sorted(scores.values(), reverse=True)[:k]
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(7)
+    genres, actors = {}, {}
+    for film_id in range(1, 301):
+        genres[film_id] = tuple(sorted(rng.sample(range(8), rng.randint(0, 3))))
+        actors[film_id] = tuple(sorted(rng.sample(range(200), rng.randint(1, 4))))
+    index = SimilarityIndex(genres, actors, genre_weight=0.4, actor_weight=0.6)
+    for film_id, neighbors in index.all_nearest(10):
+        assert film_id not in [other for other, _ in neighbors]
+        scores = [score for _, score in neighbors]
+        assert scores == pytest.approx(brute_force(index, film_id, 10))
+
+
+def test_similar_films_endpoint(
+    client: testing.FlaskClient,
+    db: SQLAlchemy,
+    film_factory: Factory,
+    actor_factory: Factory,
+):
+    drama, comedy, war = Genre(name="Drama"), Genre(name="Comedy"), Genre(name="War")
+    star, other = actor_factory.create_batch(2)
+    films = film_factory.create_batch(4)
+    films[0].genres, films[0].actors = [drama, war], [star]
+    films[1].genres, films[1].actors = [comedy], [star]
+    films[2].genres, films[2].actors = [drama, war], [other]
+    films[3].genres, films[3].actors = [comedy], [other]
+    db.session.add_all(films)
+    db.session.commit()
+
+    url = url_for("api.film_similar", uuid=films[0].uuid)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.json == {"films": []}
+    etag = response.headers["ETag"]
+
+    assert compute_similar_films() == {"films": 4}
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    similar = response.json["films"]
+    # the same cast outweighs the same genres
+    assert [film["uuid"] for film in similar] == [films[1].uuid, films[2].uuid]
+    assert [film["score"] for film in similar] == [0.6, 0.4]
+    assert set(similar[0]) == {
+        "title",
+        "title_original",
+        "uuid",
+        "poster",
+        "rating",
+        "score",
+    }
+    response = client.get(url_for("api.film_similar", uuid=films[0].uuid, limit=1))
+    assert len(response.json["films"]) == 1
+
+    compute_similar_films()
+    assert db.session.query(FilmNeighbor).count() == 8
+    db.session.delete(films[1])
+    db.session.commit()
+    assert [film["uuid"] for film in client.get(url).json["films"]] == [films[2].uuid]
+    url = url_for("api.film_similar", uuid=films[0].uuid, limit=21)
+    assert client.get(url).status_code == 400
+    assert client.get(url_for("api.film_similar", uuid="missing")).status_code == 404
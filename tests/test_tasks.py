@@ -0,0 +1,98 @@
+from typing import Dict
+
+import mock
+import pytest
+from flask import url_for, testing
+from flask_sqlalchemy import SQLAlchemy
+
+from filmapi.extensions import redis_client
+from filmapi.tasks.progress import TaskProgress, record_failure
+
+
+@pytest.fixture
+def progress():
+    progress = TaskProgress("test-tasks-progress-id")
+    redis_client.delete(progress.key)
+    yield progress
+    redis_client.delete(progress.key)
+
+
+@mock.patch("filmapi.api.resources.tasks.AsyncResult")
+def test_get_task_progress(
+    mock_async_result,
+    client: testing.FlaskClient,
+    db: SQLAlchemy,
+    admin_headers: Dict[str, str],
+    progress: TaskProgress,
+):
+    mock_async_result.return_value.state = "SUCCESS"
+    mock_async_result.return_value.failed.return_value = False
+    mock_async_result.return_value.result = "chord-id"
+    progress.start()
+    progress.update(discovered=100, chunks=4, fetched=50, parsed=48, chunks_saved=1)
+    progress.set(dispatched_at=1)
+
+    response = client.get(
+        url_for("api.task_by_id", task_id=progress.task_id), headers=admin_headers
+    )
+    assert response.status_code == 200
+    data: dict = response.get_json()
+    assert data["state"] == "PROGRESS"
+    assert data["progress"]["discovered"] == 100
+    assert data["progress"]["parsed"] == 48
+    assert data["progress"]["finished"] is False
+
+    progress.update(chunks_saved=3, inserted=95)
+    data = client.get(
+        url_for("api.task_by_id", task_id=progress.task_id), headers=admin_headers
+    ).get_json()
+    assert data["state"] == "SUCCESS"
+    assert data["progress"]["inserted"] == 95
+    assert data["progress"]["eta"] is None
+
+
+@mock.patch("filmapi.api.resources.tasks.AsyncResult")
+def test_get_failed_task_progress(
+    mock_async_result,
+    client: testing.FlaskClient,
+    db: SQLAlchemy,
+    admin_headers: Dict[str, str],
+    progress: TaskProgress,
+):
+    mock_async_result.return_value.state = "SUCCESS"
+    mock_async_result.return_value.failed.return_value = False
+    mock_async_result.return_value.result = "chord-id"
+    progress.start()
+    progress.update(discovered=100, chunks=4, chunks_saved=0)
+    progress.set(dispatched_at=1)
+    record_failure(None, TimeoutError("chunk timed out"), None, progress.task_id)
+
+    data = client.get(
+        url_for("api.task_by_id", task_id=progress.task_id), headers=admin_headers
+    ).get_json()
+    assert data["state"] == "FAILURE"
+    assert data["progress"]["failed"] is True
+    assert data["result"] == "TimeoutError('chunk timed out')"
+
+
+@mock.patch("filmapi.api.resources.tasks.AsyncResult")
+def test_get_task_without_progress(
+    mock_async_result,
+    client: testing.FlaskClient,
+    db: SQLAlchemy,
+    admin_headers: Dict[str, str],
+):
+    mock_async_result.return_value.state = "SUCCESS"
+    mock_async_result.return_value.failed.return_value = False
+    mock_async_result.return_value.result = {"index": "films-new"}
+
+    response = client.get(
+        url_for("api.task_by_id", task_id="reset-id"), headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "task_id": "reset-id",
+        "state": "SUCCESS",
+        "progress": None,
+        "result": {"index": "films-new"},
+    }
@@ -1,4 +1,7 @@
 from typing import Dict
+
+import mock
+from cachelib import SimpleCache
 from flask import url_for
 from flask.testing import FlaskClient
 from flask_sqlalchemy import SQLAlchemy
@@ -107,3 +110,27 @@ def test_get_all_user(
     results: dict = repsponse.get_json()
     for user in users:
         assert any(u["id"] == user.id for u in results["results"])
+    assert results["total"] == 31
+    assert results["total_exact"] is True
+    assert results["pages"] == 1
+
+
+def test_user_list_total_follows_user_writes(
+    client: FlaskClient,
+    db: SQLAlchemy,
+    user_factory: Factory,
+    admin_headers: Dict[str, str],
+):
+    def total():
+        response = client.get(url_for("api.users"), headers=admin_headers)
+        return response.get_json()["total"]
+
+    with mock.patch("filmapi.commons.pagination.cache", SimpleCache()):
+        assert total() == 1
+        user = user_factory.create()
+        db.session.add(user)
+        db.session.commit()
+        assert total() == 2
+        db.session.delete(user)
+        db.session.commit()
+        assert total() == 1